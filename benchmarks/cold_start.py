@@ -0,0 +1,98 @@
+"""
+ Cold start of `python main.py file.c`: wall time of the whole process and the import time (-X importtime)
+
+ Every command is a new interpreter, the same way a build tool runs the compiler:
+
+ - python -c pass       the interpreter on its own, nothing can start faster
+ - main.py (cached)     the binary comes out of the compilation cache
+ - main.py --no-cache   the whole compiler runs and gcc links
+ - zipapp (cached)      the archive of compiler.bundle with precompiled bytecode
+
+ Usage: python -m benchmarks.cold_start [file] [--runs N] [--json results.json]
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from compiler.bundle import build
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_times(stderr):
+    """{top level module: cumulative us} from the -X importtime output"""
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # nested imports are indented, their time is part of the module above them
+        if not name.startswith("  "):
+            times[name.strip()] = int(cumulative)
+
+    return times
+
+
+def run(command, runs, directory, environment):
+    """Mean and best wall seconds of the command, and the import times of its last run"""
+    walls = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        process = subprocess.run(command, cwd=directory, env=environment, capture_output=True, text=True)
+        walls.append(time.perf_counter() - start)
+        if process.returncode != 0:
+            raise RuntimeError(f"{' '.join(command)} failed: {process.stdout}{process.stderr}")
+
+    # the import times come from an extra run, -X importtime itself slows the imports down
+    process = subprocess.run(command[:1] + ["-X", "importtime"] + command[1:], cwd=directory, env=environment, capture_output=True, text=True)
+    return [sum(walls) / runs, min(walls), import_times(process.stderr)]
+
+
+def main():
+    argparser = argparse.ArgumentParser(description="Cold start time of the compiler, with -X importtime")
+    argparser.add_argument("file", nargs="?", default=os.path.join(ROOT, "c_file_examples", "add_variables.c"), help=".c file to compile")
+    argparser.add_argument("--runs", type=int, default=20, help="processes started per command")
+    argparser.add_argument("--top", type=int, default=5, help="slowest imports shown per command")
+    argparser.add_argument("--json", help="also write the results to this file")
+    args = argparser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        # a cache of our own, the cached commands get their hit from the warm up run
+        environment = dict(os.environ, XDG_CACHE_HOME=os.path.join(directory, "cache"))
+        os.makedirs(os.path.join(directory, "compiled"))
+        sourceFile = shutil.copy(args.file, directory)
+        archive = build(os.path.join(directory, "c-compiler.pyz"))
+
+        commands = {
+            "python -c pass": [sys.executable, "-c", "pass"],
+            "main.py (cached)": [sys.executable, os.path.join(ROOT, "main.py"), sourceFile],
+            "main.py --no-cache": [sys.executable, os.path.join(ROOT, "main.py"), "--no-cache", sourceFile],
+            "zipapp (cached)": [sys.executable, archive, sourceFile],
+        }
+
+        results = {}
+        for name, command in commands.items():
+            # warm up: fills the cache, the .pyc files and the page cache
+            subprocess.run(command, cwd=directory, env=environment, capture_output=True)
+            results[name] = run(command, args.runs, directory, environment)
+
+    print(f"{'command':<20} {'mean ms':>9} {'best ms':>9} {'imports ms':>11}")
+    for name, (mean, best, imports) in results.items():
+        print(f"{name:<20} {mean * 1000:>9.1f} {best * 1000:>9.1f} {sum(imports.values()) / 1000:>11.1f}")
+
+    for name, (_, _, imports) in results.items():
+        slowest = sorted(imports.items(), key=lambda item: item[1], reverse=True)[:args.top]
+        print(f"\n{name}: " + ", ".join(f"{module} {us / 1000:.1f}ms" for module, us in slowest))
+
+    if args.json:
+        with open(args.json, "w") as jsonFile:
+            json.dump({name: {"mean": mean, "best": best, "imports": imports} for name, (mean, best, imports) in results.items()}, jsonFile, indent=2)
+
+
+if __name__ == "__main__":
+    main()
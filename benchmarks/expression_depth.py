@@ -0,0 +1,212 @@
+"""
+ Time of the expression stages (parse_exp, resolve_exp, emit_tacky) on deeply nested expressions
+
+ The explicit stack versions of the compiler are compared against the recursive
+ versions they replaced, which are kept here as a reference. The recursive versions
+ run in a thread with a big stack and a raised recursion limit, depths above
+ --max-recursive-depth are only run with the compiler versions.
+
+ Usage: python -m benchmarks.expression_depth [--depths 1000 10000 100000] [--repeat N]
+"""
+import argparse
+import sys
+import threading
+import time
+
+import compiler.parser.AST as AST
+import compiler.tacky.tacky_ir as Tacky
+from compiler.context import CompilationContext
+from compiler.parser.lexer import NewLexer, TokenType
+from compiler.parser.parse import TokenStream, ParseErrorFactor, parse_exp, precedenceOfToken
+from compiler.semantic_analysis.var_resolution import resolve_exp
+from compiler.tacky.tackyAST import emit_tacky, make_temporaryname, make_uniquename, convert_unop, convert_binop
+
+# source of an expression with the given nesting depth
+SHAPES = {
+    "parentheses": lambda depth: "(" * depth + "a" + ")" * depth,
+    "unary": lambda depth: "-~" * (depth // 2) + "a",
+    "left_binary": lambda depth: "a * 2 + " * depth + "a",
+    "right_binary": lambda depth: "a - (" * depth + "a" + ")" * depth,
+    "logical": lambda depth: "a && (a || (" * (depth // 2) + "a" + "))" * (depth // 2),
+    "assignment": lambda depth: "a = " * depth + "a",
+}
+
+
+# recursive reference versions
+def recursive_parse_factor(tokens):
+    this_token = tokens.peek()
+    if this_token.tok_type is TokenType.CONSTANT:
+        tokens.advance()
+        return AST.Constant(this_token.tok_val)
+    elif this_token.tok_type in (TokenType.UNARY_TILDE, TokenType.UNARY_NEGATE, TokenType.NOT_OPERATOR):
+        tokens.advance()
+        return AST.Unary(AST.Unary_Operator(this_token.tok_type), recursive_parse_factor(tokens))
+    elif this_token.tok_type is TokenType.OPEN_PARENTHESIS:
+        tokens.advance()
+        inner_exp = recursive_parse_exp(tokens, 0)
+        tokens.expect(TokenType.CLOSE_PARENTHESIS)
+        return inner_exp
+    elif this_token.tok_type is TokenType.IDENTIFIER:
+        tokens.advance()
+        return AST.Var(this_token.tok_val)
+
+    raise ParseErrorFactor(this_token.tok_val)
+
+
+def recursive_parse_exp(tokens, min_prec):
+    left = recursive_parse_factor(tokens)
+    next_token = tokens.peek()
+    while next_token.tok_type in AST.Binary_Operator.operatorsList and precedenceOfToken(next_token) >= min_prec:
+        tokens.advance()
+        if next_token.tok_type is TokenType.ASSIGNMENT_OPERATOR:
+            left = AST.Assignment(left, recursive_parse_exp(tokens, precedenceOfToken(next_token)))
+        else:
+            right = recursive_parse_exp(tokens, precedenceOfToken(next_token) + 1)
+            left = AST.Binary(AST.Binary_Operator(next_token.tok_type), left, right)
+        next_token = tokens.peek()
+
+    return left
+
+
+def recursive_resolve_exp(exp, variable_map):
+    if isinstance(exp, AST.Assignment):
+        return AST.Assignment(recursive_resolve_exp(exp.left_exp, variable_map), recursive_resolve_exp(exp.right_exp, variable_map))
+    elif isinstance(exp, AST.Var):
+        return AST.Var(variable_map[exp.identifier])
+    elif isinstance(exp, AST.Unary):
+        return AST.Unary(exp.unary_operator, recursive_resolve_exp(exp.exp, variable_map))
+    elif isinstance(exp, AST.Binary):
+        return AST.Binary(exp.binary_operator, recursive_resolve_exp(exp.exp1, variable_map), recursive_resolve_exp(exp.exp2, variable_map))
+
+    return AST.Constant(exp.int)
+
+
+def recursive_emit_tacky(exp, context):
+    if isinstance(exp, AST.Constant):
+        return [[], Tacky.Constant(exp.int)]
+    elif isinstance(exp, AST.Var):
+        return [[], Tacky.Var(exp.identifier)]
+    elif isinstance(exp, AST.Assignment):
+        instructions, result = recursive_emit_tacky(exp.right_exp, context)
+        instructions.append(Tacky.Copy(result, Tacky.Var(exp.left_exp.identifier)))
+        return [instructions, Tacky.Var(exp.left_exp.identifier)]
+    elif isinstance(exp, AST.Unary):
+        instructions, src = recursive_emit_tacky(exp.exp, context)
+        dst = Tacky.Var(make_temporaryname(context))
+        instructions.append(Tacky.UnaryTacky(convert_unop(exp.unary_operator), src, dst))
+        return [instructions, dst]
+
+    eval_v1, v1 = recursive_emit_tacky(exp.exp1, context)
+    eval_v2, v2 = recursive_emit_tacky(exp.exp2, context)
+    instructions = []
+    operator = exp.binary_operator.operator
+    if operator in (TokenType.AND_OPERATOR, TokenType.OR_OPERATOR):
+        jump = Tacky.JumpIfZero if operator is TokenType.AND_OPERATOR else Tacky.JumpIfNotZero
+        short_label = make_uniquename("and_false" if operator is TokenType.AND_OPERATOR else "or_true", context)
+        end_label = make_uniquename("and_end" if operator is TokenType.AND_OPERATOR else "or_end", context)
+        dst = Tacky.Var(make_temporaryname(context))
+        short_value, end_value = (0, 1) if operator is TokenType.AND_OPERATOR else (1, 0)
+        instructions.extend(eval_v1)
+        instructions.append(jump(v1, short_label))
+        instructions.extend(eval_v2)
+        instructions.append(jump(v2, short_label))
+        instructions.append(Tacky.Copy(Tacky.Constant(end_value), dst))
+        instructions.append(Tacky.Jump(end_label))
+        instructions.append(Tacky.Label(short_label))
+        instructions.append(Tacky.Copy(Tacky.Constant(short_value), dst))
+        instructions.append(Tacky.Label(end_label))
+        return [instructions, dst]
+
+    dst = Tacky.Var(make_temporaryname(context))
+    instructions.extend(eval_v1)
+    instructions.extend(eval_v2)
+    instructions.append(Tacky.Binary(convert_binop(exp.binary_operator), v1, v2, dst))
+    return [instructions, dst]
+
+
+def compiler_stages(tokens):
+    return {
+        "parse_exp": lambda: parse_exp(TokenStream(tokens), 0)[0],
+        "resolve_exp": lambda exp: resolve_exp(exp, {"a": 0}),
+        "emit_tacky": lambda exp: emit_tacky(exp, CompilationContext())[0],
+    }
+
+
+def recursive_stages(tokens):
+    return {
+        "parse_exp": lambda: recursive_parse_exp(TokenStream(tokens), 0),
+        "resolve_exp": lambda exp: recursive_resolve_exp(exp, {"a": 0}),
+        "emit_tacky": lambda exp: recursive_emit_tacky(exp, CompilationContext())[0],
+    }
+
+
+def time_stages(stages, repeat):
+    """Best time of every stage, each stage gets the result of parse_exp"""
+    times = {}
+    exp = None
+    for name, stage in stages.items():
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = stage() if exp is None else stage(exp)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        if name == "parse_exp":
+            exp = result
+        times[name] = best
+
+    return times
+
+
+def in_big_stack(function, depth):
+    """Run a recursive function in a thread with enough stack and recursion limit for the depth"""
+    result = {}
+
+    def run():
+        try:
+            result["value"] = function()
+        except RecursionError:
+            result["value"] = None
+
+    old_limit = sys.getrecursionlimit()
+    old_stack_size = threading.stack_size(512 * 1024 * 1024)
+    sys.setrecursionlimit(max(old_limit, depth * 4 + 1000))
+    try:
+        thread = threading.Thread(target=run)
+        thread.start()
+        thread.join()
+    finally:
+        sys.setrecursionlimit(old_limit)
+        threading.stack_size(old_stack_size)
+
+    return result.get("value")
+
+
+def main():
+    argparser = argparse.ArgumentParser(description="Expression stages on deeply nested expressions, explicit stack vs recursion")
+    argparser.add_argument("--depths", type=int, nargs="+", default=[1000, 10000, 100000], help="nesting depths to run")
+    argparser.add_argument("--repeat", type=int, default=3, help="runs per stage, the best time is shown")
+    argparser.add_argument("--max-recursive-depth", type=int, default=10000, help="deepest expression given to the recursive versions")
+    args = argparser.parse_args()
+
+    print(f"{'shape':<14} {'depth':>7} {'stage':<12} {'stack (s)':>10} {'recursive (s)':>14} {'speedup':>8}")
+
+    for shape, make_source in SHAPES.items():
+        for depth in args.depths:
+            tokens = NewLexer(make_source(depth) + ";").startLexer()
+            times = time_stages(compiler_stages(tokens), args.repeat)
+
+            recursive_times = None
+            if depth <= args.max_recursive_depth:
+                recursive_times = in_big_stack(lambda: time_stages(recursive_stages(tokens), args.repeat), depth)
+
+            for stage, stack_time in times.items():
+                if recursive_times is None:
+                    print(f"{shape:<14} {depth:>7} {stage:<12} {stack_time:>10.4f} {'-':>14} {'-':>8}")
+                else:
+                    recursive_time = recursive_times[stage]
+                    print(f"{shape:<14} {depth:>7} {stage:<12} {stack_time:>10.4f} {recursive_time:>14.4f} {recursive_time / stack_time:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
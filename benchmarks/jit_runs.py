@@ -0,0 +1,75 @@
+"""
+ Compile-and-runs per second: running main in-process (compiler.jit) against linking a binary with gcc and running it
+
+ Every run compiles the source again, the exit codes of both ways are compared.
+
+ Usage: python -m benchmarks.jit_runs [files ...] [--seconds N]
+"""
+import argparse
+import glob
+import os
+import subprocess
+import tempfile
+import time
+
+from compiler.assembly.ASM import createASMoutput
+from compiler.compile import compile_source, assemble_and_link
+from compiler.context import CompilationContext
+from compiler.jit import check_jit_support, run_source
+
+
+def gcc_run(source, binaryFilePath):
+    context = CompilationContext()
+    error = assemble_and_link(compile_source(source, context), binaryFilePath, context)
+    if error is not None:
+        raise RuntimeError(error)
+    return subprocess.run([binaryFilePath]).returncode
+
+
+def jit_run(source, binaryFilePath):
+    return run_source(source) & 0xFF
+
+
+def runs_per_second(run, sources, binaryFilePath, seconds):
+    """Compile and run the sources round robin for about the given seconds"""
+    runs = 0
+    start = time.perf_counter()
+    while (elapsed := time.perf_counter() - start) < seconds or runs < len(sources):
+        run(sources[runs % len(sources)], binaryFilePath)
+        runs += 1
+
+    return runs / elapsed
+
+
+def main():
+    argparser = argparse.ArgumentParser(description="Compile-and-runs per second, in-process vs gcc and a new process")
+    argparser.add_argument("files", nargs="*", help=".c files to run (default: c_file_examples)")
+    argparser.add_argument("--seconds", type=float, default=3.0, help="time spent on each way of running")
+    args = argparser.parse_args()
+
+    if not check_jit_support():
+        return
+
+    files = args.files or sorted(glob.glob(os.path.join("c_file_examples", "*.c")))
+    sources = [open(filePath).read() for filePath in files]
+
+    with tempfile.TemporaryDirectory() as directory:
+        binaryFilePath = os.path.join(directory, "program")
+
+        for filePath, source in zip(files, sources):
+            expected = gcc_run(source, binaryFilePath)
+            result = jit_run(source, binaryFilePath)
+            if result != expected:
+                print(f"{filePath}: in-process gave {result}, the binary exited with {expected}")
+                return
+
+        gcc = runs_per_second(gcc_run, sources, binaryFilePath, args.seconds)
+        jit = runs_per_second(jit_run, sources, binaryFilePath, args.seconds)
+
+    print(f"{'mode':<12} {'runs/s':>10}")
+    print(f"{'gcc + exec':<12} {gcc:>10.1f}")
+    print(f"{'in-process':<12} {jit:>10.1f} ({jit / gcc:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
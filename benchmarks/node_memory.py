@@ -0,0 +1,78 @@
+"""
+ Memory used per node by the AST, TACKY and ASM classes
+
+ Every class with __slots__ is compared against a copy of the same class
+ that keeps its attributes in a __dict__ (how the nodes were stored before).
+
+ Usage: python -m benchmarks.node_memory [--count N]
+"""
+import argparse
+import inspect
+import tracemalloc
+
+import compiler.parser.AST as AST
+import compiler.tacky.tacky_ir as Tacky
+import compiler.assembly.ASM as ASM
+
+
+def node_classes(module):
+    """All the classes of a module that use __slots__"""
+    for cls in vars(module).values():
+        if inspect.isclass(cls) and cls.__module__ == module.__name__ and "__slots__" in cls.__dict__:
+            yield cls
+
+
+def dict_based_copy(cls):
+    """The same class without __slots__, so every instance gets a __dict__"""
+    namespace = {}
+    if "__init__" in cls.__dict__:
+        namespace["__init__"] = cls.__dict__["__init__"]
+
+    return type(cls.__name__, cls.__bases__, namespace)
+
+
+def constructor_args(cls):
+    if "__init__" not in cls.__dict__:
+        # int subclasses like AsmImmediateValue take their value
+        return [1000] if issubclass(cls, int) else []
+
+    parameters = list(inspect.signature(cls.__init__).parameters.values())[1:]
+    return [0 for parameter in parameters if parameter.default is inspect.Parameter.empty]
+
+
+def bytes_per_node(cls, count):
+    args = constructor_args(cls)
+    nodes = [None] * count
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(count):
+        nodes[i] = cls(*args)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return (after - before) / count
+
+
+def main():
+    argparser = argparse.ArgumentParser(description="Memory used per node with and without __slots__")
+    argparser.add_argument("--count", type=int, default=10000, help="amount of nodes created per class")
+    args = argparser.parse_args()
+
+    print(f"{'class':<40} {'__dict__':>10} {'__slots__':>10}")
+
+    total_dict = 0
+    total_slots = 0
+    for module in (AST, Tacky, ASM):
+        for cls in node_classes(module):
+            with_dict = bytes_per_node(dict_based_copy(cls), args.count)
+            with_slots = bytes_per_node(cls, args.count)
+            total_dict += with_dict
+            total_slots += with_slots
+            print(f"{module.__name__.split('.')[-1] + '.' + cls.__name__:<40} {with_dict:>10.1f} {with_slots:>10.1f}")
+
+    print(f"{'total':<40} {total_dict:>10.1f} {total_slots:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+ Generator of large valid programs in the shape the Parser accepts: int main(void) { ... return ...; }
+
+ shapes:
+   declarations   `size` declarations with small initializers
+   logical        one && / || chain with `size` terms
+   nested         one expression nested `size` levels deep
+   assignments    `size` assignments to a handful of variables
+   mixed          random declarations and assignments of random expressions
+
+ The programs are only meant to be compiled, running them can divide by zero.
+
+ Usage: python -m benchmarks.programs --shape mixed --size 1000 [--seed N] > program.c
+"""
+import argparse
+import random
+
+BINARY_OPERATORS = ("+", "-", "*", "/", "%", "==", "!=", "<", "<=", ">", ">=", "&&", "||")
+UNARY_OPERATORS = ("-", "~", "!")
+
+# variables every shape declares first
+VARIABLES = 8
+
+
+def declarations(lines, size, rng):
+    for index in range(size):
+        lines.append(f"    int d{index} = {index % 100} + v{index % VARIABLES};")
+    return f"d{size - 1}" if size else "v0"
+
+
+def logical(lines, size, rng):
+    terms = []
+    for index in range(size):
+        variable = f"v{index % VARIABLES}"
+        term = variable if index % 3 else f"({variable} < {index % 10})"
+        terms.append(term)
+        if index < size - 1:
+            terms.append(rng.choice((" && ", " || ")))
+    lines.append(f"    int r = {''.join(terms) or '0'};")
+    return "r"
+
+
+def nested(lines, size, rng):
+    opening = []
+    closing = []
+    for index in range(size):
+        if index % 5 == 4:
+            opening.append(rng.choice(UNARY_OPERATORS) + "(")
+            closing.append(")")
+        else:
+            opening.append(f"(v{index % VARIABLES} {rng.choice(BINARY_OPERATORS)} ")
+            closing.append(")")
+    lines.append(f"    int r = {''.join(opening)}1{''.join(reversed(closing))};")
+    return "r"
+
+
+def assignments(lines, size, rng):
+    for index in range(size):
+        lines.append(f"    v{index % VARIABLES} = v{(index + 3) % VARIABLES} {rng.choice(BINARY_OPERATORS)} {index % 50};")
+    return "v0"
+
+
+def random_expression(rng, names, depth):
+    if depth == 0 or rng.random() < 0.3:
+        if rng.random() < 0.6:
+            return rng.choice(names)
+        return str(rng.randint(1, 9))
+    if rng.random() < 0.15:
+        return rng.choice(UNARY_OPERATORS) + "(" + random_expression(rng, names, depth - 1) + ")"
+    return f"({random_expression(rng, names, depth - 1)} {rng.choice(BINARY_OPERATORS)} {random_expression(rng, names, depth - 1)})"
+
+
+def mixed(lines, size, rng):
+    names = [f"v{index}" for index in range(VARIABLES)]
+    for index in range(size):
+        if rng.random() < 0.3:
+            lines.append(f"    {rng.choice(names)} = {random_expression(rng, names, 3)};")
+        else:
+            lines.append(f"    int m{index} = {random_expression(rng, names, 3)};")
+            names.append(f"m{index}")
+    return names[-1]
+
+
+SHAPES = {
+    "declarations": declarations,
+    "logical": logical,
+    "nested": nested,
+    "assignments": assignments,
+    "mixed": mixed,
+}
+
+
+def generate_program(shape, size, seed=1):
+    """Source code of a program of the shape, the same shape, size and seed always give the same program"""
+    rng = random.Random(seed)
+    lines = ["int main(void) {"]
+    for index in range(VARIABLES):
+        lines.append(f"    int v{index} = {index + 1};")
+
+    result = SHAPES[shape](lines, size, rng)
+
+    lines.append(f"    return {result};")
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    argparser = argparse.ArgumentParser(description="Write a large generated C program to stdout")
+    argparser.add_argument("--shape", choices=SHAPES, default="mixed", help="kind of program")
+    argparser.add_argument("--size", type=int, default=1000, help="statements, terms or nesting depth")
+    argparser.add_argument("--seed", type=int, default=1, help="seed of the random choices")
+    args = argparser.parse_args()
+
+    print(generate_program(args.shape, args.size, args.seed), end="")
+
+
+if __name__ == "__main__":
+    main()
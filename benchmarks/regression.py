@@ -0,0 +1,296 @@
+"""
+ Performance regression gate: compares the compiler against the baselines in benchmarks/baselines.json
+
+ Every benchmark program is measured on:
+   seconds           compile time (compile_source + createASMoutput)
+   peak_bytes        peak memory of a compile (tracemalloc)
+   output counters   TACKY instructions, ASM instructions, stack slots and assembly bytes (--stats)
+
+ The generated programs (benchmarks.programs) are measured on all of them, the files in
+ c_file_examples only on the output counters, they compile too fast to time.
+
+ The times of a single process are not independent (hash seed, memory layout, clock speed at
+ that moment), so the compile times come from --processes new worker processes that each
+ compile every program --samples times. Every worker also times a fixed piece of plain Python
+ (calibrate), the compile time divided by that time is what is compared: it stays the same
+ when the whole machine gets slower or faster.
+
+ A slower compile only fails when the median is more than --max-slowdown slower AND a one-sided
+ Mann-Whitney U test on the worker values says the difference is real (p < --alpha), so noise
+ alone doesn't fail the gate. Memory fails above --max-memory-increase, the output counters fail
+ on any increase above --max-size-increase (default: any increase at all).
+
+ Usage: python -m benchmarks.regression [--processes N] [--samples N] [--skip-time]
+        python -m benchmarks.regression --update      (record new baselines after an intended change)
+"""
+import argparse
+import gc
+import glob
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from benchmarks.programs import generate_program
+from compiler.assembly.ASM import createASMoutput
+from compiler.compile import compile_source
+from compiler.context import CompilationContext
+from compiler.statistics import Statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINES = os.path.join(ROOT, "benchmarks", "baselines.json")
+
+# name -> (shape, size) of the generated programs
+GENERATED = {
+    "mixed-1000": ("mixed", 1000),
+    "declarations-2000": ("declarations", 2000),
+    "logical-2000": ("logical", 2000),
+    "nested-2000": ("nested", 2000),
+    "assignments-2000": ("assignments", 2000),
+}
+
+# output counter -> (stage, counter) of compiler.statistics
+OUTPUT_COUNTERS = {
+    "tacky_instructions": ("gen", "TACKY instructions"),
+    "asm_instructions": ("createAsmCode", "instructions"),
+    "stack_slots": ("legalizeInstructions", "stack slots"),
+    "assembly_bytes": ("writeASMProgram", "assembly bytes"),
+}
+
+
+def benchmark_programs():
+    """{name: source code}"""
+    programs = {name: generate_program(shape, size) for name, (shape, size) in GENERATED.items()}
+    for filePath in sorted(glob.glob(os.path.join(ROOT, "c_file_examples", "*.c"))):
+        with open(filePath) as sourceFile:
+            programs["examples/" + os.path.basename(filePath)] = sourceFile.read()
+
+    return programs
+
+
+def compile_once(code, stats=None):
+    context = CompilationContext()
+    context.stats = stats
+    assembly = createASMoutput(compile_source(code, context), context)
+    if stats is not None:
+        stats.add("writeASMProgram", "assembly bytes", len(assembly))
+
+
+def calibrate():
+    """Seconds of a fixed piece of plain Python, a measure of how fast the machine runs Python right now"""
+    start = time.perf_counter()
+    total = 0
+    for number in range(200000):
+        total += number * number % 7
+    return time.perf_counter() - start
+
+
+def worker(names, samples):
+    """{name: [median compile seconds, median calibration seconds]} of this process"""
+    programs = benchmark_programs()
+    results = {}
+    for name in names:
+        code = programs[name]
+        seconds = []
+        calibration = []
+        for _ in range(samples):
+            gc.collect()
+            calibration.append(calibrate())
+            start = time.perf_counter()
+            compile_once(code)
+            seconds.append(time.perf_counter() - start)
+        results[name] = [median(seconds), median(calibration)]
+
+    return results
+
+
+def measure_times(names, processes, samples):
+    """{name: {"seconds": [...], "normalized": [...]}} with one value per worker process"""
+    times = {name: {"seconds": [], "normalized": []} for name in names}
+    command = [sys.executable, "-m", "benchmarks.regression", "--worker", "--samples", str(samples), *names]
+    for _ in range(processes):
+        output = subprocess.run(command, cwd=ROOT, capture_output=True, text=True, check=True).stdout
+        for name, (seconds, calibration) in json.loads(output).items():
+            times[name]["seconds"].append(seconds)
+            times[name]["normalized"].append(seconds / calibration)
+
+    return times
+
+
+def measure_output(code, memory=True):
+    """The output counters and (with memory) the peak memory of a single program"""
+    stats = Statistics()
+    compile_once(code, stats)
+    result = {name: stats.get(stage, counter) for name, (stage, counter) in OUTPUT_COUNTERS.items()}
+    if not memory:
+        return result
+
+    gc.collect()
+    tracemalloc.start()
+    compile_once(code)
+    result["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return result
+
+
+def machine():
+    return {"python": platform.python_version(), "system": platform.system(), "machine": platform.machine(), "processor": platform.processor()}
+
+
+def median(values):
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    return ordered[middle] if len(ordered) % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+
+
+def mann_whitney_greater(new, old):
+    """p-value of a one-sided Mann-Whitney U test that the new values tend to be larger (normal approximation)"""
+    values = sorted([(value, 0) for value in new] + [(value, 1) for value in old])
+    ranks = [0.0] * len(values)
+    ties = 0
+    index = 0
+    while index < len(values):
+        end = index
+        while end + 1 < len(values) and values[end + 1][0] == values[index][0]:
+            end += 1
+        # tied values share the mean of their ranks
+        for position in range(index, end + 1):
+            ranks[position] = (index + end) / 2 + 1
+        count = end - index + 1
+        ties += count ** 3 - count
+        index = end + 1
+
+    n1, n2 = len(new), len(old)
+    rankSum = sum(rank for rank, (_, group) in zip(ranks, values) if group == 0)
+    u = rankSum - n1 * (n1 + 1) / 2
+    total = n1 + n2
+    variance = n1 * n2 / 12 * ((total + 1) - ties / (total * (total - 1)))
+    if variance <= 0:
+        return 1.0
+
+    z = (u - n1 * n2 / 2 - 0.5) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def compare(baseline, current, args):
+    """[rows of the report, regressions]: a row is (program, metric, baseline, current, change, note)"""
+    rows = []
+    regressions = 0
+
+    for name, new in current.items():
+        old = baseline.get(name)
+        if old is None:
+            rows.append((name, "-", "-", "-", "-", "new program, not in the baselines"))
+            continue
+
+        if "normalized" in new and "normalized" in old:
+            oldMedian, newMedian = median(old["seconds"]), median(new["seconds"])
+            change = median(new["normalized"]) / median(old["normalized"]) - 1
+            p = mann_whitney_greater(new["normalized"], old["normalized"])
+            note = f"p={p:.3f}"
+            if change > args.max_slowdown and p < args.alpha:
+                note += "  REGRESSION"
+                regressions += 1
+            rows.append((name, "seconds (median)", f"{oldMedian * 1000:.2f}ms", f"{newMedian * 1000:.2f}ms", change, note))
+
+        if "peak_bytes" in new and "peak_bytes" in old:
+            change = new["peak_bytes"] / old["peak_bytes"] - 1
+            note = ""
+            if change > args.max_memory_increase:
+                note = "REGRESSION"
+                regressions += 1
+            # small differences come from the interpreter, only show the ones that matter
+            if abs(change) >= 0.01:
+                rows.append((name, "peak_bytes", str(old["peak_bytes"]), str(new["peak_bytes"]), change, note))
+
+        for counter in OUTPUT_COUNTERS:
+            if counter not in old:
+                continue
+            change = new[counter] / old[counter] - 1 if old[counter] else float(new[counter] > 0)
+            if change == 0:
+                continue
+            note = ""
+            if change > args.max_size_increase:
+                note = "REGRESSION"
+                regressions += 1
+            rows.append((name, counter, str(old[counter]), str(new[counter]), change, note))
+
+    for name in baseline:
+        if name not in current:
+            rows.append((name, "-", "-", "-", "-", "in the baselines but not measured"))
+
+    return [rows, regressions]
+
+
+def print_report(rows):
+    """The seconds of every timed program and every other metric that changed"""
+    # the change of the seconds is the change of the normalized times, the raw medians are shown for reference
+    print(f"{'program':<40} {'metric':<18} {'baseline':>10} {'now':>10} {'change':>8}  note")
+    for name, metric, old, new, change, note in rows:
+        change = f"{change * 100:+.2f}%" if isinstance(change, float) else change
+        print(f"{name:<40} {metric:<18} {old:>10} {new:>10} {change:>8}  {note}")
+
+
+def main():
+    argparser = argparse.ArgumentParser(description="Compare compile time, memory and output size against the stored baselines")
+    argparser.add_argument("--update", action="store_true", help="measure and store new baselines instead of comparing")
+    argparser.add_argument("--baselines", default=BASELINES, help="baseline file (default: benchmarks/baselines.json)")
+    argparser.add_argument("--processes", type=int, default=6, help="worker processes that time the programs")
+    argparser.add_argument("--samples", type=int, default=3, help="compiles per timed program in every worker")
+    argparser.add_argument("--skip-time", action="store_true", help="only check the memory and the output counters")
+    argparser.add_argument("--max-slowdown", type=float, default=0.15, help="allowed increase of the median compile time (0.15 = 15%%)")
+    argparser.add_argument("--alpha", type=float, default=0.01, help="significance level of the Mann-Whitney U test")
+    argparser.add_argument("--max-memory-increase", type=float, default=0.10, help="allowed increase of the peak memory")
+    argparser.add_argument("--max-size-increase", type=float, default=0.0, help="allowed increase of the output counters")
+    argparser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    argparser.add_argument("names", nargs="*", help=argparse.SUPPRESS)
+    args = argparser.parse_args()
+
+    if args.worker:
+        print(json.dumps(worker(args.names, args.samples)))
+        return
+
+    programs = benchmark_programs()
+    timed = [name for name in programs if not name.startswith("examples/")]
+    current = {name: measure_output(code, name in timed) for name, code in programs.items()}
+
+    if args.update or not args.skip_time:
+        for name, times in measure_times(timed, args.processes, args.samples).items():
+            current[name].update(times)
+
+    if args.update:
+        with open(args.baselines, "w") as baselineFile:
+            json.dump({"machine": machine(), "programs": current}, baselineFile, indent=1)
+            baselineFile.write("\n")
+        print(f"Stored the baselines of {len(current)} programs in {args.baselines}")
+        return
+
+    try:
+        with open(args.baselines) as baselineFile:
+            baseline = json.load(baselineFile)
+    except FileNotFoundError:
+        print(f"There are no baselines in {args.baselines}, record them with --update")
+        sys.exit(1)
+
+    if baseline["machine"] != machine() and not args.skip_time:
+        print(f"The baselines were recorded on {baseline['machine']}, this is {machine()}: the times may not be comparable (--skip-time)")
+        print()
+
+    rows, regressions = compare(baseline["programs"], current, args)
+    print_report(rows)
+
+    if regressions:
+        print(f"\n{regressions} regression(s) against {args.baselines}")
+        print("If the change is intended, record new baselines with: python -m benchmarks.regression --update")
+        sys.exit(1)
+
+    print(f"\nNo regressions against {args.baselines}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+ How the time of every stage grows with the size of the program
+
+ Every shape of benchmarks.programs is compiled at every size, the stages are timed with
+ compiler.timing (best of --repeat runs). The empirical complexity exponent of a stage is the
+ slope of log(time) against log(tokens): 1 is linear, 2 is quadratic. A stage that grows
+ faster than --max-exponent fails the run (exit code 1), stages that stay below --min-ms
+ at the largest size are too fast to fit and are only shown.
+
+ The garbage collector is turned off while a program is compiled (unless --gc): a collection
+ lands in whatever pass happens to be running and would look like superlinear growth there.
+
+ Usage: python -m benchmarks.scaling [--shapes mixed logical] [--sizes 250 500 1000 2000] [--json results.json]
+"""
+import argparse
+import gc
+import json
+import math
+import sys
+
+from benchmarks.programs import SHAPES, generate_program
+from compiler.assembly.ASM import createASMoutput
+from compiler.compile import compile_source
+from compiler.context import CompilationContext
+from compiler.parser.lexer import NewLexer
+from compiler.timing import PassTimer
+
+
+def time_stages(code, repeat, collect=False):
+    """{stage: best seconds} of compiling the code, the passes of createAsmCode are stages as well"""
+    best = {}
+    for _ in range(repeat):
+        gc.collect()
+        if not collect:
+            gc.disable()
+        try:
+            timer = PassTimer(memory=False)
+            context = CompilationContext()
+            AsmProgram = compile_source(code, context, timer)
+            with timer.measure("createASMoutput"):
+                createASMoutput(AsmProgram, context)
+        finally:
+            gc.enable()
+
+        for record in timer.records:
+            best[record.name] = min(best.get(record.name, math.inf), record.wall)
+
+    return best
+
+
+def count_tokens(code):
+    lexer = NewLexer(code)
+    lexer.startLexer()
+    return len(lexer.TOKENS)
+
+
+def exponent(sizes, times):
+    """Least squares slope of log(time) against log(size)"""
+    xs = [math.log(size) for size in sizes]
+    ys = [math.log(max(time, 1e-9)) for time in times]
+    meanX = sum(xs) / len(xs)
+    meanY = sum(ys) / len(ys)
+    variance = sum((x - meanX) ** 2 for x in xs)
+    if variance == 0:
+        return 0.0
+    return sum((x - meanX) * (y - meanY) for x, y in zip(xs, ys)) / variance
+
+
+def run_shape(shape, sizes, repeat, collect=False):
+    """[tokens per size, {stage: [seconds per size]}]"""
+    tokens = []
+    stages = {}
+    for size in sizes:
+        code = generate_program(shape, size)
+        tokens.append(count_tokens(code))
+        for stage, seconds in time_stages(code, repeat, collect).items():
+            stages.setdefault(stage, []).append(seconds)
+
+    return [tokens, stages]
+
+
+def main():
+    argparser = argparse.ArgumentParser(description="Time of every stage against the size of generated programs, with the complexity exponent")
+    argparser.add_argument("--shapes", nargs="+", choices=SHAPES, default=list(SHAPES), help="program shapes to run")
+    argparser.add_argument("--sizes", type=int, nargs="+", default=[250, 500, 1000, 2000], help="sizes of the programs (statements, terms or depth)")
+    argparser.add_argument("--repeat", type=int, default=3, help="runs per size, the best time is used")
+    argparser.add_argument("--max-exponent", type=float, default=1.4, help="fail when a stage grows faster than size^max-exponent")
+    argparser.add_argument("--min-ms", type=float, default=5.0, help="only check stages that take at least this long at the largest size")
+    argparser.add_argument("--gc", action="store_true", help="keep the garbage collector on while compiling")
+    argparser.add_argument("--json", help="also write the results to this file")
+    args = argparser.parse_args()
+
+    sizes = sorted(args.sizes)
+    results = {}
+    failures = []
+
+    for shape in args.shapes:
+        tokens, stages = run_shape(shape, sizes, args.repeat, args.gc)
+        results[shape] = {"sizes": sizes, "tokens": tokens, "stages": {}}
+
+        print(f"\n{shape} ({' / '.join(str(count) for count in tokens)} tokens)")
+        print(f"{'stage':<30}" + "".join(f"{size:>10}" for size in sizes) + f"{'exponent':>10}")
+        for stage, times in stages.items():
+            slope = exponent(tokens, times)
+            checked = times[-1] * 1000 >= args.min_ms
+            mark = ""
+            if checked and slope > args.max_exponent:
+                mark = "  <-- superlinear"
+                failures.append((shape, stage, slope))
+            elif not checked:
+                mark = "  (too fast)"
+            print(f"{stage:<30}" + "".join(f"{time * 1000:>8.2f}ms" for time in times) + f"{slope:>10.2f}{mark}")
+
+            results[shape]["stages"][stage] = {"seconds": times, "exponent": slope, "checked": checked}
+
+    if args.json:
+        with open(args.json, "w") as jsonFile:
+            json.dump(results, jsonFile, indent=2)
+
+    if failures:
+        print(f"\n{len(failures)} stage(s) grow faster than size^{args.max_exponent}:")
+        for shape, stage, slope in failures:
+            print(f"  {shape}: {stage} ({slope:.2f})")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+ Startup time of the binaries: gcc with libc (the default output), --freestanding and --no-gcc
+
+ The same program is built the three ways and every binary is started --runs times with
+ posix_spawn, the mean time from spawn to exit and the file size are shown.
+
+ Usage: python -m benchmarks.startup [file] [--runs N]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from compiler.assembly.ASM import createASMoutput
+from compiler.assembly.elf import elfExecutable, writeELF
+from compiler.assembly.encoder import encodeProgram
+from compiler.compile import compile_source, assemble_and_link
+from compiler.context import CompilationContext
+
+
+def build(source, directory):
+    """Build the source every way, gives back {mode: binary path}"""
+    context = CompilationContext()
+    AsmProgram = compile_source(source, context)
+    binaries = {}
+
+    for mode, freestanding in (("libc", False), ("freestanding", True)):
+        binaryFilePath = os.path.join(directory, mode)
+        error = assemble_and_link(AsmProgram, binaryFilePath, context, freestanding)
+        if error is not None:
+            raise RuntimeError(error)
+        binaries[mode] = binaryFilePath
+
+    binaries["no-gcc"] = os.path.join(directory, "no-gcc")
+    writeELF(elfExecutable(encodeProgram(AsmProgram)), binaries["no-gcc"], executable=True)
+
+    return binaries
+
+
+def startup_time(binaryFilePath, runs):
+    """Mean seconds from starting the binary until it exited, and its exit code"""
+    start = time.perf_counter()
+    for _ in range(runs):
+        pid = os.posix_spawn(binaryFilePath, [binaryFilePath], {})
+        _, status = os.waitpid(pid, 0)
+
+    return [(time.perf_counter() - start) / runs, os.waitstatus_to_exitcode(status)]
+
+
+def main():
+    argparser = argparse.ArgumentParser(description="Startup time of the default, freestanding and --no-gcc binaries")
+    argparser.add_argument("file", nargs="?", default=os.path.join("c_file_examples", "add_variables.c"), help=".c file to build")
+    argparser.add_argument("--runs", type=int, default=2000, help="times every binary is started")
+    args = argparser.parse_args()
+
+    with open(args.file) as sourceFile:
+        source = sourceFile.read()
+
+    with tempfile.TemporaryDirectory() as directory:
+        binaries = build(source, directory)
+
+        print(f"{'binary':<14} {'bytes':>8} {'startup (us)':>13} {'exit':>5}")
+        baseline = None
+        for mode, binaryFilePath in binaries.items():
+            seconds, exitCode = startup_time(binaryFilePath, args.runs)
+            baseline = baseline or seconds
+            print(f"{mode:<14} {os.path.getsize(binaryFilePath):>8} {seconds * 1e6:>13.1f} {exitCode:>5} ({baseline / seconds:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,17 @@
+import io
 import sys
 
 import compiler.tacky.tacky_ir as Tacky
-from compiler.parser.lexer import TokenType
+import compiler.tacky.tacky_array as TackyArray
+from compiler.interning import Flyweight
+from compiler.timing import NULL_TIMER
 
 
 # instruction
 # can be a not or neg operator
 class Unary:
     """Unary instruction, can be a Not or Neg operator"""
+    __slots__ = ("unary_operator", "operand")
     def __init__(self, unary_operator, operand):
         # unary_operator = Neg | Not
         self.unary_operator = unary_operator
@@ -18,6 +22,7 @@ class Unary:
 # instruction
 class Binary:
     """Binary instruction"""
+    __slots__ = ("binary_operator", "operand1", "operand2")
     def __init__(self, binary_operator, operand1, operand2):
         # unary_operator = Neg | Not
         self.binary_operator = binary_operator
@@ -34,6 +39,7 @@ class Binary:
 # instruction
 class Cmp:
     """Compare instruction compare the given operands, will set a Status flag after this instruction"""
+    __slots__ = ("operand1", "operand2")
     def __init__(self, operand1, operand2):
         # operand = Imm(int) | Reg(reg) | Pseudo(identifier) | Stack(int)
         self.operand1 = operand1
@@ -44,8 +50,9 @@ class Cmp:
 
 
 # instruction
-class Cdq:
+class Cdq(Flyweight):
     """Convert word to doubleword or convert doubleword to quadword in the EDX:EAX register"""
+    __slots__ = ()
     def __str__(self) -> str:
         return "cdq"
 
@@ -53,6 +60,7 @@ class Cdq:
 # instruction
 class Jmp:
     """Just jump instruction does not vary"""
+    __slots__ = ("identifier",)
     def __init__(self, identifier):
         # identifier = label AKA text
         self.identifier = identifier
@@ -64,6 +72,7 @@ class Jmp:
 # instruction
 class JmpCC:
     """Jump instruction usage can vary depending on the condition"""
+    __slots__ = ("cond_code", "identifier")
     def __init__(self, cond_code, identifier):
         # cond_code = E | NE | G | GE | L | LE
         self.cond_code = cond_code
@@ -77,6 +86,7 @@ class JmpCC:
 # instruction
 class SetCC:
     """Set the destination operand to 0 or 1 depending on the Status Flags"""
+    __slots__ = ("cond_code", "operand")
     def __init__(self, cond_code, operand):
         # cond_code = E | NE | G | GE | L | LE
         self.cond_code = cond_code
@@ -89,6 +99,7 @@ class SetCC:
 
 class Label:
     """A label used for jumps"""
+    __slots__ = ("identifier",)
     def __init__(self, identifier):
         self.identifier = identifier
 
@@ -99,6 +110,7 @@ class Label:
 # instruction
 class Idiv:
     """Instruction that divides value by EAX register"""
+    __slots__ = ("operand",)
     def __init__(self, operand):
         # operand = Imm(int) | Reg(reg) | Pseudo(identifier) | Stack(int)
         self.operand = operand
@@ -108,50 +120,50 @@ class Idiv:
 
 
 # binary_operator
-class Mult:
+class Mult(Flyweight):
     """Multiply operator"""
-    def __init__(self) -> None:
-        self.val = "imull"
+    __slots__ = ()
+    val = "imull"
 
     def __str__(self) -> str:
         return f"{self.val}"
 
 
 # binary_operator
-class Sub:
+class Sub(Flyweight):
     """Subtract operator"""
-    def __init__(self) -> None:
-        self.val = "sub"
+    __slots__ = ()
+    val = "sub"
 
     def __str__(self) -> str:
         return f"{self.val}"
 
 
 # binary_operator
-class Add:
+class Add(Flyweight):
     """Add operator"""
-    def __init__(self) -> None:
-        self.val = "add"
+    __slots__ = ()
+    val = "add"
 
     def __str__(self) -> str:
         return f"{self.val}"
 
 
 # unary_operator
-class Not:
+class Not(Flyweight):
     """Unary Not (~) operator"""
-    def __init__(self):
-        self.val = "notl"
+    __slots__ = ()
+    val = "notl"
 
     def __str__(self):
         return f"{self.val}"
 
 
 # unary_operator
-class Neg:
+class Neg(Flyweight):
     """Unary negate (!) operator"""
-    def __init__(self):
-        self.val = "negl"
+    __slots__ = ()
+    val = "negl"
 
     def __str__(self):
         return f"{self.val}"
@@ -162,17 +174,19 @@ class Neg:
 # subq {int}, %rsp
 class AllocateStack:
     """How much to allocate the stack by at the beginning of the program. Indicates the number of bytes we subtract from the RSP"""
+    __slots__ = ("int",)
     def __init__(self, intval):
         self.int = intval
 
     def __str__(self):
-        # *4 because we use bytes
-        return f"-{self.int*4}"
+        # *4 because we use bytes, subq moves %rsp down below the stack slots
+        return f"{self.int*4}"
 
 
 # operand
 class Stack:
     """Stack allocation operand"""
+    __slots__ = ("int",)
     def __init__(self, intval):
         self.int = intval
 
@@ -183,49 +197,56 @@ class Stack:
 # operand
 class Pseudo:
     """Pseudo operand, used to identify variables"""
+    __slots__ = ("identifier",)
     def __init__(self, identifier):
         self.identifier = identifier
 
 
 # cond_code
 # cond_code = E | NE | G | GE | L | LE
-class E:
+class E(Flyweight):
     """Condition code used in SetCC and JmpCC"""
+    __slots__ = ()
     def __str__(self) -> str:
         return "e"
 
 
 # cond_code
-class NE:
+class NE(Flyweight):
     """Condition code used in SetCC and JmpCC"""
+    __slots__ = ()
     def __str__(self) -> str:
         return "ne"
 
 
 # cond_code
-class G:
+class G(Flyweight):
     """Condition code used in SetCC and JmpCC"""
+    __slots__ = ()
     def __str__(self) -> str:
         return "g"
 
 
 # cond_code
-class GE:
+class GE(Flyweight):
     """Condition code used in SetCC and JmpCC"""
+    __slots__ = ()
     def __str__(self) -> str:
         return "ge"
 
 
 # cond_code
-class L:
+class L(Flyweight):
     """Condition code used in SetCC and JmpCC"""
+    __slots__ = ()
     def __str__(self) -> str:
         return "l"
 
 
 # cond_code
-class LE:
+class LE(Flyweight):
     """Condition code used in SetCC and JmpCC"""
+    __slots__ = ()
     def __str__(self) -> str:
         return "le"
 
@@ -234,6 +255,7 @@ class LE:
 # reg = AX | DX | R10 | R11
 class Reg:
     """Which register we use"""
+    __slots__ = ("reg",)
     def __init__(self, reg):
         self.reg = reg
 
@@ -244,15 +266,28 @@ class Reg:
 # operand
 class AsmImmediateValue(int):
     """An immediate value like: 5, 6, 7, etc..."""
+    __slots__ = ()
     def __str__(self) -> str:
         return f"${super().__str__()}"
 
 
+# Shared operands and operators, the backend compares these by identity
+AX = Reg("eax")
+DX = Reg("edx")
+R10 = Reg("r10d")
+R11 = Reg("r11d")
+ZERO = AsmImmediateValue(0)
+
+ADD = Add()
+SUB = Sub()
+MULT = Mult()
+
+
 # instruction
-class AsmInstructionRet:
+class AsmInstructionRet(Flyweight):
     """Return instruction"""
-    def __init__(self):
-        self.val = "ret"
+    __slots__ = ()
+    val = "ret"
 
     def __str__(self) -> str:
         return "ret"
@@ -261,6 +296,7 @@ class AsmInstructionRet:
 # instruction
 class AsmInstructionMov:
     """Mov instruction"""
+    __slots__ = ("src", "dst")
     def __init__(self, src, dst):
         # operand = Imm(int) | Reg(reg) | Pseudo(identifier) | Stack(int)
         self.src = src
@@ -273,6 +309,7 @@ class AsmInstructionMov:
 
 class AsmFunctionDef:
     """The instruction list for all functions are stored in here"""
+    __slots__ = ("name", "instructions")
     def __init__(self, name, instructionslist):
         self.name = name
         self.instructions = instructionslist
@@ -280,531 +317,392 @@ class AsmFunctionDef:
 
 class AsmProgram:
     """The functions are stored in here"""
+    __slots__ = ("function_definition",)
     def __init__(self, function_definition):
         self.function_definition = function_definition
 
 
+# (TACKY class) or (TACKY class, operator class) -> function that appends the ASM instructions
+# a selector is called as selector(operator class, arg1, arg2, arg3, ASMInstructions) with the ASM operands
+# and labels of the instruction, the TACKY objects and the rows of the compact TACKY IR use the same selectors
+INSTRUCTION_SELECTORS = {}
+
+# E = Equal, NE = NotEqual, G = Greater Than, GE = GreaterThanEqual, L = Lower than, LE = LowerThanEqual
+RELATIONAL_CONDITIONS = {
+    Tacky.Equal: E,
+    Tacky.NotEqual: NE,
+    Tacky.LessThan: L,
+    Tacky.LessOrEqual: LE,
+    Tacky.GreaterThan: G,
+    Tacky.GreaterOrEqual: GE,
+}
+
+ARITHMETIC_OPERATORS = {
+    Tacky.Add: Add,
+    Tacky.Subtract: Sub,
+    Tacky.Multiply: Mult,
+}
+
+UNARY_OPERATORS = {
+    Tacky.Negate: Neg,
+    Tacky.Complement: Not,
+}
+
+# the register that holds the result of idiv
+DIVISION_RESULTS = {
+    Tacky.Divide: AX,
+    Tacky.Remainder: DX,
+}
+
+
+def selectInstruction(tackyType, *operatorTypes):
+    """Register the function that turns a TACKY instruction (with one of the given operators) into ASM instructions"""
+    def register(selector):
+        if not operatorTypes:
+            INSTRUCTION_SELECTORS[tackyType] = selector
+
+        for operatorType in operatorTypes:
+            INSTRUCTION_SELECTORS[(tackyType, operatorType)] = selector
+
+        return selector
+
+    return register
+
+
+def selectorKey(tackyType, operatorType):
+    """The key of the selector of a TACKY instruction in INSTRUCTION_SELECTORS"""
+    return tackyType if operatorType is None else (tackyType, operatorType)
+
+
+def convertOperand(val):
+    """Turn a TACKY value into an ASM operand"""
+    if isinstance(val, Tacky.Var):
+        return Pseudo(val.name)
+    elif isinstance(val, Tacky.Constant):
+        return AsmImmediateValue(val.int)
+
+    print(f"ERROR: Got an unknown value, when creating Assembly AST: {val}")
+    sys.exit()
+
+
+# TACKY class -> function that gives back the (operator class, arg1, arg2, arg3) of an instruction object
+TACKY_ROWS = {
+    Tacky.Return: lambda instruction: (None, convertOperand(instruction.val), None, None),
+    Tacky.Copy: lambda instruction: (None, convertOperand(instruction.src), convertOperand(instruction.dst), None),
+    Tacky.Jump: lambda instruction: (None, instruction.target, None, None),
+    Tacky.JumpIfZero: lambda instruction: (None, convertOperand(instruction.condition), instruction.target, None),
+    Tacky.JumpIfNotZero: lambda instruction: (None, convertOperand(instruction.condition), instruction.target, None),
+    Tacky.Label: lambda instruction: (None, instruction.identifier, None, None),
+    Tacky.UnaryTacky: lambda instruction: (type(instruction.unary_operator.operator), convertOperand(instruction.src), convertOperand(instruction.dst), None),
+    Tacky.Binary: lambda instruction: (type(instruction.operator), convertOperand(instruction.src1), convertOperand(instruction.src2), convertOperand(instruction.dst)),
+}
+
+
+@selectInstruction(Tacky.UnaryTacky, Tacky.Not)
+def selectNot(operator, src, dst, _, ASMInstructions):
+    ASMInstructions.append(Cmp(ZERO, src))
+    ASMInstructions.append(AsmInstructionMov(ZERO, dst))
+    ASMInstructions.append(SetCC(E(), dst))
+
+
+@selectInstruction(Tacky.UnaryTacky, Tacky.Negate, Tacky.Complement)
+def selectUnary(operator, src, dst, _, ASMInstructions):
+    ASMInstructions.append(AsmInstructionMov(src, dst))
+    ASMInstructions.append(Unary(UNARY_OPERATORS[operator](), dst))
+
+
+@selectInstruction(Tacky.Binary, Tacky.Divide, Tacky.Remainder)
+def selectDivision(operator, src1, src2, dst, ASMInstructions):
+    ASMInstructions.append(AsmInstructionMov(src1, AX))
+    ASMInstructions.append(Cdq())
+    ASMInstructions.append(Idiv(src2))
+    ASMInstructions.append(AsmInstructionMov(DIVISION_RESULTS[operator], dst))
+
+
+@selectInstruction(Tacky.Binary, Tacky.Add, Tacky.Subtract, Tacky.Multiply)
+def selectArithmetic(operator, src1, src2, dst, ASMInstructions):
+    ASMInstructions.append(AsmInstructionMov(src1, dst))
+    ASMInstructions.append(Binary(ARITHMETIC_OPERATORS[operator](), src2, dst))
+
+
+# binary_operator = Add | Subtract | Multiply | Divide | Remainder | Equal | NotEqual
+#                   | LessThan | LessOrEqual | GreaterThan | GreaterOrEqual
+@selectInstruction(Tacky.Binary, *RELATIONAL_CONDITIONS)
+def selectRelational(operator, src1, src2, dst, ASMInstructions):
+    ASMInstructions.append(Cmp(src2, src1))
+    ASMInstructions.append(AsmInstructionMov(ZERO, dst))
+    ASMInstructions.append(SetCC(RELATIONAL_CONDITIONS[operator](), dst))
+
+
+@selectInstruction(Tacky.Jump)
+def selectJump(operator, target, _, __, ASMInstructions):
+    ASMInstructions.append(Jmp(target))
+
+
+@selectInstruction(Tacky.Label)
+def selectLabel(operator, identifier, _, __, ASMInstructions):
+    ASMInstructions.append(Label(identifier))
+
+
+@selectInstruction(Tacky.Copy)
+def selectCopy(operator, src, dst, _, ASMInstructions):
+    ASMInstructions.append(AsmInstructionMov(src, dst))
+
+
+@selectInstruction(Tacky.JumpIfZero)
+def selectJumpIfZero(operator, condition, target, _, ASMInstructions):
+    ASMInstructions.append(Cmp(ZERO, condition))
+    ASMInstructions.append(JmpCC(E(), target))
+
+
+@selectInstruction(Tacky.JumpIfNotZero)
+def selectJumpIfNotZero(operator, condition, target, _, ASMInstructions):
+    ASMInstructions.append(Cmp(ZERO, condition))
+    ASMInstructions.append(JmpCC(NE(), target))
+
+
+@selectInstruction(Tacky.Return)
+def selectReturn(operator, val, _, __, ASMInstructions):
+    ASMInstructions.append(AsmInstructionMov(val, AX))
+    ASMInstructions.append(AsmInstructionRet())
+
+
+def createArraySelectors():
+    """[(selector, operator class)] of every opcode of the compact TACKY IR, indexed by opcode, out of INSTRUCTION_SELECTORS"""
+    selectors = []
+    for opcode in range(len(TackyArray.OPCODE_INSTRUCTIONS)):
+        operator = TackyArray.OPCODE_OPERATORS.get(opcode)
+        selector = INSTRUCTION_SELECTORS.get(selectorKey(TackyArray.OPCODE_INSTRUCTIONS[opcode], operator))
+        if selector is None:
+            print(f"ERROR: There is no instruction selector for the TACKY opcode {TackyArray.OPCODE_NAMES[opcode]}")
+            sys.exit()
+        selectors.append((selector, operator))
+
+    return selectors
+
+
+class PseudoOperands(dict):
+    """symbol id -> the Pseudo operand of the variable, made the first time it is asked for"""
+    __slots__ = ()
+
+    def __missing__(self, identifier):
+        operand = self[identifier] = Pseudo(identifier)
+        return operand
+
+
+def noOperand(arg):
+    return None
+
+
+def createInstructionsListFromArray(tackyFunction):
+    """Select the ASM instructions of a compact TACKY function (TackyArrayFunction)"""
+    # kind of an argument -> function that turns the argument into its ASM operand (or label),
+    # every variable gets a single Pseudo that is shared by all the instructions using it
+    operands = [None] * (TackyArray.KIND_MASK + 1)
+    operands[TackyArray.NO_VALUE] = noOperand
+    operands[TackyArray.VAR] = PseudoOperands().__getitem__
+    operands[TackyArray.CONSTANT] = AsmImmediateValue
+    operands[TackyArray.LABEL] = tackyFunction.symbols.name
+    mask = TackyArray.KIND_MASK
+    bits = TackyArray.KIND_BITS
+
+    ASMInstructions = []
+    selectors = createArraySelectors()
+
+    for opcode, kinds, arg1, arg2, arg3 in tackyFunction.rows():
+        selector, operator = selectors[opcode]
+        selector(operator, operands[kinds & mask](arg1), operands[kinds >> bits & mask](arg2), operands[kinds >> 2 * bits](arg3), ASMInstructions)
+
+    return ASMInstructions
+
+
 def createInstructionsList(tackyInstructions):
+    if isinstance(tackyInstructions, TackyArray.TackyArrayFunction):
+        return createInstructionsListFromArray(tackyInstructions)
+
     ASMInstructions = []
-    for instruction in tackyInstructions:
-        # This means we have an Unary
-        if isinstance(instruction, Tacky.UnaryTacky):
-
-            if isinstance(instruction.unary_operator.operator, Tacky.Not):
-                cmpSrc = None
-                movDst = None
-
-                if isinstance(instruction.src, Tacky.Constant):
-                    cmpSrc = AsmImmediateValue(instruction.src.int)
-                elif isinstance(instruction.src, Tacky.Var):
-                    cmpSrc = Pseudo(instruction.src.name)
-
-                if isinstance(instruction.dst, Tacky.Constant):
-                    movDst = AsmImmediateValue(instruction.dst.int)
-                elif isinstance(instruction.dst, Tacky.Var):
-                    movDst = Pseudo(instruction.dst.name)
-
-                assert cmpSrc is not None
-                assert movDst is not None
-
-                ASMInstructions.append(Cmp(AsmImmediateValue(0), cmpSrc))
-                ASMInstructions.append(AsmInstructionMov(AsmImmediateValue(0), movDst))
-                ASMInstructions.append(SetCC(E(), movDst))
-
-            else:
-                movSrc = None
-                movDst = None
-                new_unary_operator = None
-
-                if isinstance(instruction.src, Tacky.Constant):
-                    movSrc = AsmImmediateValue(instruction.src.int)
-                elif isinstance(instruction.src, Tacky.Var):
-                    movSrc = Pseudo(instruction.src.name)
-
-                if isinstance(instruction.dst, Tacky.Constant):
-                    movDst = AsmImmediateValue(instruction.dst.int)
-                elif isinstance(instruction.dst, Tacky.Var):
-                    movDst = Pseudo(instruction.dst.name)
-
-                if instruction.unary_operator.operator == TokenType.UNARY_NEGATE:
-                    new_unary_operator = Neg()
-                elif instruction.unary_operator.operator == TokenType.UNARY_TILDE:
-                    new_unary_operator = Not()
-
-                assert movSrc is not None
-                assert movDst is not None
-                assert new_unary_operator is not None
-
-                ASMInstructions.append(AsmInstructionMov(movSrc, movDst))
-                ASMInstructions.append(Unary(new_unary_operator, movDst))
-
-        # This means we have a binary
-        elif isinstance(instruction, Tacky.Binary):
-
-            if isinstance(instruction.operator, Tacky.Divide) or isinstance(instruction.operator, Tacky.Remainder):
-                dst = None
-                register = None
-                idiv = None
-                src1Mov = None
-
-                if isinstance(instruction.src1, Tacky.Constant):
-                    src1Mov = AsmInstructionMov(AsmImmediateValue(instruction.src1.int), Reg("EAX"))
-                elif isinstance(instruction.src1, Tacky.Var):
-                    src1Mov = AsmInstructionMov(Pseudo(instruction.src1.name), Reg("EAX"))
-
-                if isinstance(instruction.src2, Tacky.Constant):
-                    idiv = Idiv(AsmImmediateValue(instruction.src2.int))
-                elif isinstance(instruction.src2, Tacky.Var):
-                    idiv = Idiv(Pseudo(instruction.src2.name))
-
-                if isinstance(instruction.dst, Tacky.Constant):
-                    dst = AsmImmediateValue(instruction.dst.int)
-                elif isinstance(instruction.dst, Tacky.Var):
-                    dst = Pseudo(instruction.dst.name)
-
-                if isinstance(instruction.operator, Tacky.Divide):
-                    register = "EAX"
-                elif isinstance(instruction.operator, Tacky.Remainder):
-                    register = "EDX"
-
-                assert dst is not None
-                assert register is not None
-                assert idiv is not None
-                assert src1Mov is not None
-
-                ASMInstructions.append(src1Mov)
-                ASMInstructions.append(Cdq())
-                ASMInstructions.append(idiv)
-                ASMInstructions.append(AsmInstructionMov(Reg(register), dst))
-
-                continue
-
-            elif (
-                isinstance(instruction.operator, Tacky.Add)
-                or isinstance(instruction.operator, Tacky.Subtract)
-                or isinstance(instruction.operator, Tacky.Multiply)
-            ):
-
-                dst = None
-                src1 = None
-                src2 = None
-                new_operator = None
-
-                if isinstance(instruction.dst, Tacky.Constant):
-                    dst = AsmImmediateValue(instruction.dst.int)
-                elif isinstance(instruction.dst, Tacky.Var):
-                    dst = Pseudo(instruction.dst.name)
-
-                if isinstance(instruction.src1, Tacky.Constant):
-                    src1 = AsmImmediateValue(instruction.src1.int)
-                elif isinstance(instruction.src1, Tacky.Var):
-                    src1 = Pseudo(instruction.src1.name)
-
-                if isinstance(instruction.src2, Tacky.Constant):
-                    src2 = AsmImmediateValue(instruction.src2.int)
-                elif isinstance(instruction.src2, Tacky.Var):
-                    src2 = Pseudo(instruction.src2.name)
-
-                if isinstance(instruction.operator, Tacky.Add):
-                    new_operator = Add()
-                elif isinstance(instruction.operator, Tacky.Subtract):
-                    new_operator = Sub()
-                elif isinstance(instruction.operator, Tacky.Multiply):
-                    new_operator = Mult()
-
-                assert dst is not None
-                assert src1 is not None
-                assert src2 is not None
-                assert new_operator is not None
-
-                ASMInstructions.append(AsmInstructionMov(src1, dst))
-                ASMInstructions.append(Binary(new_operator, src2, dst))
-
-                continue
-
-            # binary_operator = Add | Subtract | Multiply | Divide | Remainder | Equal | NotEqual
-            #                   | LessThan | LessOrEqual | GreaterThan | GreaterOrEqual
-            elif (
-                isinstance(instruction.operator, Tacky.Equal)
-                or isinstance(instruction.operator, Tacky.NotEqual)
-                or isinstance(instruction.operator, Tacky.LessThan)
-                or isinstance(instruction.operator, Tacky.LessOrEqual)
-                or isinstance(instruction.operator, Tacky.GreaterThan)
-                or isinstance(instruction.operator, Tacky.GreaterOrEqual)
-            ):
-                cmpSrc1 = None
-                cmpSrc2 = None
-                dst = None
-                relational_operator = None
-
-                if isinstance(instruction.src2, Tacky.Constant):
-                    cmpSrc2 = AsmImmediateValue(instruction.src2.int)
-                elif isinstance(instruction.src2, Tacky.Var):
-                    cmpSrc2 = Pseudo(instruction.src2.name)
-
-                if isinstance(instruction.src1, Tacky.Constant):
-                    cmpSrc1 = AsmImmediateValue(instruction.src1.int)
-                elif isinstance(instruction.src1, Tacky.Var):
-                    cmpSrc1 = Pseudo(instruction.src1.name)
-
-                if isinstance(instruction.dst, Tacky.Constant):
-                    dst = AsmImmediateValue(instruction.dst.int)
-                elif isinstance(instruction.dst, Tacky.Var):
-                    dst = Pseudo(instruction.dst.name)
-
-                # E = Equal, NE = NotEqual, G = Greater Than, GE = GreaterThanEqual, L = Lower than, LE = LowerThanEqual
-                if isinstance(instruction.operator, Tacky.Equal):
-                    relational_operator = E()
-                elif isinstance(instruction.operator, Tacky.NotEqual):
-                    relational_operator = NE()
-                elif isinstance(instruction.operator, Tacky.LessThan):
-                    relational_operator = L()
-                elif isinstance(instruction.operator, Tacky.LessOrEqual):
-                    relational_operator = LE()
-                elif isinstance(instruction.operator, Tacky.GreaterThan):
-                    relational_operator = G()
-                elif isinstance(instruction.operator, Tacky.GreaterOrEqual):
-                    relational_operator = GE()
-
-                assert cmpSrc1 is not None
-                assert cmpSrc2 is not None
-                assert dst is not None
-                assert relational_operator is not None
-
-                ASMInstructions.append(Cmp(cmpSrc2, cmpSrc1))
-                ASMInstructions.append(AsmInstructionMov(AsmImmediateValue(0), dst))
-                ASMInstructions.append(SetCC(relational_operator, dst))
-
-            else:
-                print(f"ERROR: Got an unknown instruction, when creating Assembly AST: {instruction.operator.operator}")
-                sys.exit()
-
-        elif isinstance(instruction, Tacky.Jump):
-            ASMInstructions.append(Jmp(instruction.target))
-
-        elif isinstance(instruction, Tacky.Label):
-            ASMInstructions.append(Label(instruction.identifier))
-
-        elif isinstance(instruction, Tacky.Copy):
-            src = None
-            dst = None
-
-            if isinstance(instruction.src, Tacky.Constant):
-                src = AsmImmediateValue(instruction.src.int)
-            elif isinstance(instruction.src, Tacky.Var):
-                src = Pseudo(instruction.src.name)
-
-            if isinstance(instruction.dst, Tacky.Constant):
-                dst = AsmImmediateValue(instruction.dst.int)
-            elif isinstance(instruction.dst, Tacky.Var):
-                dst = Pseudo(instruction.dst.name)
-
-            assert src is not None
-            assert dst is not None
-
-            ASMInstructions.append(AsmInstructionMov(src, dst))
-
-        elif isinstance(instruction, Tacky.JumpIfZero):
-            condition = None
-
-            if isinstance(instruction.condition, Tacky.Constant):
-                condition = AsmImmediateValue(instruction.condition.int)
-            elif isinstance(instruction.condition, Tacky.Var):
-                condition = Pseudo(instruction.condition.name)
-
-            assert condition is not None
-
-            ASMInstructions.append(Cmp(AsmImmediateValue(0), condition))
-            ASMInstructions.append(JmpCC(E(), instruction.target))
-
-        elif isinstance(instruction, Tacky.JumpIfNotZero):
-            condition = None
-
-            if isinstance(instruction.condition, Tacky.Constant):
-                condition = AsmImmediateValue(instruction.condition.int)
-            elif isinstance(instruction.condition, Tacky.Var):
-                condition = Pseudo(instruction.condition.name)
-
-            assert condition is not None
-
-            ASMInstructions.append(Cmp(AsmImmediateValue(0), condition))
-            ASMInstructions.append(JmpCC(NE(), instruction.target))
-
-        # This means we have a return statement
-        elif isinstance(instruction, Tacky.Return):
-            movSrc = None
+    selectors = INSTRUCTION_SELECTORS
+    rows = TACKY_ROWS
 
-            if isinstance(instruction.val, Tacky.Constant):
-                movSrc = AsmImmediateValue(instruction.val.int)
-            elif isinstance(instruction.val, Tacky.Var):
-                movSrc = Pseudo(instruction.val.name)
+    for instruction in tackyInstructions:
+        instructionType = type(instruction)
+        getRow = rows.get(instructionType)
+        if getRow is None:
+            # not an instruction (the value of an expression statement), nothing to generate
+            continue
 
-            assert movSrc is not None
+        operator, arg1, arg2, arg3 = getRow(instruction)
+        selector = selectors.get(selectorKey(instructionType, operator))
+        if selector is None:
+            print(f"ERROR: Got an unknown instruction, when creating Assembly AST: {operator}")
+            sys.exit()
 
-            ASMInstructions.append(AsmInstructionMov(movSrc, Reg("eax")))
-            ASMInstructions.append(AsmInstructionRet())
+        selector(operator, arg1, arg2, arg3, ASMInstructions)
 
     return ASMInstructions
 
 
-def pseudoToStack(ASMinstructions):
-    pseudoRegisters = {}
-    registerCount = 0
-
-    for i, instruction in enumerate(ASMinstructions):
-        match instruction:
-            case value if isinstance(value, Unary):
-                # if the operand is not Pseudo then we should continue
-                if not isinstance(instruction.operand, Pseudo):
-                    continue
-
-                # check if the stack address is not already in pseudoRegisters
-                if instruction.operand.identifier not in pseudoRegisters:
-                    stackInstructionCount = (registerCount + 1) * -4
-                    registerCount += 1
-                    pseudoRegisters[instruction.operand.identifier] = stackInstructionCount
-                else:
-                    stackInstructionCount = pseudoRegisters[instruction.operand.identifier]
-
-                # DEBUGGING
-
-                ASMinstructions[i].operand = Stack(stackInstructionCount)
-            case value if isinstance(value, Binary):
-                # if the dst or src is not Pseudo then we should continue
-                if not isinstance(instruction.operand1, Pseudo) and not isinstance(instruction.operand2, Pseudo):
-                    continue
-
-                stackInstructionCount = (registerCount + 1) * -4
-
-                if isinstance(instruction.operand1, Pseudo):
-                    # check if the stack address is not already in pseudoRegisters
-                    if instruction.operand1.identifier not in pseudoRegisters:
-                        stackInstructionCount = (registerCount + 1) * -4
-                        registerCount += 1
-                        pseudoRegisters[instruction.operand1.identifier] = stackInstructionCount
-                    else:
-                        stackInstructionCount = pseudoRegisters[instruction.operand1.identifier]
-
-                    ASMinstructions[i].operand1 = Stack(stackInstructionCount)
-
-                if isinstance(instruction.operand2, Pseudo):
-                    # check if the stack address is not already in pseudoRegisters
-                    if instruction.operand2.identifier not in pseudoRegisters:
-                        stackInstructionCount = (registerCount + 1) * -4
-                        registerCount += 1
-                        pseudoRegisters[instruction.operand2.identifier] = stackInstructionCount
-                    else:
-                        stackInstructionCount = pseudoRegisters[instruction.operand2.identifier]
-
-                    ASMinstructions[i].operand2 = Stack(stackInstructionCount)
-
-            case value if isinstance(value, Idiv):
-                # if the dst or src is not Pseudo then we should continue
-                if not isinstance(instruction.operand, Pseudo):
-                    continue
-
-                stackInstructionCount = (registerCount + 1) * -4
-
-                if isinstance(instruction.operand, Pseudo):
-                    if instruction.operand.identifier not in pseudoRegisters:
-                        stackInstructionCount = (registerCount + 1) * -4
-                        registerCount += 1
-                        pseudoRegisters[instruction.operand.identifier] = stackInstructionCount
-                    else:
-                        stackInstructionCount = pseudoRegisters[instruction.operand.identifier]
-
-                    ASMinstructions[i].operand = Stack(stackInstructionCount)
-
-            case value if isinstance(value, AsmInstructionMov):
-                # if the dst or src is not Pseudo then we should continue
-                if not isinstance(instruction.src, Pseudo) and not isinstance(instruction.dst, Pseudo):
-                    continue
-
-                stackInstructionCount = (registerCount + 1) * -4
-
-                if isinstance(instruction.src, Pseudo):
-                    # check if the stack address is not already in pseudoRegisters
-                    if instruction.src.identifier not in pseudoRegisters:
-                        stackInstructionCount = (registerCount + 1) * -4
-                        registerCount += 1
-                        pseudoRegisters[instruction.src.identifier] = stackInstructionCount
-                    else:
-                        stackInstructionCount = pseudoRegisters[instruction.src.identifier]
-
-                    ASMinstructions[i].src = Stack(stackInstructionCount)
-
-                if isinstance(instruction.dst, Pseudo):
-                    # check if the stack address is not already in pseudoRegisters
-                    if instruction.dst.identifier not in pseudoRegisters:
-                        stackInstructionCount = (registerCount + 1) * -4
-                        registerCount += 1
-                        pseudoRegisters[instruction.dst.identifier] = stackInstructionCount
-                    else:
-                        stackInstructionCount = pseudoRegisters[instruction.dst.identifier]
-
-                    instruction.dst = Stack(stackInstructionCount)
-
-            case value if isinstance(value, Cmp):
-                # if the dst or src is not Pseudo then we should continue
-                if not isinstance(instruction.operand1, Pseudo) and not isinstance(instruction.operand2, Pseudo):
-                    continue
-
-                stackInstructionCount = (registerCount + 1) * -4
-
-                if isinstance(instruction.operand1, Pseudo):
-                    # check if the stack address is not already in pseudoRegisters
-                    if instruction.operand1.identifier not in pseudoRegisters:
-                        stackInstructionCount = (registerCount + 1) * -4
-                        registerCount += 1
-                        pseudoRegisters[instruction.operand1.identifier] = stackInstructionCount
-                    else:
-                        stackInstructionCount = pseudoRegisters[instruction.operand1.identifier]
-
-                    ASMinstructions[i].operand1 = Stack(stackInstructionCount)
-
-                if isinstance(instruction.operand2, Pseudo):
-                    # check if the stack address is not already in pseudoRegisters
-                    if instruction.operand2.identifier not in pseudoRegisters:
-                        stackInstructionCount = (registerCount + 1) * -4
-                        registerCount += 1
-                        pseudoRegisters[instruction.operand2.identifier] = stackInstructionCount
-                    else:
-                        stackInstructionCount = pseudoRegisters[instruction.operand2.identifier]
-
-                    ASMinstructions[i].operand2 = Stack(stackInstructionCount)
-
-            case value if isinstance(value, SetCC):
-                # if the dst or src is not Pseudo then we should continue
-                if not isinstance(instruction.operand, Pseudo):
-                    continue
-
-                stackInstructionCount = (registerCount + 1) * -4
-
-                if isinstance(instruction.operand, Pseudo):
-                    # check if the stack address is not already in pseudoRegisters
-                    if instruction.operand.identifier not in pseudoRegisters:
-                        stackInstructionCount = (registerCount + 1) * -4
-                        registerCount += 1
-                        pseudoRegisters[instruction.operand.identifier] = stackInstructionCount
-                    else:
-                        stackInstructionCount = pseudoRegisters[instruction.operand.identifier]
-
-                    ASMinstructions[i].operand = Stack(stackInstructionCount)
-
-    return ASMinstructions, registerCount
-
-
-def fixInvalidCmpInstructions(ASMinstructions):
-    newInstructions = []
-    for instruction in ASMinstructions:
-        # instruction is not a Mov instruction, so do nothing
-        if not isinstance(instruction, Cmp):
-            newInstructions.append(instruction)
-            continue
+def stackOperand(operand, pseudoRegisters):
+    """Give back the Stack operand of a Pseudo operand, every new identifier gets the next stack slot"""
+    if not isinstance(operand, Pseudo):
+        return operand
 
-        # there is nothing to fix
-        if isinstance(instruction.operand1, Stack) and isinstance(instruction.operand2, Stack):
-            newInstructions.append(AsmInstructionMov(instruction.operand1, Reg("r10d")))
-            newInstructions.append(Cmp(Reg("r10d"), instruction.operand2))
+    stack = pseudoRegisters.get(operand.identifier)
+    if stack is None:
+        # the first slot is at -4(%rbp), the second at -8(%rbp), ...
+        stack = Stack((len(pseudoRegisters) + 1) * -4)
+        pseudoRegisters[operand.identifier] = stack
 
-        elif isinstance(instruction.operand2, AsmImmediateValue):
-            newInstructions.append(AsmInstructionMov(instruction.operand2, Reg("r11d")))
-            newInstructions.append(Cmp(instruction.operand1, Reg("r11d")))
+    return stack
 
-        else:
-            newInstructions.append(instruction)
-            continue
 
-    return newInstructions
+def pseudoToStackInstruction(instruction, pseudoRegisters):
+    """Replace the Pseudo operands of a single instruction with Stack operands"""
+    instructionType = type(instruction)
 
+    if instructionType is AsmInstructionMov:
+        instruction.src = stackOperand(instruction.src, pseudoRegisters)
+        instruction.dst = stackOperand(instruction.dst, pseudoRegisters)
+    elif instructionType is Binary or instructionType is Cmp:
+        instruction.operand1 = stackOperand(instruction.operand1, pseudoRegisters)
+        instruction.operand2 = stackOperand(instruction.operand2, pseudoRegisters)
+    elif instructionType is Unary or instructionType is Idiv or instructionType is SetCC:
+        instruction.operand = stackOperand(instruction.operand, pseudoRegisters)
 
-def fixInvalidIdivInstructions(ASMinstructions):
-    newInstructions = []
-    for instruction in ASMinstructions:
-        # instruction is not a Mov instruction, so do nothing
-        if not isinstance(instruction, Idiv):
-            newInstructions.append(instruction)
-            continue
+    return instruction
+
+
+def fixInvalidCmpInstruction(instruction, newInstructions):
+    if isinstance(instruction.operand1, Stack) and isinstance(instruction.operand2, Stack):
+        newInstructions.append(AsmInstructionMov(instruction.operand1, R10))
+        newInstructions.append(Cmp(R10, instruction.operand2))
 
+    elif isinstance(instruction.operand2, AsmImmediateValue):
+        newInstructions.append(AsmInstructionMov(instruction.operand2, R11))
+        newInstructions.append(Cmp(instruction.operand1, R11))
+
+    else:
         # there is nothing to fix
-        if not isinstance(instruction.operand, AsmImmediateValue):
-            newInstructions.append(instruction)
-            continue
+        newInstructions.append(instruction)
 
-        newInstructions.append(AsmInstructionMov(instruction.operand, Reg("r10d")))
-        newInstructions.append(Idiv(Reg("r10d")))
 
-    return newInstructions
+def fixInvalidIdivInstruction(instruction, newInstructions):
+    # there is nothing to fix
+    if not isinstance(instruction.operand, AsmImmediateValue):
+        newInstructions.append(instruction)
+        return
 
+    newInstructions.append(AsmInstructionMov(instruction.operand, R10))
+    newInstructions.append(Idiv(R10))
 
-def fixInvalidBinaryInstructions(ASMinstructions):
-    newInstructions = []
-    for instruction in ASMinstructions:
-        # instruction is not a Mov instruction, so do nothing
-        if not isinstance(instruction, Binary):
+
+def fixInvalidBinaryInstruction(instruction, newInstructions):
+    binary_operator = instruction.binary_operator
+
+    if binary_operator is ADD or binary_operator is SUB:
+        if not isinstance(instruction.operand1, Stack) and not isinstance(instruction.operand2, Stack):
             newInstructions.append(instruction)
-            continue
+            return
 
-        # there is nothing to fix
-        if not isinstance(instruction.binary_operator, Add) and not isinstance(instruction.binary_operator, Sub) and not isinstance(instruction.binary_operator, Mult):
+        newInstructions.append(AsmInstructionMov(instruction.operand1, R10))
+        newInstructions.append(Binary(binary_operator, R10, instruction.operand2))
+
+    elif binary_operator is MULT:
+        if not isinstance(instruction.operand2, Stack):
             newInstructions.append(instruction)
-            continue
+            return
 
-        if isinstance(instruction.binary_operator, Add) or isinstance(instruction.binary_operator, Sub):
-            if not isinstance(instruction.operand1, Stack) and not isinstance(instruction.operand2, Stack):
-                newInstructions.append(instruction)
-                continue
+        newInstructions.append(AsmInstructionMov(instruction.operand2, R11))
+        newInstructions.append(Binary(binary_operator, instruction.operand1, R11))
+        newInstructions.append(AsmInstructionMov(R11, instruction.operand2))
 
-            newInstructions.append(AsmInstructionMov(instruction.operand1, Reg("r10d")))
-            newInstructions.append(Binary(instruction.binary_operator, Reg("r10d"), instruction.operand2))
+    else:
+        # there is nothing to fix
+        newInstructions.append(instruction)
 
-        elif isinstance(instruction.binary_operator, Mult):
-            if not isinstance(instruction.operand2, Stack):
-                newInstructions.append(instruction)
-                continue
 
-            newInstructions.append(AsmInstructionMov(instruction.operand2, Reg("r11d")))
-            newInstructions.append(Binary(instruction.binary_operator, instruction.operand1, Reg("r11d")))
-            newInstructions.append(AsmInstructionMov(Reg("r11d"), instruction.operand2))
+def fixInvalidMovInstruction(instruction, newInstructions):
+    # there is nothing to fix
+    if not isinstance(instruction.src, Stack) and not isinstance(instruction.dst, Stack):
+        newInstructions.append(instruction)
+        return
 
-        else:
-            continue
+    newInstructions.append(AsmInstructionMov(instruction.src, R10))
+    newInstructions.append(AsmInstructionMov(R10, instruction.dst))
+
+
+# The fixup for every instruction class that can have invalid operands
+INSTRUCTION_FIXUPS = {
+    AsmInstructionMov: fixInvalidMovInstruction,
+    Idiv: fixInvalidIdivInstruction,
+    Binary: fixInvalidBinaryInstruction,
+    Cmp: fixInvalidCmpInstruction,
+}
+
+# instruction class -> name of the counter of its fixups in --stats
+FIXUP_COUNTERS = {
+    AsmInstructionMov: "Mov fixups",
+    Idiv: "Idiv fixups",
+    Binary: "Binary fixups",
+    Cmp: "Cmp fixups",
+}
 
-    return newInstructions
 
+def legalizeInstructions(ASMinstructions, fixupCounts=None):
+    """
+        Assign the stack slots (pseudoToStackInstruction) and fix the invalid operands (INSTRUCTION_FIXUPS)
+        in a single pass over the instructions
+
+        fixupCounts (a dict) gets the instructions added for every instruction class, for --stats
+    """
+    pseudoRegisters = {}
+    fixups = INSTRUCTION_FIXUPS
+    # the first position is kept free for the AllocateStack instruction
+    newInstructions = [None]
 
-def fixInvalidMovInstructions(ASMinstructions):
-    newInstructions = []
     for instruction in ASMinstructions:
-        # instruction is not a Mov instruction, so do nothing
-        if not isinstance(instruction, AsmInstructionMov):
-            newInstructions.append(instruction)
-            continue
+        pseudoToStackInstruction(instruction, pseudoRegisters)
 
-        # there is nothing to fix
-        if not isinstance(instruction.src, Stack) and not isinstance(instruction.dst, Stack):
+        fixup = fixups.get(type(instruction))
+        if fixup is None:
             newInstructions.append(instruction)
-            continue
+        elif fixupCounts is None:
+            fixup(instruction, newInstructions)
+        else:
+            size = len(newInstructions)
+            fixup(instruction, newInstructions)
+            instructionType = type(instruction)
+            fixupCounts[instructionType] = fixupCounts.get(instructionType, 0) + len(newInstructions) - size - 1
 
-        newInstructions.append(AsmInstructionMov(instruction.src, Reg("r10d")))
-        newInstructions.append(AsmInstructionMov(Reg("r10d"), instruction.dst))
+    if pseudoRegisters:
+        newInstructions[0] = AllocateStack(len(pseudoRegisters))
+    else:
+        del newInstructions[0]
 
     return newInstructions
 
 
 # TO-DO function from Tacky-AST to ASM
-def createAsmCode(normalProgram):
-    ASMInstructions = createInstructionsList(normalProgram.function_definition.body)
-    ASMInstructions, lastRegisterPosition = pseudoToStack(ASMInstructions)
+def createAsmCode(normalProgram, timer=None, stats=None):
+    fixupCounts = None if stats is None else {}
+    measure = NULL_TIMER.measure if timer is None else timer.measure
 
-    if lastRegisterPosition > 0:
-        # add AllocateStack at beginning of the instruction
-        ASMInstructions.insert(0, AllocateStack(lastRegisterPosition))
-
-    ASMInstructions = fixInvalidMovInstructions(ASMInstructions)
-    ASMInstructions = fixInvalidIdivInstructions(ASMInstructions)
-    ASMInstructions = fixInvalidBinaryInstructions(ASMInstructions)
-    ASMInstructions = fixInvalidCmpInstructions(ASMInstructions)
+    with measure("createInstructionsList", "asm"):
+        if isinstance(normalProgram.function_definition, TackyArray.TackyArrayFunction):
+            ASMInstructions = createInstructionsList(normalProgram.function_definition)
+        else:
+            ASMInstructions = createInstructionsList(normalProgram.function_definition.body)
+    selected = len(ASMInstructions)
+    with measure("legalizeInstructions", "asm"):
+        ASMInstructions = legalizeInstructions(ASMInstructions, fixupCounts)
+
+    if stats is not None:
+        stats.add("createInstructionsList", "instructions", selected)
+        stackSlots = ASMInstructions[0].int if ASMInstructions and type(ASMInstructions[0]) is AllocateStack else 0
+        stats.add("legalizeInstructions", "stack slots", stackSlots)
+        for instructionType, counter in FIXUP_COUNTERS.items():
+            stats.add("legalizeInstructions", counter, fixupCounts.get(instructionType, 0))
+        stats.add("createAsmCode", "instructions", len(ASMInstructions))
 
     # exp = AsmImmediateValue(normalProgram.function_def.body.exp.int)
     # sys.exit()
@@ -821,117 +719,112 @@ def createAsmCode(normalProgram):
 """
 
 
-def asmInstructionCodeGenerator(instructions_list, asmOutput):
+# The text written for every instruction class, the instruction is passed as {0}
+ASM_FORMATS = {
+    AsmInstructionMov: "\n    movl    {0.src}, {0.dst}\n",
+    AsmInstructionRet: "\n    movq    %rbp, %rsp\n    popq    %rbp\n    ret\n",
+    Unary: "\n    {0.unary_operator}   {0.operand}\n",
+    AllocateStack: "\n    subq    ${0}, %rsp\n",
+    Binary: "\n    {0.binary_operator}     {0.operand1}, {0.operand2}\n",
+    Idiv: "\n    idivl\t{0.operand}\n",
+    Cdq: "\n    cdq\n",
+    Cmp: "\n    cmpl\t{0.operand1}, {0.operand2}\n",
+    Jmp: "\n    jmp\t.L{0.identifier}\n",
+    JmpCC: "\n    j{0.cond_code}\t.L{0.identifier}\n",
+    SetCC: "\n    set{0.cond_code}\t{0.operand}\n",
+    Label: "\n.L{0.identifier}:\n",
+}
+
+
+def asmInstructionCodeGenerator(instructions_list, out):
     """
         instruction = Mov(operand src, operand dst)
         | Unary(unary_operator, operand)
         | AllocateStack(int)
         | Ret
+
+        Writes the text of every instruction to out (a file or io.StringIO)
     """
-    for instruction in instructions_list:
-        if isinstance(instruction, AsmInstructionMov):
-            asmOutput = f"""{asmOutput}
-    {instruction}
-"""
-            continue
+    write = out.write
+    formats = ASM_FORMATS
 
-        if isinstance(instruction, AsmInstructionRet):
-            asmOutput = f"""{asmOutput}
-    movq    %rbp, %rsp
-    popq    %rbp
-    ret
-"""
+    for instruction in instructions_list:
+        instructionFormat = formats.get(type(instruction))
+        if instructionFormat is None:
             continue
 
-        if isinstance(instruction, Unary):
-            asmOutput = f"""{asmOutput}
-    {instruction.unary_operator}   {instruction.operand}
-"""
-            continue
+        write(instructionFormat.format(instruction))
 
-        if isinstance(instruction, AllocateStack):
-            asmOutput = f"""{asmOutput}
-    subq    ${instruction}, %rsp
-"""
-            continue
 
-        if isinstance(instruction, Binary):
-            asmOutput = f"""{asmOutput}
-    {instruction}
-"""
-            continue
+def asmFunctionCodeGenerator(Function_definition, out, name=None):
+    if name is None:
+        name = Function_definition.name
 
-        if isinstance(instruction, Idiv):
-            asmOutput = f"""{asmOutput}
-    {instruction}
+    out.write(f"""
+.globl  {name}
+{name}:
+    push    %rbp
+    movq    %rsp, %rbp
+""")
+    asmInstructionCodeGenerator(Function_definition.instructions, out)
+
+
+# entry point of a binary without libc (Linux): call main and pass its return value to the exit system call
+FREESTANDING_START = """
+.globl  _start
+_start:
+    call    {name}
+    movl    %eax, %edi
+    movl    $60, %eax
+    syscall
 """
-            continue
 
-        if isinstance(instruction, Cdq):
-            asmOutput = f"""{asmOutput}
-    {instruction}
-"""
-            continue
 
-        if isinstance(instruction, Cmp):
-            asmOutput = f"""{asmOutput}
-    {instruction}
-"""
-            continue
+def writeASMProgram(ASMProgram, out, context=None, freestanding=False):
+    """Write the assembly of the whole program to out (a file, pipe or io.StringIO)
 
-        if isinstance(instruction, Jmp):
-            asmOutput = f"""{asmOutput}
-    {instruction}
-"""
-            continue
+    freestanding also writes a _start, the program can then be linked without libc (gcc -nostdlib -static)
+    """
+    platform = sys.platform if context is None else context.platform
 
-        if isinstance(instruction, JmpCC):
-            asmOutput = f"""{asmOutput}
-    {instruction}
-"""
-            continue
+    name = ASMProgram.function_definition.name
+    if platform == "darwin":
+        name = "_" + name
 
-        if isinstance(instruction, SetCC):
-            asmOutput = f"""{asmOutput}
-    {instruction}
-"""
-            continue
+    if freestanding:
+        out.write(FREESTANDING_START.format(name=name))
 
-        if isinstance(instruction, Label):
-            asmOutput = f"""{asmOutput}
-{instruction}
-"""
-            continue
+    asmFunctionCodeGenerator(ASMProgram.function_definition, out, name)
 
-    return asmOutput
+    # If on linux type machine we add some assembly code at the end
+    # .section .note.GNU-stack,"",@progbits
+    if platform == "darwin" or platform == "linux" or platform == "linux2":
+        linuxHardening = '\t.section .note.GNU-stack,"",@progbits'
+        out.write("\n" + linuxHardening + "\n")
 
 
-def asmFunctionCodeGenerator(Function_definition):
-    asmOutput = f"""
-.globl  {Function_definition.name}
-{Function_definition.name}:
-    push    %rbp
-    movq    %rsp, %rbp
-"""
-    asmOutput = asmInstructionCodeGenerator(Function_definition.instructions, asmOutput)
-    return asmOutput
+class CountingWriter:
+    """Passes the text on to out and counts it, for the size of assembly that is streamed somewhere"""
+    __slots__ = ("out", "bytes")
 
+    def __init__(self, out):
+        self.out = out
+        # the assembly is ASCII, a character is a byte
+        self.bytes = 0
 
-def createASMoutput(ASMProgram):
-    if sys.platform == "darwin":
-        ASMProgram.function_definition.name = "_" + ASMProgram.function_definition.name
+    def write(self, text):
+        self.bytes += len(text)
+        return self.out.write(text)
 
-    asmOutput = asmFunctionCodeGenerator(ASMProgram.function_definition)
 
-    # If on linux type machine we add some assembly code at the end
-    # .section .note.GNU-stack,"",@progbits
-    if sys.platform == "darwin" or sys.platform == "linux" or sys.platform == "linux2":
-        linuxHardening = '\t.section .note.GNU-stack,"",@progbits'
-        asmOutput = asmOutput + "\n" + linuxHardening + "\n"
+def createASMoutput(ASMProgram, context=None, freestanding=False):
+    asmOutput = io.StringIO()
+    writeASMProgram(ASMProgram, asmOutput, context, freestanding)
 
-    return asmOutput
+    return asmOutput.getvalue()
 
 
-def saveASMToFile(code, ASMFileName):
+def saveASMProgramToFile(ASMProgram, ASMFileName, context=None, freestanding=False):
+    """Stream the assembly straight into the file without building the whole text first"""
     with open(ASMFileName, "w") as ASMFile:
-        ASMFile.write(code)
+        writeASMProgram(ASMProgram, ASMFile, context, freestanding)
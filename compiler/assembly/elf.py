@@ -0,0 +1,156 @@
+import os
+import struct
+
+"""
+        MINIMAL ELF64 WRITER
+Wraps the machine code of the encoder (compiler/assembly/encoder.py) in an ELF64 file for x86-64 Linux:
+
+- elfObject:     relocatable object (.o) with .text, a global symbol for the function and an empty
+                 .note.GNU-stack, it can be linked by gcc/ld like the output of as
+- elfExecutable: static executable without libc, a small _start calls the function and
+                 passes its return value to the exit system call
+"""
+
+ELF_HEADER_SIZE = 64
+PROGRAM_HEADER_SIZE = 56
+SECTION_HEADER_SIZE = 64
+SYMBOL_SIZE = 24
+
+ET_REL = 1
+ET_EXEC = 2
+EM_X86_64 = 62
+
+SHT_PROGBITS = 1
+SHT_SYMTAB = 2
+SHT_STRTAB = 3
+SHF_ALLOC = 0x2
+SHF_EXECINSTR = 0x4
+
+STB_LOCAL = 0
+STB_GLOBAL = 1
+STT_FUNC = 2
+STT_SECTION = 3
+
+PT_LOAD = 1
+PF_X = 0x1
+PF_R = 0x4
+
+# address the executable is loaded at
+BASE_ADDRESS = 0x400000
+
+# call <function>; movl %eax, %edi; movl $60, %eax (exit); syscall
+START_SIZE = 14
+
+
+def elfHeader(fileType, entry, programHeaders, sectionHeaderOffset, sections, sectionNamesIndex):
+    identification = b"\x7fELF" + bytes((2, 1, 1, 0)) + bytes(8)
+    return identification + struct.pack(
+        "<HHIQQQIHHHHHH",
+        fileType,
+        EM_X86_64,
+        1,
+        entry,
+        ELF_HEADER_SIZE if programHeaders else 0,
+        sectionHeaderOffset,
+        0,
+        ELF_HEADER_SIZE,
+        PROGRAM_HEADER_SIZE if programHeaders else 0,
+        programHeaders,
+        SECTION_HEADER_SIZE if sections else 0,
+        sections,
+        sectionNamesIndex,
+    )
+
+
+def sectionHeader(name, sectionType, flags, offset, size, link=0, info=0, align=1, entrySize=0):
+    return struct.pack("<IIQQQQIIQQ", name, sectionType, flags, 0, offset, size, link, info, align, entrySize)
+
+
+def symbol(name, info, sectionIndex, value=0, size=0):
+    return struct.pack("<IBBHQQ", name, info, 0, sectionIndex, value, size)
+
+
+class StringTable:
+    """Names of an ELF string table, the table starts with an empty name"""
+    __slots__ = ("data",)
+
+    def __init__(self):
+        self.data = bytearray(b"\x00")
+
+    def add(self, name):
+        offset = len(self.data)
+        self.data += name.encode() + b"\x00"
+        return offset
+
+
+def elfObject(function):
+    """Relocatable object file with the machine code of an EncodedFunction"""
+    code = function.code
+
+    sectionNames = StringTable()
+    textName = sectionNames.add(".text")
+    noteName = sectionNames.add(".note.GNU-stack")
+    symtabName = sectionNames.add(".symtab")
+    strtabName = sectionNames.add(".strtab")
+    shstrtabName = sectionNames.add(".shstrtab")
+
+    symbolNames = StringTable()
+    functionName = symbolNames.add(function.name)
+
+    # null symbol, the .text section symbol and the function, the locals have to come first
+    symbols = (
+        symbol(0, 0, 0)
+        + symbol(0, STB_LOCAL << 4 | STT_SECTION, 1)
+        + symbol(functionName, STB_GLOBAL << 4 | STT_FUNC, 1, 0, len(code))
+    )
+    firstGlobal = 2
+
+    # layout: header, .text, .symtab, .strtab, .shstrtab, section headers
+    textOffset = ELF_HEADER_SIZE
+    symtabOffset = (textOffset + len(code) + 7) & ~7
+    strtabOffset = symtabOffset + len(symbols)
+    shstrtabOffset = strtabOffset + len(symbolNames.data)
+    sectionHeaderOffset = (shstrtabOffset + len(sectionNames.data) + 7) & ~7
+
+    sections = (
+        sectionHeader(0, 0, 0, 0, 0, align=0)
+        + sectionHeader(textName, SHT_PROGBITS, SHF_ALLOC | SHF_EXECINSTR, textOffset, len(code))
+        + sectionHeader(noteName, SHT_PROGBITS, 0, textOffset + len(code), 0)
+        + sectionHeader(symtabName, SHT_SYMTAB, 0, symtabOffset, len(symbols), link=4, info=firstGlobal, align=8, entrySize=SYMBOL_SIZE)
+        + sectionHeader(strtabName, SHT_STRTAB, 0, strtabOffset, len(symbolNames.data))
+        + sectionHeader(shstrtabName, SHT_STRTAB, 0, shstrtabOffset, len(sectionNames.data))
+    )
+
+    output = bytearray(elfHeader(ET_REL, 0, 0, sectionHeaderOffset, 6, 5))
+    output += code
+    output += bytes(symtabOffset - len(output))
+    output += symbols
+    output += symbolNames.data
+    output += sectionNames.data
+    output += bytes(sectionHeaderOffset - len(output))
+    output += sections
+
+    return bytes(output)
+
+
+def elfExecutable(function):
+    """Static executable that runs an EncodedFunction and exits with its return value"""
+    codeOffset = ELF_HEADER_SIZE + PROGRAM_HEADER_SIZE
+    entry = BASE_ADDRESS + codeOffset
+
+    # the function comes right after _start
+    start = b"\xe8" + struct.pack("<i", START_SIZE - 5) + b"\x89\xc7" + b"\xb8\x3c\x00\x00\x00" + b"\x0f\x05"
+    assert len(start) == START_SIZE
+
+    fileSize = codeOffset + len(start) + len(function.code)
+    programHeader = struct.pack("<IIQQQQQQ", PT_LOAD, PF_R | PF_X, 0, BASE_ADDRESS, BASE_ADDRESS, fileSize, fileSize, 0x1000)
+
+    return elfHeader(ET_EXEC, entry, 1, 0, 0, 0) + programHeader + start + function.code
+
+
+def writeELF(data, fileName, executable=False):
+    with open(fileName, "wb") as elfFile:
+        elfFile.write(data)
+
+    if executable:
+        os.chmod(fileName, 0o755)
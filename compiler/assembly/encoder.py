@@ -0,0 +1,312 @@
+import struct
+import sys
+
+from compiler.assembly.ASM import (
+    AsmInstructionMov,
+    AsmInstructionRet,
+    AsmImmediateValue,
+    AllocateStack,
+    Binary,
+    Cdq,
+    Cmp,
+    Idiv,
+    Jmp,
+    JmpCC,
+    Label,
+    Reg,
+    SetCC,
+    Stack,
+    Unary,
+    Add,
+    Sub,
+    Mult,
+    Not,
+    Neg,
+    E,
+    NE,
+    G,
+    GE,
+    L,
+    LE,
+)
+
+"""
+        X86-64 MACHINE CODE ENCODER
+Turns the ASM instructions into machine code bytes, the encodings are the ones GNU as
+picks for the AT&T text of asmInstructionCodeGenerator so both can be compared byte for byte:
+
+- the shortest immediate form (imm8, the accumulator form for %eax, imm32)
+- register to register instructions use the "store" opcodes (89, 01, 29, 39)
+- jumps start short (rel8) and are made long (rel32) until every target fits
+"""
+
+REGISTERS = {
+    "eax": 0, "ecx": 1, "edx": 2, "ebx": 3, "esp": 4, "ebp": 5, "esi": 6, "edi": 7,
+    "r8d": 8, "r9d": 9, "r10d": 10, "r11d": 11, "r12d": 12, "r13d": 13, "r14d": 14, "r15d": 15,
+}
+
+# condition code -> low nibble of the jcc (70+cc / 0F 80+cc) and setcc (0F 90+cc) opcodes
+CONDITION_CODES = {E: 0x4, NE: 0x5, L: 0xC, GE: 0xD, LE: 0xE, G: 0xF}
+
+# binary operator -> (opcode reg to r/m, opcode r/m to reg, ModRM reg field of the immediate form, opcode of the %eax immediate form)
+ARITHMETIC_OPCODES = {
+    Add: (0x01, 0x03, 0, 0x05),
+    Sub: (0x29, 0x2B, 5, 0x2D),
+}
+CMP_OPCODES = (0x39, 0x3B, 7, 0x3D)
+
+# unary operator -> ModRM reg field of F7 /digit
+UNARY_OPCODES = {Not: 2, Neg: 3}
+
+# push %rbp; movq %rsp, %rbp
+PROLOGUE = b"\x55\x48\x89\xe5"
+# movq %rbp, %rsp; popq %rbp; ret
+EPILOGUE = b"\x48\x89\xec\x5d\xc3"
+
+SHORT_JUMP = 2
+LONG_JMP = 5
+LONG_JCC = 6
+
+
+class EncodeError(Exception):
+    def __init__(self, instruction):
+        self.message = f"ERROR: Can't encode the instruction {instruction} ({type(instruction).__name__})"
+        print(self.message)
+        sys.exit()
+
+
+class EncodedFunction:
+    """Machine code of a function, labels are offsets into code"""
+    __slots__ = ("name", "code", "labels")
+
+    def __init__(self, name, code, labels):
+        self.name = name
+        self.code = code
+        self.labels = labels
+
+
+def fitsInt8(value):
+    return -128 <= value <= 127
+
+
+def imm32(value):
+    # movl/addl/... only take 32 bits, just like as we keep the low 32 bits
+    return struct.pack("<I", value & 0xFFFFFFFF)
+
+
+def modrm(regField, operand):
+    """REX bits (R and B) and the ModRM byte with its displacement for a register or stack operand"""
+    rex = (regField >> 3) << 2
+    if type(operand) is Reg:
+        rm = REGISTERS[operand.reg]
+        return [rex | (rm >> 3), bytes((0xC0 | (regField & 7) << 3 | (rm & 7),))]
+    elif type(operand) is Stack:
+        # [rbp + disp], rbp as base always needs a displacement
+        if fitsInt8(operand.int):
+            return [rex, bytes((0x40 | (regField & 7) << 3 | 5, operand.int & 0xFF))]
+        return [rex, bytes((0x80 | (regField & 7) << 3 | 5,)) + struct.pack("<i", operand.int)]
+
+    return [None, None]
+
+
+def encodeRM(opcode, regField, operand, immediate=b"", rexW=False, byteRegister=False):
+    """opcode + ModRM (+ displacement) + immediate, with a REX prefix when it is needed"""
+    rex, modrmBytes = modrm(regField, operand)
+    if modrmBytes is None:
+        return None
+
+    if rexW:
+        rex |= 8
+    # spl/bpl/sil/dil only exist with a REX prefix
+    if rex or (byteRegister and type(operand) is Reg and REGISTERS[operand.reg] >= 4):
+        return bytes((0x40 | rex,)) + opcode + modrmBytes + immediate
+
+    return opcode + modrmBytes + immediate
+
+
+def encodeMov(instruction):
+    src, dst = instruction.src, instruction.dst
+    if type(src) is AsmImmediateValue:
+        if type(dst) is Reg:
+            number = REGISTERS[dst.reg]
+            prefix = b"\x41" if number >= 8 else b""
+            return prefix + bytes((0xB8 + (number & 7),)) + imm32(src)
+        return encodeRM(b"\xc7", 0, dst, imm32(src))
+    elif type(src) is Reg:
+        return encodeRM(b"\x89", REGISTERS[src.reg], dst)
+    elif type(dst) is Reg:
+        return encodeRM(b"\x8b", REGISTERS[dst.reg], src)
+
+    return None
+
+
+def encodeArithmetic(opcodes, src, dst):
+    """add, sub and cmp: AT&T "op src, dst" """
+    storeOpcode, loadOpcode, immediateField, accumulatorOpcode = opcodes
+    if type(src) is AsmImmediateValue:
+        if fitsInt8(src):
+            return encodeRM(b"\x83", immediateField, dst, bytes((src & 0xFF,)))
+        if type(dst) is Reg and dst.reg == "eax":
+            return bytes((accumulatorOpcode,)) + imm32(src)
+        return encodeRM(b"\x81", immediateField, dst, imm32(src))
+    elif type(src) is Reg:
+        return encodeRM(bytes((storeOpcode,)), REGISTERS[src.reg], dst)
+    elif type(dst) is Reg:
+        return encodeRM(bytes((loadOpcode,)), REGISTERS[dst.reg], src)
+
+    return None
+
+
+def encodeBinary(instruction):
+    operator = type(instruction.binary_operator)
+    src, dst = instruction.operand1, instruction.operand2
+
+    if operator is Mult:
+        # imul only writes to a register
+        if type(dst) is not Reg:
+            return None
+        dstNumber = REGISTERS[dst.reg]
+        if type(src) is AsmImmediateValue:
+            if fitsInt8(src):
+                return encodeRM(b"\x6b", dstNumber, dst, bytes((src & 0xFF,)))
+            return encodeRM(b"\x69", dstNumber, dst, imm32(src))
+        return encodeRM(b"\x0f\xaf", dstNumber, src)
+
+    opcodes = ARITHMETIC_OPCODES.get(operator)
+    if opcodes is None:
+        return None
+    return encodeArithmetic(opcodes, src, dst)
+
+
+def encodeUnary(instruction):
+    field = UNARY_OPCODES.get(type(instruction.unary_operator))
+    if field is None:
+        return None
+    return encodeRM(b"\xf7", field, instruction.operand)
+
+
+def encodeIdiv(instruction):
+    return encodeRM(b"\xf7", 7, instruction.operand)
+
+
+def encodeCmp(instruction):
+    return encodeArithmetic(CMP_OPCODES, instruction.operand1, instruction.operand2)
+
+
+def encodeSetCC(instruction):
+    return encodeRM(bytes((0x0F, 0x90 | CONDITION_CODES[type(instruction.cond_code)])), 0, instruction.operand, byteRegister=True)
+
+
+def encodeAllocateStack(instruction):
+    # the same value as the text: subq $<int*4>, %rsp
+    amount = instruction.int * 4
+    rsp = Reg("esp")
+    if fitsInt8(amount):
+        return encodeRM(b"\x83", 5, rsp, bytes((amount & 0xFF,)), rexW=True)
+    return encodeRM(b"\x81", 5, rsp, imm32(amount), rexW=True)
+
+
+INSTRUCTION_ENCODERS = {
+    AsmInstructionMov: encodeMov,
+    Binary: encodeBinary,
+    Unary: encodeUnary,
+    Idiv: encodeIdiv,
+    Cmp: encodeCmp,
+    SetCC: encodeSetCC,
+    AllocateStack: encodeAllocateStack,
+    Cdq: lambda instruction: b"\x99",
+    AsmInstructionRet: lambda instruction: EPILOGUE,
+}
+
+
+def jumpSize(instruction, long):
+    if not long:
+        return SHORT_JUMP
+    return LONG_JMP if type(instruction) is Jmp else LONG_JCC
+
+
+def encodeJump(instruction, long, displacement):
+    if type(instruction) is Jmp:
+        if long:
+            return b"\xe9" + struct.pack("<i", displacement)
+        return bytes((0xEB, displacement & 0xFF))
+
+    condition = CONDITION_CODES[type(instruction.cond_code)]
+    if long:
+        return bytes((0x0F, 0x80 | condition)) + struct.pack("<i", displacement)
+    return bytes((0x70 | condition, displacement & 0xFF))
+
+
+def encodeInstructions(instructions):
+    """Machine code of the instructions of a function (after the prologue), gives back [code, labels]"""
+    # pieces are bytes, a Label or a Jmp/JmpCC, jumps get their size when the labels are known
+    pieces = []
+    encoders = INSTRUCTION_ENCODERS
+
+    for instruction in instructions:
+        instructionType = type(instruction)
+        if instructionType is Jmp or instructionType is JmpCC or instructionType is Label:
+            pieces.append(instruction)
+            continue
+
+        encoder = encoders.get(instructionType)
+        if encoder is None:
+            # the text generator skips anything that isn't an instruction as well
+            continue
+
+        encoded = encoder(instruction)
+        if encoded is None:
+            raise EncodeError(instruction)
+        pieces.append(encoded)
+
+    # relax the jumps: every jump starts short and is made long when its target is too far away,
+    # a jump that got longer can push other targets out of reach so repeat until nothing changes
+    long = {}
+    while True:
+        offset = len(PROLOGUE)
+        labels = {}
+        ends = {}
+        for index, piece in enumerate(pieces):
+            pieceType = type(piece)
+            if pieceType is Label:
+                labels[piece.identifier] = offset
+            elif pieceType is Jmp or pieceType is JmpCC:
+                offset += jumpSize(piece, long.get(index, False))
+                ends[index] = offset
+            else:
+                offset += len(piece)
+
+        changed = False
+        for index, end in ends.items():
+            identifier = pieces[index].identifier
+            if identifier not in labels:
+                print(f"ERROR: Jump to the unknown label .L{identifier}")
+                sys.exit()
+            if not long.get(index, False) and not fitsInt8(labels[identifier] - end):
+                long[index] = True
+                changed = True
+
+        if not changed:
+            break
+
+    code = bytearray(PROLOGUE)
+    for index, piece in enumerate(pieces):
+        pieceType = type(piece)
+        if pieceType is Label:
+            continue
+        elif pieceType is Jmp or pieceType is JmpCC:
+            code += encodeJump(piece, long.get(index, False), labels[piece.identifier] - ends[index])
+        else:
+            code += piece
+
+    return [bytes(code), labels]
+
+
+def encodeFunction(Function_definition):
+    code, labels = encodeInstructions(Function_definition.instructions)
+    return EncodedFunction(Function_definition.name, code, labels)
+
+
+def encodeProgram(ASMProgram):
+    """Machine code of the (only) function of the program"""
+    return encodeFunction(ASMProgram.function_definition)
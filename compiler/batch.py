@@ -0,0 +1,210 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import repeat
+from typing import Optional
+
+from compiler.assembly.ASM import saveASMProgramToFile
+from compiler.cache import CompileCache
+from compiler.compile import assemble_and_link, check_setup_cached, try_compile_source
+from compiler.context import CompilationContext
+
+"""
+        BATCH COMPILATION
+Compile many .c files in one run, the files are spread over a pool of worker processes
+so the Python startup and imports are only paid once per worker instead of once per file.
+"""
+
+
+@dataclass(slots=True)
+class FileResult:
+    """Outcome of compiling a single file"""
+    path: str
+    ok: bool
+    seconds: float
+    output: Optional[str] = None
+    error: Optional[str] = None
+    # True when the outputs came out of the compilation cache
+    cached: bool = False
+
+
+def collect_sources(paths):
+    """[(.c file, name of its output)] of the given paths, directories are searched recursively
+
+    The output name of a file in a directory keeps its path inside that directory (src/a/prog.c of src is a/prog),
+    a file that is given on its own only keeps its name.
+    """
+    sources = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                sources.extend((os.path.join(root, name), output_name(os.path.join(root, name), path)) for name in sorted(files) if name.endswith(".c"))
+        else:
+            sources.append((path, output_name(path)))
+
+    return sources
+
+
+def output_name(filePath, root=None):
+    """The path of the outputs of a source file without their suffix, relative to root when it was collected from a directory"""
+    directory, fileName = os.path.split(os.path.relpath(filePath, root) if root is not None else os.path.basename(filePath))
+    return os.path.join(directory, fileName.split(".")[0])
+
+
+def plan_outputs(paths, outputDir):
+    """[(.c file, output path without suffix, error)] of the .c files of the paths
+
+    error is set for a file that would get the same output as a file before it, that file isn't compiled:
+    the two would overwrite each other (and race on the same file with more workers)
+    """
+    planned = []
+    # output path -> the file that gets it
+    outputs = {}
+    for source, name in collect_sources(paths):
+        outputPath = os.path.join(outputDir, name)
+        key = os.path.normcase(os.path.abspath(outputPath))
+
+        error = None
+        if key in outputs:
+            error = f"{source} has the same output ({outputPath}) as {outputs[key]}, rename one of them"
+        else:
+            outputs[key] = source
+        planned.append((source, outputPath, error))
+
+    return planned
+
+
+def read_source(filePath):
+    """Read a source file, gives back [source bytes, code, None] or [None, None, error message]
+
+    Used by every driver (batch, compiler/pipeline.py), a file that can't be read or isn't UTF-8 is an error of that file only
+    """
+    try:
+        with open(filePath, "rb") as sourceFile:
+            source = sourceFile.read()
+        return [source, source.decode(), None]
+    except (OSError, UnicodeDecodeError) as err:
+        return [None, None, str(err)]
+
+
+def compile_file(filePath, outputPath, link=True, use_cache=True):
+    """Compile one file into outputPath (without suffix), anything that goes wrong is stored in the result instead of stopping the batch"""
+    start = time.perf_counter()
+    assemblyFilePath = outputPath + ".s"
+    binaryFilePath = outputPath
+    outputFilePath = binaryFilePath if link else assemblyFilePath
+
+    source, code, error = read_source(filePath)
+    if error is not None:
+        return FileResult(filePath, False, time.perf_counter() - start, error=error)
+
+    outputs = {"program": binaryFilePath} if link else {"program.s": assemblyFilePath}
+
+    try:
+        os.makedirs(os.path.dirname(outputPath) or ".", exist_ok=True)
+
+        if use_cache:
+            cache = CompileCache()
+            key = cache.key(source, {"platform": sys.platform, "output": "binary" if link else "assembly"})
+            if cache.fetch(key, outputs):
+                return FileResult(filePath, True, time.perf_counter() - start, output=outputFilePath, cached=True)
+
+        context = CompilationContext()
+        AsmProgram, error = try_compile_source(code, context)
+        if error is not None:
+            return FileResult(filePath, False, time.perf_counter() - start, error=error)
+
+        if link:
+            # the assembly is only written into gcc over a pipe, the .s file is only written with -S
+            error = assemble_and_link(AsmProgram, binaryFilePath, context)
+            if error is not None:
+                return FileResult(filePath, False, time.perf_counter() - start, error=error)
+        else:
+            saveASMProgramToFile(AsmProgram, assemblyFilePath, context)
+
+        if use_cache:
+            cache.store(key, outputs)
+    except OSError as err:
+        # no gcc, a full disk, an output directory that can't be written
+        return FileResult(filePath, False, time.perf_counter() - start, error=str(err))
+
+    return FileResult(filePath, True, time.perf_counter() - start, output=outputFilePath)
+
+
+def compile_batch(paths, outputDir="compiled", workers=None, link=True, chunksize=16, use_cache=True):
+    """Compile all the .c files of the paths, gives back a FileResult per file in the same order
+
+    workers is the amount of worker processes (default: one per CPU), with 1 worker
+    everything is compiled in this process.
+    """
+    planned = plan_outputs(paths, outputDir)
+    os.makedirs(outputDir, exist_ok=True)
+
+    results = [None] * len(planned)
+    work = []
+    for index, (source, outputPath, error) in enumerate(planned):
+        if error is not None:
+            results[index] = FileResult(source, False, 0.0, error=error)
+        else:
+            work.append(index)
+    sources = [planned[index][0] for index in work]
+    outputPaths = [planned[index][1] for index in work]
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers == 1:
+        compiled = [compile_file(source, outputPath, link, use_cache) for source, outputPath in zip(sources, outputPaths)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            compiled = list(executor.map(compile_file, sources, outputPaths, repeat(link), repeat(use_cache), chunksize=chunksize))
+
+    for index, result in zip(work, compiled):
+        results[index] = result
+
+    return results
+
+
+def printSummary(results, seconds):
+    failures = [result for result in results if not result.ok]
+
+    for result in failures:
+        print(f"FAILED {result.path}")
+        for line in result.error.splitlines():
+            print(f"    {line}")
+
+    files = len(results)
+    cached = sum(result.cached for result in results)
+    fromCache = f" ({cached} from the cache)" if cached else ""
+    print(f"{files - len(failures)}/{files} files compiled{fromCache}, {len(failures)} failed")
+    if seconds > 0:
+        print(f"{seconds:.2f}s wall time, {files / seconds:.1f} files/s")
+
+
+def main(argv=None) -> int:
+    argparser = argparse.ArgumentParser(description="Compile many .c files with a pool of worker processes")
+    argparser.add_argument("paths", nargs="+", help=".c files or directories with .c files")
+    argparser.add_argument("-j", "--workers", type=int, default=None, help="amount of worker processes (default: one per CPU)")
+    argparser.add_argument("-o", "--output-dir", default="compiled", help="directory for the assembly files and binaries")
+    argparser.add_argument("-S", dest="link", action="store_false", help="only write the assembly files, don't run gcc")
+    argparser.add_argument("--no-cache", dest="use_cache", action="store_false", help="always compile, don't use the compilation cache")
+    argparser.add_argument("--skip-setup-check", dest="check_setup", action="store_false", help="don't check the Python version, platform and gcc")
+    argparser.add_argument("--chunksize", type=int, default=16, help="files handed to a worker at once")
+    args = argparser.parse_args(argv)
+
+    if args.check_setup and not check_setup_cached():
+        return 1
+
+    start = time.perf_counter()
+    results = compile_batch(args.paths, args.output_dir, args.workers, args.link, args.chunksize, args.use_cache)
+    printSummary(results, time.perf_counter() - start)
+
+    return 0 if all(result.ok for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+import argparse
+import os
+import py_compile
+import sys
+import tempfile
+import zipapp
+
+"""
+        ZIPAPP
+Packs main.py and the compiler into a single executable archive (python3 c-compiler.pyz file.c).
+
+The modules are stored as bytecode only (.pyc without the .py), so nothing has to be compiled
+when the archive starts. Bytecode only works on the Python version that made it: build the
+archive with the same python3 that runs it.
+"""
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def build(target="c-compiler.pyz", interpreter="/usr/bin/env python3"):
+    """Write the zipapp to target, gives back its path"""
+    with tempfile.TemporaryDirectory() as directory:
+        compilerRoot = os.path.join(ROOT, "compiler")
+        for sourceDirectory, dirs, files in os.walk(compilerRoot):
+            dirs[:] = sorted(name for name in dirs if name != "__pycache__")
+            for name in sorted(files):
+                if not name.endswith(".py"):
+                    continue
+                sourcePath = os.path.join(sourceDirectory, name)
+                relativePath = os.path.relpath(sourcePath, ROOT)
+                # the legacy layout (module.pyc next to where module.py would be) is what zipimport loads
+                py_compile.compile(sourcePath, cfile=os.path.join(directory, relativePath + "c"), dfile=relativePath, doraise=True)
+
+        # runpy runs __main__ as source, it only parses the arguments and imports the compiler
+        with open(os.path.join(ROOT, "main.py")) as mainFile, open(os.path.join(directory, "__main__.py"), "w") as archiveMain:
+            archiveMain.write(mainFile.read())
+
+        zipapp.create_archive(directory, target, interpreter=interpreter)
+
+    return target
+
+
+def main(argv=None) -> int:
+    argparser = argparse.ArgumentParser(description="Pack the compiler into a single executable archive with precompiled bytecode")
+    argparser.add_argument("-o", "--output", default="c-compiler.pyz", help="path of the archive")
+    argparser.add_argument("--python", default="/usr/bin/env python3", help="interpreter line of the archive")
+    args = argparser.parse_args(argv)
+
+    target = build(args.output, args.python)
+    print(f"You can find the archive in {target} (Python {sys.version_info.major}.{sys.version_info.minor} bytecode)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,320 @@
+import atexit
+import contextlib
+import functools
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+"""
+        COMPILATION CACHE
+The output of a compile (assembly file and binary) stored on disk under a hash of
+everything the output depends on: the source, the version of the compiler and the options.
+
+<cache directory>/
+    stats.json                  hits, misses and the size of the stored outputs
+    objects/<key[:2]>/<key>/    the files of a single compile
+
+The modification time of an entry is its last use, the least recently used entries are
+removed once the outputs take more than max_bytes.
+
+The counters of stats.json are kept in memory and added to the file once, when the process
+exits (under a lock, so the worker processes of a batch don't overwrite each other's counts).
+A cache hit only reads the entry and touches it.
+"""
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# outputs that are made by gcc, their key also has the gcc that made them
+GCC_OUTPUTS = ("binary", "freestanding")
+
+# stats.json path -> counters of this process that aren't in the file yet
+pending_stats = {}
+# the process that counted pending_stats, a forked process starts without counts
+pending_pid = None
+
+
+def default_cache_dir():
+    return os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "c-compiler")
+
+
+@functools.lru_cache(maxsize=None)
+def compiler_version():
+    """Hash of the source code of the compiler, every change to the compiler gives a new version"""
+    root = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256()
+
+    if not os.path.isdir(root):
+        # running from a zipapp (compiler/bundle.py): the archive is the version
+        archive = root
+        while not os.path.isfile(archive):
+            archive = os.path.dirname(archive)
+        with open(archive, "rb") as archiveFile:
+            digest.update(archiveFile.read())
+        return digest.hexdigest()
+
+    for directory, dirs, files in os.walk(root):
+        dirs[:] = sorted(name for name in dirs if name != "__pycache__")
+        for name in sorted(files):
+            if name.endswith(".py"):
+                path = os.path.join(directory, name)
+                digest.update(os.path.relpath(path, root).encode())
+                with open(path, "rb") as sourceFile:
+                    digest.update(sourceFile.read())
+
+    return digest.hexdigest()
+
+
+def gcc_identity():
+    """Path and modification time of the gcc on PATH"""
+    gcc = shutil.which("gcc")
+    try:
+        gccMtime = os.stat(gcc).st_mtime_ns if gcc is not None else None
+    except OSError:
+        gccMtime = None
+
+    return [gcc, gccMtime]
+
+
+@contextlib.contextmanager
+def locked(lockPath):
+    """Hold an exclusive lock on lockPath (no lock where fcntl doesn't exist)"""
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+
+    with open(lockPath, "a") as lockFile:
+        fcntl.flock(lockFile, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lockFile, fcntl.LOCK_UN)
+
+
+def read_stats_file(statsPath):
+    stats = {"hits": 0, "misses": 0, "evictions": 0, "bytes": 0}
+    try:
+        with open(statsPath) as statsFile:
+            stats.update(json.load(statsFile))
+    except (FileNotFoundError, ValueError):
+        pass
+
+    return stats
+
+
+def write_stats_file(statsPath, stats):
+    directory = os.path.dirname(statsPath)
+    os.makedirs(directory, exist_ok=True)
+    fd, temporary = tempfile.mkstemp(dir=directory)
+    with os.fdopen(fd, "w") as statsFile:
+        json.dump(stats, statsFile)
+    os.replace(temporary, statsPath)
+
+
+def flush_stats():
+    """Add the counters of this process to the stats.json files"""
+    global pending_pid
+
+    if pending_pid != os.getpid():
+        pending_stats.clear()
+    pending_pid = os.getpid()
+
+    for statsPath, changes in list(pending_stats.items()):
+        if any(changes.values()):
+            try:
+                os.makedirs(os.path.dirname(statsPath), exist_ok=True)
+                with locked(statsPath + ".lock"):
+                    stats = read_stats_file(statsPath)
+                    for name, change in changes.items():
+                        stats[name] += change
+                    write_stats_file(statsPath, stats)
+            except OSError:
+                # the counters are best effort
+                pass
+        del pending_stats[statsPath]
+
+
+def register_flush():
+    atexit.register(flush_stats)
+    # worker processes of multiprocessing (batch) leave without running atexit, only its finalizers
+    if "multiprocessing.util" in sys.modules:
+        sys.modules["multiprocessing.util"].Finalize(None, flush_stats, exitpriority=0)
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+class CompileCache:
+    """Content addressed store of compile outputs with least recently used eviction"""
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.objects = os.path.join(self.directory, "objects")
+        self.statsPath = os.path.join(self.directory, "stats.json")
+
+    def key(self, source, options=None):
+        """The key of a compile: hash of the source (str or bytes), the compiler version and the options
+
+        an output made by gcc (options["output"] in GCC_OUTPUTS) also depends on the gcc on PATH
+        """
+        if isinstance(source, str):
+            source = source.encode()
+        options = options or {}
+        if options.get("output") in GCC_OUTPUTS:
+            options = options | {"gcc": gcc_identity()}
+
+        digest = hashlib.sha256()
+        digest.update(compiler_version().encode())
+        digest.update(json.dumps(options, sort_keys=True).encode())
+        digest.update(source)
+        return digest.hexdigest()
+
+    def entry(self, key):
+        return os.path.join(self.objects, key[:2], key)
+
+    def lookup(self, key):
+        """Directory with the stored outputs of the key, or None when the key isn't stored"""
+        path = self.entry(key)
+        if not os.path.isdir(path):
+            self.count(misses=1)
+            return None
+
+        try:
+            # mark the entry as used
+            os.utime(path)
+        except FileNotFoundError:
+            # evicted by another process in the meantime
+            self.count(misses=1)
+            return None
+
+        self.count(hits=1)
+        return path
+
+    def fetch(self, key, outputs):
+        """Copy the stored outputs of the key to their paths ({stored name: output path}), False on a miss"""
+        path = self.lookup(key)
+        if path is None:
+            return False
+
+        try:
+            for name, outputPath in outputs.items():
+                shutil.copy(os.path.join(path, name), outputPath)
+        except FileNotFoundError:
+            return False
+
+        return True
+
+    def store(self, key, files):
+        """Store the files ({stored name: path}) under the key"""
+        path = self.entry(key)
+        if os.path.isdir(path):
+            return
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # the entry is filled in a temporary directory first so other processes never see half an entry
+        temporary = tempfile.mkdtemp(dir=os.path.dirname(path))
+        for name, filePath in files.items():
+            shutil.copy(filePath, os.path.join(temporary, name))
+        size = directory_size(temporary)
+
+        try:
+            os.rename(temporary, path)
+        except OSError:
+            # another process stored the same key first
+            shutil.rmtree(temporary, ignore_errors=True)
+            return
+
+        self.count(bytes=size)
+        if self.read_stats()["bytes"] > self.max_bytes:
+            self.evict()
+
+    def entries(self):
+        """(last use, size, path) of every entry"""
+        entries = []
+        if not os.path.isdir(self.objects):
+            return entries
+
+        for prefix in os.listdir(self.objects):
+            prefixPath = os.path.join(self.objects, prefix)
+            for key in os.listdir(prefixPath):
+                path = os.path.join(prefixPath, key)
+                try:
+                    entries.append((os.stat(path).st_mtime, directory_size(path), path))
+                except FileNotFoundError:
+                    continue
+
+        return entries
+
+    def evict(self):
+        """Remove the least recently used entries until the outputs take at most max_bytes"""
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            evicted += 1
+
+        # the size that was just measured replaces the counted bytes, of this process as well
+        os.makedirs(self.directory, exist_ok=True)
+        with locked(self.statsPath + ".lock"):
+            stats = read_stats_file(self.statsPath)
+            stats["bytes"] = total
+            stats["evictions"] += evicted
+            write_stats_file(self.statsPath, stats)
+        pending_stats.get(self.statsPath, {})["bytes"] = 0
+
+    def count(self, **changes):
+        """Add to the counters of this process, they are written to stats.json when the process exits"""
+        global pending_pid
+
+        if pending_pid != os.getpid():
+            # the first count of this process, the counts of the process this one was forked from aren't its own
+            pending_stats.clear()
+            register_flush()
+            pending_pid = os.getpid()
+
+        counters = pending_stats.setdefault(self.statsPath, {"hits": 0, "misses": 0, "evictions": 0, "bytes": 0})
+        for name, change in changes.items():
+            counters[name] += change
+
+    def read_stats(self):
+        """The counters of stats.json with the ones of this process that aren't written yet"""
+        stats = read_stats_file(self.statsPath)
+        if pending_pid == os.getpid():
+            for name, change in pending_stats.get(self.statsPath, {}).items():
+                stats[name] += change
+
+        return stats
+
+    def stats(self):
+        stats = self.read_stats()
+        entries = self.entries()
+        stats["entries"] = len(entries)
+        stats["bytes"] = sum(size for _, size, _ in entries)
+        stats["max_bytes"] = self.max_bytes
+        stats["directory"] = self.directory
+
+        return stats
+
+
+def printStats(cache):
+    stats = cache.stats()
+    lookups = stats["hits"] + stats["misses"]
+    hitRate = stats["hits"] / lookups * 100 if lookups else 0.0
+
+    print(f"cache directory: {stats['directory']}")
+    print(f"entries:         {stats['entries']}")
+    print(f"size:            {stats['bytes']} / {stats['max_bytes']} bytes")
+    print(f"hits:            {stats['hits']} ({hitRate:.1f}%)")
+    print(f"misses:          {stats['misses']}")
+    print(f"evictions:       {stats['evictions']}")
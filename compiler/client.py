@@ -0,0 +1,99 @@
+import argparse
+import json
+import os
+import socket
+import sys
+import tempfile
+
+"""
+        COMPILE CLIENT
+Sends a compile request to the compile server (compiler/server.py), it only imports
+the standard library so it starts a lot faster than the compiler itself.
+"""
+
+DEFAULT_SOCKET = os.path.join(tempfile.gettempdir(), f"c-compiler-{os.getuid()}.sock")
+
+
+class CompileClient:
+    """A connection to the compile server, one connection can send any amount of requests"""
+
+    def __init__(self, socketPath=DEFAULT_SOCKET):
+        self.connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.connection.connect(socketPath)
+        self.responses = self.connection.makefile("rb")
+
+    def request(self, message):
+        self.connection.sendall(json.dumps(message).encode() + b"\n")
+        line = self.responses.readline()
+        if not line:
+            return {"ok": False, "error": "The compile server closed the connection"}
+
+        return json.loads(line)
+
+    def compile(self, source, output="assembly", name=None, outputDir=None):
+        message = {"source": source, "output": output}
+        if name is not None:
+            message["name"] = name
+        if outputDir is not None:
+            message["output_dir"] = os.path.abspath(outputDir)
+
+        return self.request(message)
+
+    def close(self):
+        self.responses.close()
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main(argv=None) -> int:
+    argparser = argparse.ArgumentParser(description="Compile a .c file with the compile server")
+    argparser.add_argument("file", nargs="?", help=".c file to compile")
+    argparser.add_argument("--socket", default=DEFAULT_SOCKET, help="path of the Unix domain socket")
+    argparser.add_argument("-S", dest="link", action="store_false", help="only write the assembly file, don't run gcc")
+    argparser.add_argument("-o", "--output-dir", default="compiled", help="directory for the assembly file and binary")
+    argparser.add_argument("--shutdown", action="store_true", help="stop the compile server")
+    args = argparser.parse_args(argv)
+
+    try:
+        client = CompileClient(args.socket)
+    except OSError:
+        print(f"Can't connect to the compile server on {args.socket}, start it with: python -m compiler.server")
+        return 1
+
+    with client:
+        if args.shutdown:
+            client.request({"command": "shutdown"})
+            return 0
+
+        if args.file is None:
+            argparser.error("give a .c file to compile")
+
+        with open(args.file) as sourceFile:
+            code = sourceFile.read()
+
+        sourceFileName = os.path.basename(args.file).split(".")[0]
+        response = client.compile(code, "binary" if args.link else "assembly", sourceFileName, args.output_dir)
+
+    if not response["ok"]:
+        print(response["error"])
+        return 1
+
+    if args.link:
+        print(f"You can find your binary in {response['binary']}")
+    else:
+        os.makedirs(args.output_dir, exist_ok=True)
+        assemblyFilePath = os.path.join(args.output_dir, sourceFileName + ".s")
+        with open(assemblyFilePath, "w") as asmFile:
+            asmFile.write(response["assembly"])
+        print(f"You can find your assembly in {assemblyFilePath}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,21 +1,27 @@
 import sys
 import os
-from typing import List
-import platform
-import subprocess
+import io
+import contextlib
+import json
 
-from compiler.parser.lexer import NewLexer, LexerError
-from compiler.parser.parse import Parser
-from compiler.tacky.tackyAST import gen
-from compiler.assembly.ASM import createAsmCode, createASMoutput, saveASMToFile
-import compiler.semantic_analysis.var_resolution as var_resoltion
+from compiler.context import CompilationContext
+from compiler.cache import CompileCache, default_cache_dir, gcc_identity
+from compiler.timing import NULL_TIMER
+
+"""
+ The stages of the compiler, platform and subprocess are imported by the functions that use them:
+ a file that comes out of the cache (or a usage message) doesn't pay for loading the whole compiler.
+"""
 
 
 def check_setup() -> bool:
     """Make sure the system requirements are met"""
 
+    import platform
+    import subprocess
+
     # A list of issues we can print at the end of the check
-    list_issues: List[str] = []
+    list_issues: list[str] = []
 
     # Check the Python version
     if sys.version_info.major < 3 or sys.version_info.minor < 8:
@@ -26,7 +32,7 @@ def check_setup() -> bool:
     machine = platform.machine().lower()
     system = platform.system()
 
-    VALID_ARCHS: List[str] = ["x86_64", "amd64"]
+    VALID_ARCHS: list[str] = ["x86_64", "amd64"]
     # this means we are on a Mac
     # MacOS make sure they're running on x86_64; if they're on ARM, notify to use Rosetta
     if system == "Darwin":
@@ -90,46 +96,292 @@ Then clone the test suite in your Linux distribution and try this command again
     return True
 
 
-def main(file) -> None:
+def setup_key():
+    """Everything the result of check_setup depends on: the interpreter, the platform and the gcc on PATH"""
+    gcc, gccMtime = gcc_identity()
+
+    # os.uname has the names of platform.system() and platform.machine() without importing platform
+    if hasattr(os, "uname"):
+        uname = os.uname()
+        system, machine = uname.sysname, uname.machine
+    else:
+        import platform
+        system, machine = platform.system(), platform.machine()
+
+    return [sys.executable, sys.version, system, machine, gcc, gccMtime]
+
+
+# setup key of the last check that passed in this process
+checked_setup = None
+
+
+def check_setup_cached(setupFile=None) -> bool:
+    """check_setup that only runs again when the interpreter, the platform or gcc changed
+
+    A check that passed is remembered in this process and on disk (setup.json in the cache directory),
+    a check that failed always runs again so a fixed setup is picked up.
+    """
+    global checked_setup
+
+    key = setup_key()
+    if key == checked_setup:
+        return True
+
+    if setupFile is None:
+        setupFile = os.path.join(default_cache_dir(), "setup.json")
+
+    try:
+        with open(setupFile) as checkFile:
+            if json.load(checkFile) == key:
+                checked_setup = key
+                return True
+    except (OSError, ValueError):
+        pass
+
     if not check_setup():
-        return
-    filePath = file
-    sourceFileName = os.path.basename(filePath).split(".")[0]
-    assemblyFileName = sourceFileName + ".s"
+        return False
+
+    checked_setup = key
+    try:
+        os.makedirs(os.path.dirname(setupFile), exist_ok=True)
+        with open(setupFile, "w") as checkFile:
+            json.dump(key, checkFile)
+    except OSError:
+        # not being able to remember the check only makes the next run slower
+        pass
+
+    return True
+
+
+def compile_source(code, context=None, timer=None):
+    """Run the compiler on the source code in this process, gives back the ASM program
+
+    timer (compiler/timing.py PassTimer, compiler/profiling.py StageProfiler) measures every stage, for --time-passes and --profile
+    """
+    from compiler.parser.lexer import NewLexer, LexerError
+    from compiler.parser.parse import Parser
+    import compiler.semantic_analysis.var_resolution as var_resoltion
+    from compiler.tacky.tackyAST import gen
+    from compiler.assembly.ASM import createAsmCode
 
-    with open(filePath) as sourceFile:
-        code = sourceFile.read()
+    if context is None:
+        context = CompilationContext()
+    measure = NULL_TIMER.measure if timer is None else timer.measure
+    stats = context.stats
 
     # Start lexer
     try:
-        lexerClass = NewLexer(code)
-        lexerClass.startLexer()
-        Tokens = lexerClass.TOKENS
+        with measure("NewLexer"):
+            lexerClass = NewLexer(code)
+            lexerClass.startLexer()
+            Tokens = lexerClass.TOKENS
     except LexerError as err:
         print(f"There was a match not found {err}")
         sys.exit()
 
     # Start parser
-    program = Parser(Tokens)
+    with measure("Parser"):
+        program = Parser(Tokens)
+
+    if stats is not None:
+        from compiler.statistics import countNodes
+        stats.add("NewLexer", "tokens", len(Tokens))
+        nodes = countNodes(program)
+        stats.add("Parser", "AST nodes", sum(nodes.values()))
+        for name, amount in sorted(nodes.items()):
+            stats.add("Parser", f"AST nodes {name}", amount)
 
     # Semantic Analysis
-    validated_ast = var_resoltion.resolve(program)
+    with measure("resolve"):
+        validated_ast = var_resoltion.resolve(program, context)
+
+    if stats is not None:
+        # every symbol so far is a unique variable name
+        variables = len(context.symbols)
+        stats.add("resolve", "variables", variables)
 
     # Convert AST to TACKY
-    TackyProgram = gen(validated_ast)
+    with measure("gen"):
+        TackyProgram = gen(validated_ast, context, compact=True)
+
+    if stats is not None:
+        # the labels are interned in the same table, only the new() symbols are variables and temporaries
+        stats.add("gen", "temporaries", context.symbols.unique.count(1) - variables)
+        stats.add("gen", "labels", context.labelcount)
+        stats.add("gen", "TACKY instructions", len(TackyProgram.function_definition))
+        for name, amount in sorted(TackyProgram.function_definition.opcode_counts().items()):
+            stats.add("gen", f"TACKY {name}", amount)
 
     # Turn into ASM
-    AsmProgram = createAsmCode(TackyProgram)
+    with measure("createAsmCode"):
+        return createAsmCode(TackyProgram, timer, stats)
+
+
+def try_compile_source(code, context=None):
+    """compile_source without exiting on errors, gives back [ASM program, None] or [None, error message]
+
+    The stages print their errors and exit, what they print is used as the error message.
+    """
+    messages = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(messages):
+            return [compile_source(code, context), None]
+    except (SystemExit, Exception) as err:
+        return [None, messages.getvalue().strip() or repr(err)]
+
+
+# no libc, no dynamic loader, no symbols and no page alignment of the sections: a binary of a few hundred bytes
+FREESTANDING_FLAGS = ["-nostdlib", "-static", "-s", "-Wl,-n,--build-id=none"]
+
+
+def gcc_command(binaryFilePath, freestanding=False):
+    """The gcc command that assembles and links the assembly on its stdin"""
+    command = ["gcc", "-x", "assembler", "-", "-o", binaryFilePath]
+    if freestanding:
+        command += FREESTANDING_FLAGS
+
+    return command
+
+
+def assemble_and_link(ASMProgram, binaryFilePath, context=None, freestanding=False, stats=None):
+    """Stream the assembly of the ASM program into gcc, gives back the error output of gcc or None when it worked
+
+    writeASMProgram writes straight into the stdin of gcc, the whole assembly text is never in memory.
+    freestanding also writes a _start and links without libc, stats (compiler/statistics.py) gets the bytes of assembly
+    """
+    import subprocess
+    import tempfile
+    from compiler.assembly.ASM import CountingWriter, writeASMProgram
+
+    # the error output goes to a file, a full stderr pipe would block gcc while the assembly is still being written
+    with tempfile.TemporaryFile() as errors:
+        gcc = subprocess.Popen(gcc_command(binaryFilePath, freestanding), stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=errors)
+        out = CountingWriter(io.TextIOWrapper(gcc.stdin, encoding="ascii"))
+        try:
+            writeASMProgram(ASMProgram, out, context, freestanding)
+            out.out.close()
+        except BrokenPipeError:
+            # gcc stopped reading, its error output says why
+            pass
+        returncode = gcc.wait()
+
+        if stats is not None:
+            stats.add("writeASMProgram", "assembly bytes", out.bytes)
+
+        if returncode != 0:
+            errors.seek(0)
+            return errors.read().decode(errors="replace").strip() or f"gcc exited with {returncode}"
+
+    return None
+
+
+async def assemble_and_link_async(assembly, binaryFilePath, freestanding=False):
+    """assemble_and_link for asyncio code (compiler/pipeline.py, compiler/server.py) with the assembly text of createASMoutput
+
+    The event loop keeps running while gcc assembles and links, gives back the error output of gcc or None when it worked
+    """
+    import asyncio
+
+    gcc = await asyncio.create_subprocess_exec(
+        *gcc_command(binaryFilePath, freestanding),
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    _, stderr = await gcc.communicate(assembly.encode())
+    if gcc.returncode != 0:
+        return stderr.decode(errors="replace").strip() or f"gcc exited with {gcc.returncode}"
+
+    return None
+
+
+# output -> (suffix of the output file, name of the file in the cache, what the output is called)
+OUTPUTS = {
+    "binary": ("", "program", "binary"),
+    "assembly": (".s", "program.s", "assembly"),
+    "object": (".o", "program.o", "object file"),
+    "elf": ("", "program.elf", "binary"),
+    "freestanding": ("", "program.freestanding", "binary"),
+}
+
+
+def main(file, use_cache=True, output="binary", timer=None, stats=None) -> None:
+    """Compile the file into ./compiled
+
+    output = "binary"   link the assembly with gcc
+           | "assembly" only write the .s file
+           | "object"   write a .o file with the built-in encoder, without an assembler
+           | "elf"      write a static executable with the built-in encoder, without gcc
+           | "freestanding" link with gcc without libc, main is called by our own _start
+
+    timer (compiler/timing.py PassTimer, compiler/profiling.py StageProfiler) measures every stage
+    and stats (compiler/statistics.py Statistics) gets the counters of every stage, the file is always compiled then
+    """
+    if not check_setup_cached():
+        return
+    measure = NULL_TIMER.measure if timer is None else timer.measure
+    if timer is not None or stats is not None:
+        # a cached file isn't compiled, there would be nothing to measure
+        use_cache = False
+    filePath = file
+    sourceFileName = os.path.basename(filePath).split(".")[0]
+
+    with open(filePath, "rb") as sourceFile:
+        source = sourceFile.read()
+
+    suffix, cachedName, description = OUTPUTS[output]
+    outputFilePath = f"compiled/{sourceFileName}{suffix}"
+    outputs = {cachedName: outputFilePath}
+
+    # an unchanged source is copied out of the cache instead of compiled again
+    if use_cache:
+        cache = CompileCache()
+        key = cache.key(source, {"platform": sys.platform, "output": output})
+        if cache.fetch(key, outputs):
+            print(f"You can find your {description} in ./{outputFilePath}")
+            return
+
+    code = source.decode()
+
+    context = CompilationContext()
+    context.stats = stats
+    if output == "elf" and context.platform not in ("linux", "linux2"):
+        print("The built-in ELF writer only makes Linux executables, leave out --no-gcc on this platform")
+        return
+    if output == "freestanding" and context.platform not in ("linux", "linux2"):
+        print("The _start of a freestanding binary uses Linux system calls, leave out --freestanding on this platform")
+        return
+
+    AsmProgram = compile_source(code, context, timer)
 
-    # Create ASM code
-    AsmCode = createASMoutput(AsmProgram)
-    # print(AsmCode)
+    from compiler.assembly.ASM import saveASMProgramToFile
 
-    # Create assembly file and insert code
-    saveASMToFile(AsmCode, f"compiled/{assemblyFileName}")
+    if output == "assembly":
+        # Create assembly file and write the ASM code into it
+        with measure("saveASMProgramToFile"):
+            saveASMProgramToFile(AsmProgram, outputFilePath, context)
+    elif output == "object" or output == "elf":
+        from compiler.assembly.encoder import encodeProgram
+        from compiler.assembly.elf import elfObject, elfExecutable, writeELF
+        with measure("encodeProgram"):
+            function = encodeProgram(AsmProgram)
+        if stats is not None:
+            stats.add("encodeProgram", "machine code bytes", len(function.code))
+        with measure("writeELF"):
+            if output == "object":
+                writeELF(elfObject(function), outputFilePath)
+            else:
+                writeELF(elfExecutable(function), outputFilePath, executable=True)
+    else:
+        # Compile the program, the assembly is written into gcc over a pipe
+        with measure("gcc"):
+            error = assemble_and_link(AsmProgram, outputFilePath, context, output == "freestanding", stats)
+        if error is not None:
+            print(error)
+            return
 
-    # Compile the program
-    os.system(f"gcc compiled/{assemblyFileName} -o compiled/{sourceFileName}")
+    if use_cache:
+        cache.store(key, outputs)
 
     # All done
-    print(f"You can find your binary in ./compiled/{sourceFileName}")
+    print(f"You can find your {description} in ./{outputFilePath}")
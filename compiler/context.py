@@ -0,0 +1,22 @@
+import sys
+
+from compiler.interning import SymbolTable
+
+
+class CompilationContext:
+    """
+        The state of a single compilation, it is passed from the lexer to the ASM generator.
+        Every compilation gets its own context, so compilations running in the same process
+        (or in threads) don't share any counters and always give the same names.
+    """
+    __slots__ = ("symbols", "labelcount", "platform", "stats")
+
+    def __init__(self, platform=None):
+        # the temporaries and the unique variable names
+        self.symbols = SymbolTable()
+        # this is here to keep count of the labels made
+        self.labelcount = 0
+        # the platform we generate the assembly for
+        self.platform = sys.platform if platform is None else platform
+        # counters of the stages (compiler/statistics.py Statistics), only for --stats
+        self.stats = None
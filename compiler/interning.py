@@ -0,0 +1,67 @@
+import sys
+
+"""
+ SYMBOLS AND FLYWEIGHTS SHARED BY THE COMPILER STAGES
+"""
+
+
+class SymbolTable:
+    """Gives every name a small integer id, the text of a unique name is only made when it is asked for"""
+    __slots__ = ("bases", "unique", "interned")
+
+    def __init__(self):
+        # id -> (base) name
+        self.bases = []
+        # id -> 1 for the symbols made by new(), 0 for the interned names
+        self.unique = bytearray()
+        # name -> id, for the names that were interned, None after freeze()
+        self.interned = {}
+
+    def __len__(self):
+        return len(self.bases)
+
+    def intern(self, name):
+        """The id of a name, the same name always gets the same id"""
+        if self.interned is None:
+            print(f"ERROR: Can't intern {name}, the symbol table is frozen")
+            sys.exit()
+
+        symbol = self.interned.get(name)
+        if symbol is None:
+            symbol = len(self.bases)
+            self.bases.append(name)
+            self.unique.append(0)
+            self.interned[name] = symbol
+
+        return symbol
+
+    def new(self, base):
+        """A new unique symbol, its name is {base}.{id}"""
+        symbol = len(self.bases)
+        self.bases.append(base)
+        self.unique.append(1)
+        return symbol
+
+    def name(self, symbol):
+        base = self.bases[symbol]
+        if self.unique[symbol]:
+            return f"{base}.{symbol}"
+
+        return base
+
+    def freeze(self):
+        """Drop the name -> id lookup when no more names are interned, the ids and name() keep working"""
+        self.interned = None
+
+
+class Flyweight:
+    """Base for the classes without any state, calling the class always gives back the same instance"""
+    __slots__ = ()
+
+    def __new__(cls):
+        instance = cls.__dict__.get("_instance")
+        if instance is None:
+            instance = super().__new__(cls)
+            cls._instance = instance
+
+        return instance
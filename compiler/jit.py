@@ -0,0 +1,107 @@
+import ctypes
+import mmap
+import platform
+import sys
+
+from compiler.assembly.encoder import encodeProgram
+from compiler.compile import compile_source
+from compiler.context import CompilationContext
+
+"""
+        IN-PROCESS EXECUTION
+The machine code of main (compiler/assembly/encoder.py) is copied into an anonymous memory
+mapping, the mapping is made executable and main is called through ctypes. No binary is
+written and no process is started.
+
+The code runs inside the Python process: a program that crashes (like a division by zero)
+takes the Python process down with it.
+"""
+
+libc = ctypes.CDLL(None, use_errno=True)
+libc.mmap.restype = ctypes.c_void_p
+libc.mmap.argtypes = (ctypes.c_void_p, ctypes.c_size_t, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_long)
+libc.mprotect.restype = ctypes.c_int
+libc.mprotect.argtypes = (ctypes.c_void_p, ctypes.c_size_t, ctypes.c_int)
+libc.munmap.restype = ctypes.c_int
+libc.munmap.argtypes = (ctypes.c_void_p, ctypes.c_size_t)
+
+MAP_FAILED = ctypes.c_void_p(-1).value
+
+# int main(void)
+MAIN_TYPE = ctypes.CFUNCTYPE(ctypes.c_int)
+
+
+def check_jit_support() -> bool:
+    if platform.machine().lower() not in ("x86_64", "amd64") or not sys.platform.startswith("linux"):
+        print("Running in-process needs x86-64 Linux")
+        return False
+
+    return True
+
+
+class JitFunction:
+    """Machine code in an executable memory mapping, calling the object runs it and gives back what it returns"""
+    __slots__ = ("name", "address", "size", "function")
+
+    def __init__(self, encodedFunction):
+        self.name = encodedFunction.name
+        self.address = None
+        code = encodedFunction.code
+        self.size = max(mmap.PAGESIZE, (len(code) + mmap.PAGESIZE - 1) // mmap.PAGESIZE * mmap.PAGESIZE)
+
+        address = libc.mmap(None, self.size, mmap.PROT_READ | mmap.PROT_WRITE, mmap.MAP_PRIVATE | mmap.MAP_ANONYMOUS, -1, 0)
+        if address is None or address == MAP_FAILED:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"Can't map memory for the code of {self.name}")
+        self.address = address
+
+        ctypes.memmove(address, code, len(code))
+
+        # the mapping is never writable and executable at the same time
+        if libc.mprotect(address, self.size, mmap.PROT_READ | mmap.PROT_EXEC) != 0:
+            errno = ctypes.get_errno()
+            self.close()
+            raise OSError(errno, f"Can't make the code of {self.name} executable")
+
+        self.function = MAIN_TYPE(address)
+
+    def __call__(self):
+        return self.function()
+
+    def close(self):
+        if self.address is not None:
+            libc.munmap(self.address, self.size)
+            self.address = None
+            self.function = None
+
+    def __del__(self):
+        self.close()
+
+
+def compile_to_callable(source, context=None):
+    """Compile C source code and give back main as a Python callable, calling it runs main and gives back its return value
+
+    Compile errors are handled like compile_source: the error is printed and the program exits.
+    """
+    if context is None:
+        context = CompilationContext()
+
+    return JitFunction(encodeProgram(compile_source(source, context)))
+
+
+def run_source(source):
+    """Compile and run C source code in this process, gives back the return value of main"""
+    function = compile_to_callable(source)
+    try:
+        return function()
+    finally:
+        function.close()
+
+
+def run_file(filePath):
+    """Compile and run a .c file in this process, gives back the return value of main"""
+    if not check_jit_support():
+        sys.exit(1)
+
+    with open(filePath) as sourceFile:
+        return run_source(sourceFile.read())
@@ -1,7 +1,5 @@
 
 import sys
-from typing import List
-from dataclasses import dataclass
 
 from compiler.parser.lexer import TokenType
 
@@ -47,6 +45,7 @@ class ParseErrorEmpty(Exception):
 
 class Binary:
     """Binary operation"""
+    __slots__ = ("binary_operator", "exp1", "exp2")
     def __init__(self, binary_operator, exp, exp2) -> None:
         self.binary_operator = binary_operator
         # lhs
@@ -55,38 +54,44 @@ class Binary:
         self.exp2 = exp2
 
 
-@dataclass
 class Binary_Operator:
     """Binary operation"""
-    operator: TokenType
+    __slots__ = ("operator",)
     operatorsList = [TokenType.PLUS_OPERATOR, TokenType.MULTIPLICATION_OPERATOR, TokenType.DIVISION_OPERATOR, TokenType.REMAINDER_OPERATOR, TokenType.UNARY_NEGATE, TokenType.NEQ_OPERATOR, TokenType.LTE_OPERATOR, TokenType.LT_OPERATOR, TokenType.GTE_OPERATOR, TokenType.GT_OPERATOR, TokenType.EQ_OPERATOR, TokenType.AND_OPERATOR, TokenType.OR_OPERATOR, TokenType.ASSIGNMENT_OPERATOR]
 
+    def __init__(self, operator: TokenType) -> None:
+        self.operator = operator
+
 
 class Constant:
     """A constant value (example: int)"""
+    __slots__ = ("int",)
     def __init__(self, expint):
         self.int = int(expint)
 
 
 class Var:
     """This is a variable name"""
+    __slots__ = ("identifier",)
     def __init__(self, identifier: str) -> None:
         self.identifier = identifier
 
 
 class Null(object):
     """Line with only ';'"""
-    pass
+    __slots__ = ()
 
 
 class Unary_Operator:
     """Unary operator"""
+    __slots__ = ("operator",)
     def __init__(self, operator) -> None:
         self.operator = operator
 
 
 class Unary:
     """Unary operations"""
+    __slots__ = ("unary_operator", "exp")
     def __init__(self, unary_operator, exp) -> None:
         self.unary_operator = unary_operator
         self.exp = exp
@@ -94,6 +99,7 @@ class Unary:
 
 class ReturnStatement:
     """Unary statement"""
+    __slots__ = ("exp",)
     def __init__(self, exp):
         self.exp = exp
 
@@ -101,12 +107,14 @@ class ReturnStatement:
 # TO-DO: add Expression
 class Statement:
     """A statement"""
+    __slots__ = ("statement",)
     def __init__(self, statement) -> None:
         self.statement: Null | ReturnStatement = statement
 
 
 class Declaration:
     """A variable declaration, example: int a = 0; int a;"""
+    __slots__ = ("name", "init")
     def __init__(self, name, init=None) -> None:
         self.name = name
         # If the variable is initialized in the same line that it is declared this willl be 1
@@ -115,6 +123,7 @@ class Declaration:
 
 class Assignment:
     """A variable assignment (if a variable is declared and initialzed in same line this will be in the declaration.init) examples: int a = 0; a = 5;"""
+    __slots__ = ("left_exp", "right_exp")
     def __init__(self, left, right) -> None:
         self.left_exp = left
         self.right_exp = right
@@ -123,13 +132,15 @@ class Assignment:
 class FunctionDefinition:
     """Here is the body of the function the instructions and the name of the function"""
     """A function definition, example: int main()"""
+    __slots__ = ("name", "body")
     def __init__(self, name, body):
         self.name: str = name
-        self.body: List[ReturnStatement | Declaration] = body
+        self.body: list[ReturnStatement | Declaration] = body
 
 
 # in C we would use structs, in python we can use Classes
 class Program:
     """The whole program stores all the functions"""
+    __slots__ = ("function_def",)
     def __init__(self, function_def):
         self.function_def: FunctionDefinition = function_def
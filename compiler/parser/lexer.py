@@ -1,7 +1,6 @@
+import re
 import sys
 from enum import Enum, auto
-from dataclasses import dataclass
-from typing import Optional
 
 """
  PARSER AND CLASSES FOR CODE
@@ -46,52 +45,79 @@ class TokenType(Enum):
     SEMICOLON = auto()
 
 
-@dataclass
 class Token:
-    tok_type: TokenType
-    tok_val: Optional[str | int] = None
+    __slots__ = ("tok_type", "tok_val")
+    def __init__(self, tok_type: TokenType, tok_val: str | int | None = None) -> None:
+        self.tok_type = tok_type
+        self.tok_val = tok_val
+
+    def __repr__(self):
+        return f"Token(tok_type={self.tok_type}, tok_val={self.tok_val!r})"
 
 
 class NewLexer:
 
-    regexes = {
-        (r'^[a-zA-Z_]\w*\b', 'IDENTIFIER'),
-        (r'^[0-9]+\b', 'CONSTANT'),
-        (r'^\(', 'OPEN_PARENTHESIS'),
-        (r'^-', 'UNARY_NEGATE'),
-        (r'^~', 'UNARY_TILDE'),
-        (r'^\+', 'PLUS_OPERATOR'),
-        (r'^\*', 'MULTIPLICATION_OPERATOR'),
-        (r'^\/', 'DIVISION_OPERATOR'),
-        (r'^\%', 'REMAINDER_OPERATOR'),
-        (r'^\)', 'CLOSE_PARENTHESIS'),
-        (r'^\!', 'NOT_OPERATOR'),
-        (r'^&&', 'AND_OPERATOR'),
-        (r'^\|\|', 'OR_OPERATOR'),
-        (r'^==', 'EQ_OPERATOR'),
-        (r'^\!=', 'NEQ_OPERATOR'),
-        (r'^<', 'LT_OPERATOR'),
-        (r'^>', 'GT_OPERATOR'),
-        (r'^<=', 'LTE_OPERATOR'),
-        (r'^>=', 'GTE_OPERATOR'),
-        # (r'^&', 'BITWISE_AND'),
-        # (r'^\|', 'BITWISE_OR'),
-        # (r'^\^', 'BITWISE_XOR'),
-        # (r'^<<', 'LEFT_SHIFT'),
-        # (r'^>>', 'RIGHT_SHIFT'),
-        (r'^{', 'OPEN_BRACE'),
-        (r'^}', 'CLOSE_BRACE'),
-        (r'^;', 'SEMICOLON'),
+    # Token patterns for the master regex, the order matters: two character
+    # operators have to come before their one character prefixes
+    regexes = (
+        (r'//[^\n]*', 'COMMENT'),
+        (r'[a-zA-Z_]\w*\b', 'IDENTIFIER'),
+        (r'[0-9]+\b', 'CONSTANT'),
+        (r'\(', 'OPEN_PARENTHESIS'),
+        (r'\)', 'CLOSE_PARENTHESIS'),
+        (r'-', 'UNARY_NEGATE'),
+        (r'~', 'UNARY_TILDE'),
+        (r'\+', 'PLUS_OPERATOR'),
+        (r'\*', 'MULTIPLICATION_OPERATOR'),
+        (r'/', 'DIVISION_OPERATOR'),
+        (r'%', 'REMAINDER_OPERATOR'),
+        (r'&&', 'AND_OPERATOR'),
+        (r'\|\|', 'OR_OPERATOR'),
+        (r'==', 'EQ_OPERATOR'),
+        (r'!=', 'NEQ_OPERATOR'),
+        (r'!', 'NOT_OPERATOR'),
+        (r'<=', 'LTE_OPERATOR'),
+        (r'<', 'LT_OPERATOR'),
+        (r'>=', 'GTE_OPERATOR'),
+        (r'>', 'GT_OPERATOR'),
+        (r'=', 'ASSIGNMENT_OPERATOR'),
+        # (r'&', 'BITWISE_AND'),
+        # (r'\|', 'BITWISE_OR'),
+        # (r'\^', 'BITWISE_XOR'),
+        # (r'<<', 'LEFT_SHIFT'),
+        # (r'>>', 'RIGHT_SHIFT'),
+        (r'{', 'OPEN_BRACE'),
+        (r'}', 'CLOSE_BRACE'),
+        (r';', 'SEMICOLON'),
+        # anything else is handed to the char-by-char lexer
+        (r'.', 'MISMATCH'),
+        # only whitespace left after the last token
+        (r'\Z', 'END'),
+    )
+
+    keywords = {
+        "int": "INT_KEYWORD",
+        "void": "VOID_KEYWORD",
+        "return": "RETURN_KEYWORD",
     }
 
-    keyword_regexes = {
-        (r'^int\b', 'INT_KEYWORD'),
-        (r'^void\b', 'VOID_KEYWORD'),
-        (r'^return\b', 'RETURN_KEYWORD'),
+    # token types of the patterns that don't carry a value
+    operator_types = {
+        name: TokenType[name]
+        for _, name in regexes
+        if name not in ("COMMENT", "IDENTIFIER", "CONSTANT", "MISMATCH", "END")
     }
 
-    def __init__(self, source):
+    # every match skips the whitespace in front of the token
+    master_regex = re.compile(
+        r"[ \t\r\n\f\v]*(?:" + "|".join(f"(?P<{name}>{pattern})" for pattern, name in regexes) + ")",
+        re.ASCII | re.DOTALL,
+    )
+
+    def __init__(self, source, use_regex=True):
         self.source = source
+        # when False we only use the old char-by-char lexer
+        self.use_regex = use_regex
         self.sourcelen = len(source)
         self.pointer = 0
         self.TOKENS = []
@@ -99,7 +125,7 @@ class NewLexer:
             print("The source file you gave is empty")
             sys.exit()
 
-    def addToken(self, token, value: Optional[str | int] = None):
+    def addToken(self, token, value: str | int | None = None):
         if value is not None:
             self.TOKENS.append(Token(token, value))
         else:
@@ -109,40 +135,78 @@ class NewLexer:
         # self.TOKENS.append({"type": token, "value": value})
 
     def readNumber(self):
-        number = ""
+        start = self.pointer
 
         assert self.peek() is not None
 
-        while str(self.peek()).isdigit():
-            number = number + str(self.consume())
-        self.addToken(TokenType.CONSTANT, int(number))
+        while self.peek() is not None and self.peek().isdigit():
+            self.advance()
+        self.addToken(TokenType.CONSTANT, int(self.source[start:self.pointer]))
 
     def readIdentifier(self):
-        setIdentifiers = {
-            "int": "INT_KEYWORD",
-            "void": "VOID_KEYWORD",
-            "return": "RETURN_KEYWORD",
-        }
-
-        identifier = ""
+        start = self.pointer
 
         assert self.peek() is not None
 
         # we should also add digits so that we can check for variable names such as: var0
-        while str(self.peek()).isalpha() or str(self.peek()) == "_" or str(self.peek()).isdigit():
-            identifier = identifier + str(self.consume())
+        while self.peek() is not None and (self.peek().isalnum() or self.peek() == "_"):
+            self.advance()
 
-        if identifier in setIdentifiers:
+        identifier = self.source[start:self.pointer]
+        if identifier in self.keywords:
             self.addToken(TokenType.KEYWORD, identifier)
         else:
             self.addToken(TokenType.IDENTIFIER, identifier)
 
     def startLexer(self):
+        if self.use_regex:
+            self.scan()
+            return self.TOKENS
+
         while self.peek() is not None:
             self.lex()
 
         return self.TOKENS
 
+    def scan(self):
+        """Lex the whole source with the master regex in a single pass.
+
+        Whenever the master regex can't match a token we hand the current position
+        to the char-by-char lexer (lex) and continue scanning after it.
+        """
+        source = self.source
+        tokens = self.TOKENS
+        keywords = self.keywords
+        finditer = self.master_regex.finditer
+
+        operator_types = self.operator_types
+
+        while self.pointer < self.sourcelen:
+            for match in finditer(source, self.pointer):
+                kind = match.lastgroup
+
+                if kind in operator_types:
+                    tokens.append(Token(operator_types[kind]))
+                elif kind == "COMMENT" or kind == "END":
+                    continue
+                elif kind == "IDENTIFIER":
+                    value = match.group(kind)
+                    if value in keywords:
+                        tokens.append(Token(TokenType.KEYWORD, value))
+                    else:
+                        tokens.append(Token(TokenType.IDENTIFIER, value))
+                elif kind == "CONSTANT":
+                    tokens.append(Token(TokenType.CONSTANT, int(match.group(kind))))
+                else:
+                    # fall back to the old lexer for this position
+                    self.pointer = match.start(kind)
+                    self.lex()
+                    break
+            else:
+                self.pointer = self.sourcelen
+
+        return tokens
+
     def readComment(self):
         while self.peek() is not None and self.peek() != "\n":
             self.advance()
@@ -168,8 +232,12 @@ class NewLexer:
                 self.addToken(TokenType.MULTIPLICATION_OPERATOR)
                 self.advance()
             case "/":
-                self.addToken(TokenType.DIVISION_OPERATOR)
-                self.advance()
+                if self.peek_next() == "/":
+                    # this means this line is commented keep on going until the line is done
+                    self.readComment()
+                else:
+                    self.addToken(TokenType.DIVISION_OPERATOR)
+                    self.advance()
             case "%":
                 self.addToken(TokenType.REMAINDER_OPERATOR)
                 self.advance()
@@ -235,12 +303,6 @@ class NewLexer:
                 self.readIdentifier()
             case value if value in whitespace:
                 self.advance()
-            case "/":
-                if self.peek_next() == "/":
-                    # this means this line is commented keep on going until the line is done
-                    self.readComment()
-                else:
-                    self.advance()
             case _:
                 print(value)
                 print("Could not find any match with the lexer!")
@@ -64,124 +64,167 @@ class ParseErrorEmpty(Exception):
         sys.exit()
 
 
-def expect(expectedType, tokens):
-    if len(tokens) == 0:
-        raise ParseErrorEmpty()
-
-    actualToken = tokens.pop(0)
-    if type(expectedType) is str:
-        if actualToken.tok_val != expectedType:
-            raise ParseError(expectedType, actualToken.tok_val)
-    elif isinstance(expectedType, TokenType):
-        if actualToken.tok_type != expectedType:
-            raise ParseError(expectedType, actualToken.tok_val)
-    else:
-        print("WRONG INFO")
-        sys.exit()
-
-    return tokens
-
-
-def peek_next_token(tokens):
-    return tokens[1]
+class TokenStream:
+    """Cursor over the tokens of the lexer, consuming a token only moves the cursor"""
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.position = 0
+
+    def __len__(self):
+        # the amount of tokens that are left
+        return len(self.tokens) - self.position
+
+    def peek(self, offset=0):
+        try:
+            return self.tokens[self.position + offset]
+        except IndexError:
+            raise ParseErrorEmpty()
+
+    def advance(self):
+        try:
+            token = self.tokens[self.position]
+        except IndexError:
+            raise ParseErrorEmpty()
+
+        self.position += 1
+        return token
+
+    def expect(self, expectedType):
+        actualToken = self.advance()
+        if type(expectedType) is str:
+            if actualToken.tok_val != expectedType:
+                raise ParseError(expectedType, actualToken.tok_val)
+        elif isinstance(expectedType, TokenType):
+            if actualToken.tok_type != expectedType:
+                raise ParseError(expectedType, actualToken.tok_val)
+        else:
+            print("WRONG INFO")
+            sys.exit()
 
+        return actualToken
 
-def parse_unop(tokens):
-    this_token = tokens.pop(0)
-    if this_token.tok_type is not TokenType.UNARY_NEGATE and this_token.tok_type is not TokenType.UNARY_TILDE and this_token.tok_type is not TokenType.NOT_OPERATOR:
-        raise ParseError("UNARY OPERATOR", this_token.tok_type)
 
-    operator = Unary_Operator(this_token.tok_type)
+def expect(expectedType, tokens):
+    tokens.expect(expectedType)
 
-    return [operator, tokens]
+    return tokens
 
 
-def parse_binop(tokens):
-    this_token = tokens.pop(0)
+def peek_next_token(tokens):
+    return tokens.peek(1)
+
+
+# token types that start a factor with a unary operator
+UNARY_OPERATORS = (TokenType.UNARY_TILDE, TokenType.UNARY_NEGATE, TokenType.NOT_OPERATOR)
+
+# precedence of every binary operator, higher binds stronger
+PRECEDENCES = {
+    TokenType.MULTIPLICATION_OPERATOR: 50,
+    TokenType.DIVISION_OPERATOR: 50,
+    TokenType.REMAINDER_OPERATOR: 50,
+    TokenType.PLUS_OPERATOR: 45,
+    TokenType.UNARY_NEGATE: 45,
+    TokenType.LT_OPERATOR: 35,
+    TokenType.LTE_OPERATOR: 35,
+    TokenType.GT_OPERATOR: 35,
+    TokenType.GTE_OPERATOR: 35,
+    TokenType.EQ_OPERATOR: 30,
+    TokenType.NEQ_OPERATOR: 30,
+    TokenType.AND_OPERATOR: 10,
+    TokenType.OR_OPERATOR: 5,
+    TokenType.ASSIGNMENT_OPERATOR: 1,
+}
+
+
+def reduce_binary(operators, operands):
+    """Replace the two operands on top of the stack with the binary operator on top of the operator stack"""
+    this_token = operators.pop()
+    right = operands.pop()
+    left = operands.pop()
+
+    if this_token.tok_type is TokenType.ASSIGNMENT_OPERATOR:
+        operands.append(Assignment(left, right))
+    else:
+        operands.append(Binary(Binary_Operator(this_token.tok_type), left, right))
 
-    if this_token.tok_type not in Binary_Operator.operatorsList:
-        raise ParseError("A Binary_Operator", this_token.tok_type)
 
-    operator = Binary_Operator(this_token.tok_type)
+def parse_exp(tokens, min_prec):
+    """Precedence climbing with an operand and an operator stack instead of recursion,
+    so the nesting depth of an expression isn't limited by the recursion limit"""
+    operands = []
+    # Unary_Operator, the Token of a binary operator or None for an open parenthesis
+    operators = []
+    open_parentheses = 0
 
-    return [operator, tokens]
+    while True:
+        # factor: the unary operators and parentheses in front of it, then a constant or a variable
+        this_token = tokens.advance()
+        while this_token.tok_type in UNARY_OPERATORS or this_token.tok_type is TokenType.OPEN_PARENTHESIS:
+            if this_token.tok_type is TokenType.OPEN_PARENTHESIS:
+                operators.append(None)
+                open_parentheses += 1
+            else:
+                operators.append(Unary_Operator(this_token.tok_type))
+            this_token = tokens.advance()
+
+        if this_token.tok_type is TokenType.CONSTANT:
+            operands.append(Constant(this_token.tok_val))
+        elif this_token.tok_type is TokenType.IDENTIFIER:
+            operands.append(Var(this_token.tok_val))
+        else:
+            raise ParseErrorFactor(this_token.tok_val)
 
+        # the unary operators end with the factor, a close parenthesis ends everything up to its open parenthesis
+        next_token = tokens.peek()
+        while True:
+            while operators and type(operators[-1]) is Unary_Operator:
+                operands.append(Unary(operators.pop(), operands.pop()))
 
-def parse_factor(tokens):
-    this_token = tokens[0]
-    # next_token = peek_next_token(tokens)
-    # print(f"\n\n\nNext token: {next_token}\n\n\n")
-    if this_token.tok_type is TokenType.CONSTANT:
-        expression = Constant(this_token.tok_val)
-        tokens.pop(0)
-        return [expression, tokens]
+            if not open_parentheses or next_token.tok_type is not TokenType.CLOSE_PARENTHESIS:
+                break
 
-    elif this_token.tok_type is TokenType.UNARY_TILDE or this_token.tok_type is TokenType.UNARY_NEGATE or this_token.tok_type is TokenType.NOT_OPERATOR:
-        unary_operator, tokens = parse_unop(tokens)
-        inner_factor, tokens = parse_factor(tokens)
-        return [Unary(unary_operator, inner_factor), tokens]
+            while operators[-1] is not None:
+                reduce_binary(operators, operands)
+            operators.pop()
+            open_parentheses -= 1
+            tokens.advance()
+            next_token = tokens.peek()
 
-    elif this_token.tok_type is TokenType.OPEN_PARENTHESIS:
-        tokens.pop(0)
-        inner_exp, tokens = parse_exp(tokens, 0)
-        tokens = expect(TokenType.CLOSE_PARENTHESIS, tokens)
-        return [inner_exp, tokens]
+        # check if the token after the factor is a binary operator or not
+        prec = PRECEDENCES.get(next_token.tok_type)
+        if prec is None or (not open_parentheses and prec < min_prec):
+            break
 
-    elif this_token.tok_type is TokenType.IDENTIFIER:
-        token = tokens.pop(0)
-        return [Var(token.tok_val), tokens]
+        # everything that binds stronger is done, assignment is right associative so it doesn't end another assignment
+        while operators and operators[-1] is not None:
+            top_prec = PRECEDENCES[operators[-1].tok_type]
+            if top_prec > prec or (top_prec == prec and next_token.tok_type is not TokenType.ASSIGNMENT_OPERATOR):
+                reduce_binary(operators, operands)
+            else:
+                break
 
-    else:
-        raise ParseErrorFactor(this_token.tok_val)
+        operators.append(tokens.advance())
 
+    if open_parentheses:
+        tokens.expect(TokenType.CLOSE_PARENTHESIS)
 
-# Recursive function
-def parse_exp(tokens, min_prec):
-    left, tokens = parse_factor(tokens)
-    next_token = tokens[0]
-    # check if the token after the const/exp (left) is a binary operator or not (checks for "+" and "-")
-    while (next_token.tok_type in Binary_Operator.operatorsList) and precedenceOfToken(next_token) >= min_prec:
-
-        # double check to make sure if a Binary operator is inside of here
-        assert next_token.tok_type in Binary_Operator.operatorsList
-
-        if next_token.tok_type is TokenType.ASSIGNMENT_OPERATOR:
-            tokens.pop(0)  # Remove the assignment operator from the list of tokens
-            right, tokens = parse_exp(tokens, precedenceOfToken(next_token))
-            left = Assignment(left, right)
-        else:
-            operator, tokens = parse_binop(tokens)
-            right, tokens = parse_exp(tokens, precedenceOfToken(next_token) + 1)
-            left = Binary(operator, left, right)
+    while operators:
+        reduce_binary(operators, operands)
 
-        next_token = tokens[0]
-    return [left, tokens]
+    return [operands.pop(), tokens]
 
 
 def precedenceOfToken(token):
-    type = token.tok_type
-    match type:
-        case (TokenType.MULTIPLICATION_OPERATOR | TokenType.DIVISION_OPERATOR | TokenType.REMAINDER_OPERATOR):
-            return 50
-        case (TokenType.PLUS_OPERATOR | TokenType.UNARY_NEGATE):
-            return 45
-        case (TokenType.LT_OPERATOR | TokenType.LTE_OPERATOR | TokenType.GT_OPERATOR | TokenType.GTE_OPERATOR):
-            return 35
-        case (TokenType.EQ_OPERATOR | TokenType.NEQ_OPERATOR):
-            return 30
-        case TokenType.AND_OPERATOR:
-            return 10
-        case TokenType.OR_OPERATOR:
-            return 5
-        case TokenType.ASSIGNMENT_OPERATOR:
-            return 1
-        case _:
-            print(type)
-            raise ParseErrorPrec(type)
+    prec = PRECEDENCES.get(token.tok_type)
+    if prec is None:
+        print(token.tok_type)
+        raise ParseErrorPrec(token.tok_type)
+
+    return prec
 
 
 def peek(tokens):
-    return tokens[0]
+    return tokens.peek()
 
 
 def parse_statement(tokens):
@@ -205,7 +248,7 @@ def parse_declaration(tokens):
     tokens = expect("int", tokens)
     identifier, tokens = parse_identifier(tokens)
 
-    token = tokens.pop(0)
+    token = tokens.advance()
     if token.tok_type is TokenType.ASSIGNMENT_OPERATOR:
         exp, tokens = parse_exp(tokens, precedenceOfToken(token))
         tokens = expect(TokenType.SEMICOLON, tokens)
@@ -236,7 +279,7 @@ def parse_block_item(tokens):
 
 
 def parse_identifier(tokens):
-    token = tokens.pop(0)
+    token = tokens.advance()
     if token.tok_type != TokenType.IDENTIFIER:
         raise ParseError("IDENTIFIER", token.tok_type)
     return [token.tok_val, tokens]
@@ -244,6 +287,9 @@ def parse_identifier(tokens):
 
 # Parse function_definition
 def Parser(tokens):
+    if not isinstance(tokens, TokenStream):
+        tokens = TokenStream(tokens)
+
     while True:
         tokens = expect("int", tokens)
         fun_name, tokens = parse_identifier(tokens)
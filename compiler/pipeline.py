@@ -0,0 +1,152 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from compiler.assembly.ASM import createASMoutput
+from compiler.batch import FileResult, plan_outputs, printSummary, read_source
+from compiler.compile import assemble_and_link_async, check_setup_cached, try_compile_source
+from compiler.context import CompilationContext
+
+"""
+        PIPELINED BUILD
+The compiler works on file N+1 while gcc is assembling and linking file N:
+
+compile thread --> queue --> link tasks (at most `jobs` gcc processes at the same time)
+
+The compiler runs in a single thread next to the event loop, so the event loop stays free
+to feed the assembly to the gcc processes and to start new ones.
+"""
+
+STAGES = ("compile", "queue", "link", "total")
+
+
+def compile_to_assembly(filePath):
+    """Read and compile a file, gives back [assembly, None] or [None, error message]"""
+    _, code, error = read_source(filePath)
+    if error is not None:
+        return [None, error]
+
+    context = CompilationContext()
+    AsmProgram, error = try_compile_source(code, context)
+    if error is not None:
+        return [None, error]
+
+    return [createASMoutput(AsmProgram, context), None]
+
+
+class PipelinedBuild:
+    """Compiles the sources one by one and links them with a limited amount of gcc processes"""
+
+    def __init__(self, planned, outputDir="compiled", jobs=None):
+        """planned is the [(.c file, output path, error)] of compiler.batch.plan_outputs"""
+        self.planned = planned
+        self.sources = [source for source, _, _ in planned]
+        self.outputDir = outputDir
+        self.jobs = jobs or os.cpu_count() or 1
+        # seconds spent in every stage, one entry per file that reached the stage
+        self.latencies = {stage: [] for stage in STAGES}
+        self.results = [None] * len(planned)
+
+    def finish(self, index, start, ok, output=None, error=None):
+        seconds = time.perf_counter() - start
+        self.latencies["total"].append(seconds)
+        self.results[index] = FileResult(self.sources[index], ok, seconds, output=output, error=error)
+
+    async def produce(self, queue, compiler):
+        loop = asyncio.get_running_loop()
+        for index, (filePath, _, error) in enumerate(self.planned):
+            start = time.perf_counter()
+            if error is not None:
+                # the same output as a file before it
+                self.finish(index, start, False, error=error)
+                continue
+
+            assembly, error = await loop.run_in_executor(compiler, compile_to_assembly, filePath)
+            self.latencies["compile"].append(time.perf_counter() - start)
+
+            if error is not None:
+                self.finish(index, start, False, error=error)
+                continue
+
+            # waits when the linkers are behind, so only a few assembled files are kept in memory
+            await queue.put((index, start, assembly, time.perf_counter()))
+
+        for _ in range(self.jobs):
+            await queue.put(None)
+
+    async def link(self, queue):
+        while (item := await queue.get()) is not None:
+            index, start, assembly, queued = item
+            self.latencies["queue"].append(time.perf_counter() - queued)
+
+            binaryFilePath = self.planned[index][1]
+
+            linkStart = time.perf_counter()
+            try:
+                os.makedirs(os.path.dirname(binaryFilePath) or ".", exist_ok=True)
+                error = await assemble_and_link_async(assembly, binaryFilePath)
+            except OSError as err:
+                error = str(err)
+            self.latencies["link"].append(time.perf_counter() - linkStart)
+
+            if error is not None:
+                self.finish(index, start, False, error=error)
+            else:
+                self.finish(index, start, True, output=binaryFilePath)
+
+    async def run(self):
+        os.makedirs(self.outputDir, exist_ok=True)
+        queue = asyncio.Queue(maxsize=self.jobs * 2)
+
+        # one thread: the compiler holds the GIL anyway and redirects stdout while it runs
+        with ThreadPoolExecutor(max_workers=1) as compiler:
+            await asyncio.gather(self.produce(queue, compiler), *(self.link(queue) for _ in range(self.jobs)))
+
+        return self.results
+
+
+def build(paths, outputDir="compiled", jobs=None):
+    """Compile and link all the .c files of the paths, gives back the PipelinedBuild with its results and latencies"""
+    pipeline = PipelinedBuild(plan_outputs(paths, outputDir), outputDir, jobs)
+    asyncio.run(pipeline.run())
+    return pipeline
+
+
+def printLatencies(latencies):
+    print(f"{'stage':<8} {'files':>6} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'sum s':>8}")
+    for stage in STAGES:
+        times = sorted(latencies[stage])
+        if not times:
+            continue
+        mean = sum(times) / len(times)
+        p50 = times[len(times) // 2]
+        p95 = times[min(len(times) - 1, int(len(times) * 0.95))]
+        print(f"{stage:<8} {len(times):>6} {mean * 1000:>9.2f} {p50 * 1000:>9.2f} {p95 * 1000:>9.2f} {times[-1] * 1000:>9.2f} {sum(times):>8.2f}")
+
+
+def main(argv=None) -> int:
+    argparser = argparse.ArgumentParser(description="Compile .c files while gcc links the ones that are already compiled")
+    argparser.add_argument("paths", nargs="+", help=".c files or directories with .c files")
+    argparser.add_argument("-j", "--jobs", type=int, default=None, help="gcc processes at the same time (default: one per CPU)")
+    argparser.add_argument("-o", "--output-dir", default="compiled", help="directory for the binaries")
+    argparser.add_argument("--skip-setup-check", dest="check_setup", action="store_false", help="don't check the Python version, platform and gcc")
+    args = argparser.parse_args(argv)
+
+    if args.check_setup and not check_setup_cached():
+        return 1
+
+    start = time.perf_counter()
+    pipeline = build(args.paths, args.output_dir, args.jobs)
+    seconds = time.perf_counter() - start
+
+    printSummary(pipeline.results, seconds)
+    printLatencies(pipeline.latencies)
+
+    return 0 if all(result.ok for result in pipeline.results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
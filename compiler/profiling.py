@@ -0,0 +1,155 @@
+import contextlib
+import cProfile
+import os
+import pstats
+
+"""
+        PROFILING (--profile)
+A cProfile profile of every stage of a compile. StageProfiler can be given to compile_source
+and compile.main in place of a timer (compiler/timing.py), every stage gets its own profile:
+
+<directory>/
+    <stage>.pstats      python -m pstats <stage>.pstats, snakeviz, ...
+    <stage>.collapsed   collapsed stacks for flamegraph.pl or speedscope
+    all.collapsed       the stacks of every stage below a frame with the name of the stage
+
+cProfile only knows which function called which, not the whole stack. The collapsed stacks are
+rebuilt from the callers: the time of a function that is called from several places is split
+over them by how long each caller spent in it.
+
+For embedding:
+
+with profiling("profile") as profiler:
+    compile_source(code, timer=profiler)
+    with profiler.measure("createASMoutput"):
+        createASMoutput(...)
+"""
+
+# stacks shorter than this (in microseconds) are left out of the collapsed output
+MINIMUM_MICROSECONDS = 1
+
+
+class StageProfiler:
+    """A cProfile profile per stage, a stage that runs again (another file) adds to its profile"""
+
+    def __init__(self):
+        self.profiles = {}
+        # passes inside a stage are part of the profile of the stage, cProfile can't nest
+        self.depth = 0
+
+    @contextlib.contextmanager
+    def measure(self, name, category="stage"):
+        self.depth += 1
+        if self.depth > 1:
+            try:
+                yield None
+            finally:
+                self.depth -= 1
+            return
+
+        profile = self.profiles.get(name)
+        if profile is None:
+            profile = self.profiles[name] = cProfile.Profile()
+
+        profile.enable()
+        try:
+            yield profile
+        finally:
+            profile.disable()
+            self.depth -= 1
+
+    def stats(self, name):
+        return pstats.Stats(self.profiles[name])
+
+    def save(self, directory):
+        """Write the .pstats and .collapsed files of every stage, gives back the paths"""
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        allStacks = []
+
+        for name, profile in self.profiles.items():
+            statsPath = os.path.join(directory, f"{name}.pstats")
+            profile.dump_stats(statsPath)
+
+            stacks = collapsedStacks(self.stats(name))
+            collapsedPath = os.path.join(directory, f"{name}.collapsed")
+            writeCollapsed(stacks, collapsedPath)
+            allStacks.extend((f"{name};{stack}", microseconds) for stack, microseconds in stacks)
+
+            paths += [statsPath, collapsedPath]
+
+        allPath = os.path.join(directory, "all.collapsed")
+        writeCollapsed(allStacks, allPath)
+        paths.append(allPath)
+
+        return paths
+
+
+@contextlib.contextmanager
+def profiling(directory=None):
+    """Gives a StageProfiler, when directory is given the profiles are saved there at the end of the with block"""
+    profiler = StageProfiler()
+    try:
+        yield profiler
+    finally:
+        if directory is not None:
+            profiler.save(directory)
+
+
+def functionLabel(function):
+    fileName, line, name = function
+    # built-in functions have no file
+    if fileName == "~":
+        return name
+    return f"{name} ({os.path.basename(fileName)}:{line})"
+
+
+def collapsedStacks(stats):
+    """[(frames joined by ";", microseconds)] of the call graph of a pstats.Stats"""
+    # function -> {called function: seconds spent in it when called from function}
+    callees = {}
+    roots = []
+    for function, (_, _, _, _, callers) in stats.stats.items():
+        if not callers:
+            roots.append(function)
+        for caller, (_, _, _, cumulative) in callers.items():
+            callees.setdefault(caller, {})[function] = cumulative
+
+    stacks = {}
+    # (function, seconds to spread over the function and its callees, frames up to the function)
+    worklist = [(root, stats.stats[root][3], (root,)) for root in roots]
+    while worklist:
+        function, seconds, frames = worklist.pop()
+        _, _, ownTime, cumulative, _ = stats.stats[function]
+        # the part of all the calls of the function that belongs to this stack
+        share = seconds / cumulative if cumulative else 0.0
+
+        label = ";".join(functionLabel(frame) for frame in frames)
+        stacks[label] = stacks.get(label, 0.0) + ownTime * share
+
+        for callee, calleeSeconds in callees.get(function, {}).items():
+            calleeSeconds *= share
+            if calleeSeconds * 1e6 < MINIMUM_MICROSECONDS:
+                continue
+            if callee in frames:
+                # recursion: the time is already part of the frame higher up
+                continue
+            worklist.append((callee, calleeSeconds, frames + (callee,)))
+
+    return [(stack, round(seconds * 1e6)) for stack, seconds in stacks.items() if seconds * 1e6 >= MINIMUM_MICROSECONDS]
+
+
+def writeCollapsed(stacks, fileName):
+    with open(fileName, "w") as collapsedFile:
+        for stack, microseconds in stacks:
+            collapsedFile.write(f"{stack} {microseconds}\n")
+
+
+def printHotSpots(profiler, count=3):
+    """The functions with the most own time of every stage"""
+    print(f"{'stage':<24} {'own ms':>8}  function")
+    for name in profiler.profiles:
+        stats = profiler.stats(name).stats
+        slowest = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:count]
+        for function, (_, _, ownTime, _, _) in slowest:
+            print(f"{name:<24} {ownTime * 1000:>8.2f}  {functionLabel(function)}")
@@ -20,36 +20,61 @@ class Semantic_Analysis:
         pass
 
 
-def make_uniquename(name, variable_map: dict):
-    next_variablecount = len(variable_map)
+def make_uniquename(name, context):
+    # the unique name is a symbol id, context.symbols.name() gives back the text: {name}.{id}
+    return context.symbols.new(name)
 
-    newname = f"{str(name)}.{next_variablecount}"
 
-    return newname
+# marks that the expression under it on the stack has its sub expressions resolved
+RESOLVED = object()
 
 
 def resolve_exp(exp, variable_map: dict):
-    if isinstance(exp, Assignment):
-        if not isinstance(exp.left_exp, Var):
-            print("Invalid lvalue!")
-            sys.exit()
-        return Assignment(resolve_exp(exp.left_exp, variable_map), resolve_exp(exp.right_exp, variable_map))
-    elif isinstance(exp, Var):
-        if exp.identifier in variable_map:
-            return Var(variable_map[exp.identifier])
+    """Resolve the variables of an expression, the tree is walked with an explicit stack instead of recursion"""
+    stack = [exp]
+    # the resolved expressions, in the order they are finished
+    resolved = []
+
+    while stack:
+        exp = stack.pop()
+
+        if exp is RESOLVED:
+            exp = stack.pop()
+            expType = type(exp)
+            if expType is Binary:
+                exp2 = resolved.pop()
+                resolved.append(Binary(exp.binary_operator, resolved.pop(), exp2))
+            elif expType is Unary:
+                resolved.append(Unary(exp.unary_operator, resolved.pop()))
+            else:
+                right = resolved.pop()
+                resolved.append(Assignment(resolved.pop(), right))
+            continue
+
+        expType = type(exp)
+        if expType is Var:
+            if exp.identifier in variable_map:
+                resolved.append(Var(variable_map[exp.identifier]))
+            else:
+                print("Undeclared variable!")
+                sys.exit()
+        elif expType is Constant:
+            resolved.append(Constant(exp.int))
+        elif expType is Binary:
+            stack.extend((exp, RESOLVED, exp.exp2, exp.exp1))
+        elif expType is Unary:
+            stack.extend((exp, RESOLVED, exp.exp))
+        elif expType is Assignment:
+            if not isinstance(exp.left_exp, Var):
+                print("Invalid lvalue!")
+                sys.exit()
+            stack.extend((exp, RESOLVED, exp.right_exp, exp.left_exp))
         else:
-            print("Undeclared variable!")
+            print(exp)
+            print("Trying to resolve an unknown expression!")
             sys.exit()
-    elif isinstance(exp, Unary):
-        return Unary(exp.unary_operator, resolve_exp(exp.exp, variable_map))
-    elif isinstance(exp, Binary):
-        return Binary(exp.binary_operator, resolve_exp(exp.exp1, variable_map), resolve_exp(exp.exp2, variable_map))
-    elif isinstance(exp, Constant):
-        return Constant(exp.int)
-    else:
-        print(exp)
-        print("Trying to resolve an unknown expression!")
-        sys.exit()
+
+    return resolved.pop()
 
 
 def resolve_statement(statement: ReturnStatement | Null | Assignment | Binary | Constant | Var | Unary, variable_map: dict):
@@ -64,12 +89,12 @@ def resolve_statement(statement: ReturnStatement | Null | Assignment | Binary |
         sys.exit()
 
 
-def resolve_declaration(declaration: Declaration, variable_map: dict):
+def resolve_declaration(declaration: Declaration, variable_map: dict, context):
     if declaration.name in variable_map:
         print("Duplicate variable declaraiont")
         sys.exit()
 
-    unique_name = make_uniquename(declaration.name, variable_map)
+    unique_name = make_uniquename(declaration.name, context)
     variable_map[declaration.name] = unique_name
 
     if declaration.init is not None:
@@ -80,7 +105,7 @@ def resolve_declaration(declaration: Declaration, variable_map: dict):
     return [declaration, variable_map]
 
 
-def resolve_function_def(function_def: FunctionDefinition):
+def resolve_function_def(function_def: FunctionDefinition, context):
     variable_map = {}
     body = []
 
@@ -89,7 +114,7 @@ def resolve_function_def(function_def: FunctionDefinition):
             new_body = resolve_statement(line, variable_map)
             body.append(new_body)
         elif isinstance(line, Declaration):
-            new_body, variable_map = resolve_declaration(line, variable_map)
+            new_body, variable_map = resolve_declaration(line, variable_map, context)
             body.append(new_body)
         else:
             print(line)
@@ -103,5 +128,5 @@ def resolve_function_def(function_def: FunctionDefinition):
 #        this is needed because variable scopes are different in other functions
 
 
-def resolve(program: Program):
-    return Program(resolve_function_def(program.function_def))
+def resolve(program: Program, context):
+    return Program(resolve_function_def(program.function_def, context))
@@ -0,0 +1,176 @@
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from compiler.assembly.ASM import createASMoutput
+from compiler.client import DEFAULT_SOCKET
+from compiler.compile import assemble_and_link_async, check_setup_cached, try_compile_source
+from compiler.context import CompilationContext
+
+"""
+        COMPILE SERVER
+A long running process that keeps the compiler imported and answers compile requests
+over a Unix domain socket. Every message is a single line of JSON.
+
+The compiles run in a pool of worker processes: the event loop keeps serving the other clients
+while a large program compiles, and every worker redirects its own stdout for the error messages.
+
+request  = {"source": str, "output": "assembly" | "binary", "name": str?, "output_dir": str?}
+         | {"command": "ping" | "shutdown"}   (ping answers with the amount of compile requests served)
+response = {"ok": true, "assembly": str, "seconds": float}
+         | {"ok": true, "binary": str, "seconds": float}
+         | {"ok": false, "error": str}
+"""
+
+# biggest message (line) the server reads
+MESSAGE_LIMIT = 64 * 1024 * 1024
+
+
+def compile_to_assembly(source):
+    """Compile the source in a worker process, gives back [assembly, None] or [None, error message]"""
+    context = CompilationContext()
+    AsmProgram, error = try_compile_source(source, context)
+    if error is not None:
+        return [None, error]
+
+    return [createASMoutput(AsmProgram, context), None]
+
+
+def socket_in_use(socketPath):
+    """True when a server answers on the socket, False for a socket file left behind by a server that stopped"""
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socketPath)
+        return True
+    except OSError:
+        return False
+    finally:
+        probe.close()
+
+
+class CompileServer:
+    """Serves compile requests from any number of clients at the same time"""
+
+    def __init__(self, socketPath=DEFAULT_SOCKET, workers=None):
+        self.socketPath = socketPath
+        self.workers = workers or os.cpu_count() or 1
+        self.server = None
+        self.compilers = None
+        self.requests = 0
+
+    async def compile(self, request):
+        source = request.get("source")
+        if not isinstance(source, str):
+            return {"ok": False, "error": "The request has no source"}
+
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        try:
+            assembly, error = await loop.run_in_executor(self.compilers, compile_to_assembly, source)
+        except BrokenProcessPool:
+            # a worker died (the compiler crashed the interpreter), the next requests get new workers
+            self.compilers.shutdown(wait=False)
+            self.compilers = ProcessPoolExecutor(max_workers=self.workers)
+            return {"ok": False, "error": "The compiler process crashed"}
+        if error is not None:
+            return {"ok": False, "error": error}
+
+        if request.get("output", "assembly") == "assembly":
+            return {"ok": True, "assembly": assembly, "seconds": time.perf_counter() - start}
+
+        # gcc runs as a subprocess so the other clients are served while it links,
+        # the assembly goes to gcc over a pipe
+        outputDir = request.get("output_dir") or os.path.abspath("compiled")
+        name = os.path.basename(request.get("name") or "program")
+        binaryFilePath = os.path.join(outputDir, name)
+
+        os.makedirs(outputDir, exist_ok=True)
+        error = await assemble_and_link_async(assembly, binaryFilePath)
+        if error is not None:
+            return {"ok": False, "error": error}
+
+        return {"ok": True, "binary": binaryFilePath, "seconds": time.perf_counter() - start}
+
+    async def handle(self, request):
+        command = request.get("command")
+        if command == "ping":
+            return {"ok": True, "requests": self.requests}
+        elif command == "shutdown":
+            self.server.close()
+            return {"ok": True}
+        elif command is not None:
+            return {"ok": False, "error": f"Unknown command {command}"}
+
+        self.requests += 1
+        return await self.compile(request)
+
+    async def handle_client(self, reader, writer):
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("a request has to be a JSON object")
+                except ValueError as err:
+                    response = {"ok": False, "error": f"Malformed request: {err}"}
+                else:
+                    response = await self.handle(request)
+
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            # the client went away or sent a message above MESSAGE_LIMIT
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self) -> bool:
+        """Serve until a shutdown request, gives back False when another server already listens on the socket"""
+        if os.path.exists(self.socketPath):
+            if socket_in_use(self.socketPath):
+                print(f"A compile server is already listening on {self.socketPath}")
+                return False
+            # a socket file left behind by a server that didn't stop cleanly
+            os.unlink(self.socketPath)
+
+        self.server = await asyncio.start_unix_server(self.handle_client, path=self.socketPath, limit=MESSAGE_LIMIT)
+        print(f"Compile server listening on {self.socketPath}")
+        self.compilers = ProcessPoolExecutor(max_workers=self.workers)
+        try:
+            async with self.server:
+                await self.server.wait_closed()
+        finally:
+            self.compilers.shutdown()
+            if os.path.exists(self.socketPath):
+                os.unlink(self.socketPath)
+
+        return True
+
+
+def main(argv=None) -> int:
+    argparser = argparse.ArgumentParser(description="Run the compile server")
+    argparser.add_argument("--socket", default=DEFAULT_SOCKET, help="path of the Unix domain socket")
+    argparser.add_argument("-j", "--workers", type=int, default=None, help="worker processes that compile (default: one per CPU)")
+    argparser.add_argument("--skip-setup-check", dest="check_setup", action="store_false", help="don't check the Python version, platform and gcc")
+    args = argparser.parse_args(argv)
+
+    if args.check_setup and not check_setup_cached():
+        return 1
+
+    try:
+        if not asyncio.run(CompileServer(args.socket, args.workers).serve()):
+            return 1
+    except KeyboardInterrupt:
+        pass
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+import json
+
+"""
+        PASS STATISTICS (--stats)
+Counters of a single compile, grouped by the stage that counted them. A compile only counts
+when context.stats is a Statistics, the stages add their counts once when they are done
+(stats.add("NewLexer", "tokens", len(tokens))) so counting costs next to nothing.
+"""
+
+
+class Statistics:
+    """stage -> {counter: count}, in the order the stages added them"""
+    __slots__ = ("counters",)
+
+    def __init__(self):
+        self.counters = {}
+
+    def add(self, stage, name, amount=1):
+        counters = self.counters.get(stage)
+        if counters is None:
+            counters = self.counters[stage] = {}
+        counters[name] = counters.get(name, 0) + amount
+
+    def get(self, stage, name):
+        return self.counters.get(stage, {}).get(name, 0)
+
+    def merge(self, other):
+        """Add the counters of another Statistics, for the totals of many compiles"""
+        for stage, counters in other.counters.items():
+            for name, amount in counters.items():
+                self.add(stage, name, amount)
+
+
+def countNodes(root):
+    """{class name: nodes} of every object below root that has __slots__ (the AST nodes)"""
+    counts = {}
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(node)
+            continue
+
+        slots = getattr(type(node), "__slots__", None)
+        if slots is None:
+            continue
+
+        name = type(node).__name__
+        counts[name] = counts.get(name, 0) + 1
+        for slot in slots:
+            child = getattr(node, slot, None)
+            # operators and constants hold enums and ints, only follow the nodes
+            if isinstance(child, list) or hasattr(type(child), "__slots__"):
+                stack.append(child)
+
+    return counts
+
+
+def printStatistics(stats):
+    print(f"{'stage':<30} {'counter':<30} {'count':>10}")
+    for stage, counters in stats.counters.items():
+        for name, amount in counters.items():
+            print(f"{stage:<30} {name:<30} {amount:>10}")
+
+
+def writeStatistics(stats, fileName):
+    """The counters as JSON, "-" writes them to stdout"""
+    if fileName == "-":
+        print(json.dumps(stats.counters, indent=2))
+        return
+
+    with open(fileName, "w") as statsFile:
+        json.dump(stats.counters, statsFile, indent=2)
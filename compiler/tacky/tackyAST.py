@@ -2,12 +2,9 @@ import sys
 
 import compiler.parser.AST as AST
 import compiler.tacky.tacky_ir as Tacky
+import compiler.tacky.tacky_array as TackyArray
 from compiler.parser.lexer import TokenType
 
-# this is here to keep count of the temporary names made
-namecount = 0
-uniquenamecount = 0
-
 """
         THE TACKY IR
 program = Program(function_definition)
@@ -28,29 +25,23 @@ binary_operator = Add | Subtract | Multiply | Divide | Remainder | Equal
 
 
 # ASDL for Tacky
-def make_temporaryname():
-    global namecount
-
-    newname = f"tmp{namecount}"
-    namecount += 1
-
-    return newname
-
+def make_temporaryname(context):
+    # temporaries are symbol ids, the text of the name (tmp.{id}) is only made when it is needed
+    return context.symbols.new("tmp")
 
-def make_uniquename(name):
-    global uniquenamecount
 
-    newname = f"{str(name)}{uniquenamecount}"
-    uniquenamecount += 1
+def make_uniquename(name, context):
+    newname = f"{str(name)}{context.labelcount}"
+    context.labelcount += 1
 
     return newname
 
 
 def convert_unop(op):
     if op.operator == TokenType.UNARY_NEGATE:
-        temp_tacky = Tacky.Tacky_Unary_Operator(op.operator)
+        temp_tacky = Tacky.Tacky_Unary_Operator(Tacky.Negate())
     elif op.operator == TokenType.UNARY_TILDE:
-        temp_tacky = Tacky.Tacky_Unary_Operator(op.operator)
+        temp_tacky = Tacky.Tacky_Unary_Operator(Tacky.Complement())
     elif op.operator == TokenType.NOT_OPERATOR:
         temp_tacky = Tacky.Tacky_Unary_Operator(Tacky.Not())
     else:
@@ -102,11 +93,16 @@ def convert_binop(binary_operator):
     return new_operator
 
 
-def emit_unary_expression(operator):
-    eval_inner, src = emit_tacky(operator.exp)
+# steps of the emit_tacky worklist, the expression of a step is right under it
+SHORT_CIRCUIT = 1
+UNARY = 2
+BINARY = 3
+ASSIGNMENT = 4
 
+
+def emit_unary_expression(operator, src, context, instructions):
     # Create a temporary variable name to use in the assembly
-    dst_name = make_temporaryname()
+    dst_name = make_temporaryname(context)
 
     # Turn the dst name into a variable
     dst = Tacky.Var(dst_name)
@@ -114,35 +110,23 @@ def emit_unary_expression(operator):
     # Convert unary operator to it's TACKY equivalent (UnaryTacky)
     tacky_op = convert_unop(operator.unary_operator)
 
-    # Create the instructions list
-    eval_inner.append(Tacky.UnaryTacky(tacky_op, src, dst))
-
-    instructions = eval_inner
-    return [instructions, dst]
+    instructions.append(Tacky.UnaryTacky(tacky_op, src, dst))
 
+    return dst
 
-def emit_binary_expression(operator):
-    instructions = []
 
+def emit_binary_expression(operator, v1, v2, context, instructions, short_circuits):
+    """Emit the instructions after both operands, for && and || the jump after the first operand
+    is already in the instructions and gets its target here"""
     if operator.binary_operator.operator == TokenType.AND_OPERATOR:
-        eval_v1 = None
-        eval_v2 = None
-
-        eval_v1, v1 = emit_tacky(operator.exp1)
-        eval_v2, v2 = emit_tacky(operator.exp2)
+        false_label = make_uniquename("and_false", context)
+        end_label = make_uniquename("and_end", context)
 
-        false_label = make_uniquename("and_false")
-        end_label = make_uniquename("and_end")
-
-        dst_name = make_temporaryname()
+        dst_name = make_temporaryname(context)
         dst = Tacky.Var(dst_name)
 
-        assert eval_v1 is not None
-        assert eval_v2 is not None
+        short_circuits.pop().target = false_label
 
-        instructions.extend(eval_v1)
-        instructions.append(Tacky.JumpIfZero(v1, false_label))
-        instructions.extend(eval_v2)
         instructions.append(Tacky.JumpIfZero(v2, false_label))
         instructions.append(Tacky.Copy(Tacky.Constant(1), dst))
         instructions.append(Tacky.Jump(end_label))
@@ -150,27 +134,17 @@ def emit_binary_expression(operator):
         instructions.append(Tacky.Copy(Tacky.Constant(0), dst))
         instructions.append(Tacky.Label(end_label))
 
-        return [instructions, dst]
+        return dst
 
     elif operator.binary_operator.operator == TokenType.OR_OPERATOR:
-        eval_v1 = None
-        eval_v2 = None
-
-        eval_v1, v1 = emit_tacky(operator.exp1)
-        eval_v2, v2 = emit_tacky(operator.exp2)
+        true_label = make_uniquename("or_true", context)
+        end_label = make_uniquename("or_end", context)
 
-        true_label = make_uniquename("or_true")
-        end_label = make_uniquename("or_end")
-
-        dst_name = make_temporaryname()
+        dst_name = make_temporaryname(context)
         dst = Tacky.Var(dst_name)
 
-        assert eval_v1 is not None
-        assert eval_v2 is not None
+        short_circuits.pop().target = true_label
 
-        instructions.extend(eval_v1)
-        instructions.append(Tacky.JumpIfNotZero(v1, true_label))
-        instructions.extend(eval_v2)
         instructions.append(Tacky.JumpIfNotZero(v2, true_label))
         instructions.append(Tacky.Copy(Tacky.Constant(0), dst))
         instructions.append(Tacky.Jump(end_label))
@@ -178,92 +152,83 @@ def emit_binary_expression(operator):
         instructions.append(Tacky.Copy(Tacky.Constant(1), dst))
         instructions.append(Tacky.Label(end_label))
 
-        return [instructions, dst]
+        return dst
 
     else:
-        eval_v1 = None
-        eval_v2 = None
-
-        eval_v1, v1 = emit_tacky(operator.exp1)
-        eval_v2, v2 = emit_tacky(operator.exp2)
-
-        assert eval_v1 is not None
-        assert eval_v2 is not None
-
-        dst_name = make_temporaryname()
+        dst_name = make_temporaryname(context)
         dst = Tacky.Var(dst_name)
         tacky_op = convert_binop(operator.binary_operator)
 
-        instructions.extend(eval_v1)
-        instructions.extend(eval_v2)
         instructions.append(Tacky.Binary(tacky_op, v1, v2, dst))
 
-        return [instructions, dst]
+        return dst
 
 
 # Turn AST into TACKY
-def emit_tacky_return_statement(exp, instructions=None):
+def emit_tacky(exp, context, instructions=None):
+    """Emit the instructions of an expression in post-order with a worklist instead of recursion,
+    gives back [instructions, value of the expression]"""
     if instructions is None:
         instructions = []
 
-    if isinstance(exp, AST.Constant):
-        return [[], Tacky.Constant(exp.int)]
-
-    elif isinstance(exp, AST.Unary):
-        # what it returns: return [instructions, dst]
-        return emit_unary_expression(exp)
-
-    elif isinstance(exp, AST.Binary):
-        return emit_binary_expression(exp)
-
-    elif isinstance(exp, AST.Var):
-        instructions.append(Tacky.Var(exp.identifier))
-        return instructions
-
-    elif isinstance(exp, AST.Assignment):
-        eval_exp, result = emit_tacky(exp.right_exp)
-        instructions.append(Tacky.Copy(result, Tacky.Var(exp.left_exp.identifier)))
-        instructions.append(Tacky.Var(exp.left_exp.identifier))
-        return instructions
-
-    return None, None
-
-
-def emit_tacky(exp, instructions=None):
-    if instructions is None:
-        instructions = []
-
-    if isinstance(exp, AST.Constant):
-        return [[], Tacky.Constant(exp.int)]
-
-    elif isinstance(exp, AST.Unary):
-        # what it returns: return [instructions, dst]
-        return emit_unary_expression(exp)
-
-    elif isinstance(exp, AST.Binary):
-        return emit_binary_expression(exp)
-
-    elif isinstance(exp, AST.Var):
-        return [[], Tacky.Var(exp.identifier)]
-
-    elif isinstance(exp, AST.Assignment):
-        instruct, result = emit_tacky(exp.right_exp)
-        if instruct:
-            instructions.extend(instruct)
-        instructions.append(Tacky.Copy(result, Tacky.Var(exp.left_exp.identifier)))
-        return [instructions, Tacky.Var(exp.left_exp.identifier)]
+    # the values of the finished sub expressions
+    values = []
+    # jumps after the first operand of && and ||, waiting for their label
+    short_circuits = []
+    # expressions to evaluate and the steps to do after their sub expressions
+    work = [exp]
+
+    while work:
+        exp = work.pop()
+        expType = type(exp)
+
+        if expType is int:
+            step = exp
+            exp = work.pop()
+
+            if step == BINARY:
+                v2 = values.pop()
+                values.append(emit_binary_expression(exp, values.pop(), v2, context, instructions, short_circuits))
+            elif step == UNARY:
+                values.append(emit_unary_expression(exp, values.pop(), context, instructions))
+            elif step == SHORT_CIRCUIT:
+                if exp.binary_operator.operator == TokenType.AND_OPERATOR:
+                    jump = Tacky.JumpIfZero(values[-1], None)
+                else:
+                    jump = Tacky.JumpIfNotZero(values[-1], None)
+                instructions.append(jump)
+                short_circuits.append(jump)
+            else:
+                instructions.append(Tacky.Copy(values.pop(), Tacky.Var(exp.left_exp.identifier)))
+                values.append(Tacky.Var(exp.left_exp.identifier))
+
+        elif expType is AST.Var:
+            values.append(Tacky.Var(exp.identifier))
+        elif expType is AST.Constant:
+            values.append(Tacky.Constant(exp.int))
+        elif expType is AST.Binary:
+            if exp.binary_operator.operator in (TokenType.AND_OPERATOR, TokenType.OR_OPERATOR):
+                work.extend((exp, BINARY, exp.exp2, exp, SHORT_CIRCUIT, exp.exp1))
+            else:
+                work.extend((exp, BINARY, exp.exp2, exp.exp1))
+        elif expType is AST.Unary:
+            work.extend((exp, UNARY, exp.exp))
+        elif expType is AST.Assignment:
+            work.extend((exp, ASSIGNMENT, exp.right_exp))
+        else:
+            return None, None
 
-    return None, None
+    return [instructions, values.pop()]
 
 
-def emit_tacky_for_statement(statement: AST.ReturnStatement | AST.Null | AST.Assignment | AST.Binary | AST.Constant | AST.Var | AST.Unary):
+def emit_tacky_for_statement(statement: AST.ReturnStatement | AST.Null | AST.Assignment | AST.Binary | AST.Constant | AST.Var | AST.Unary, context):
     if not isinstance(statement, (AST.ReturnStatement, AST.Null, AST.Assignment, AST.Binary, AST.Constant, AST.Var, AST.Unary)):
         # this should not happen
         print("Something went wrong, code: #55")
         sys.exit()
 
     if isinstance(statement, AST.ReturnStatement):
-        eval_exp, dst = emit_tacky(statement.exp)
+        eval_exp, dst = emit_tacky(statement.exp, context)
 
         if eval_exp is None and dst is None:
             print("Something went wrong at Tacky generator")
@@ -275,26 +240,31 @@ def emit_tacky_for_statement(statement: AST.ReturnStatement | AST.Null | AST.Ass
 
         return [eval_exp, []]
     elif isinstance(statement, AST.Assignment):
-        eval_assignment, _assing_result = emit_tacky(statement)
+        eval_assignment, _assing_result = emit_tacky(statement, context)
         return [eval_assignment, _assing_result]
     elif isinstance(statement, (AST.Binary, AST.Constant, AST.Var, AST.Unary)):
-        eval_assignment, _assing_result = emit_tacky(statement)
+        eval_assignment, _assing_result = emit_tacky(statement, context)
         return [eval_assignment, _assing_result]
     else:
         print("Something went wrong when generating tacky for a statement. Unknown statement.")
         sys.exit()
 
 
-def emit_tacky_for_function(fn_def):
+def emit_tacky_for_function(fn_def, context, compact=False):
     function_name = fn_def.name
     function_body = fn_def.body
-    instructions = []
+
+    # the compact function stores the instructions of every block item right after they are generated
+    if compact:
+        instructions = TackyArray.TackyArrayFunction(function_name, context.symbols)
+    else:
+        instructions = []
 
     for block_item in function_body:
         if isinstance(block_item, (AST.ReturnStatement, AST.Null, AST.Assignment, AST.Binary, AST.Constant, AST.Var, AST.Unary)):
             if isinstance(block_item, AST.Null):
                 continue
-            eval_result, passing_result = emit_tacky_for_statement(block_item)
+            eval_result, passing_result = emit_tacky_for_statement(block_item, context)
             if eval_result:
                 instructions.extend(eval_result)
             instructions.append(passing_result)
@@ -302,7 +272,7 @@ def emit_tacky_for_function(fn_def):
             if block_item.init is None:
                 continue
 
-            eval_assignment, _assing_result = emit_tacky(AST.Assignment(AST.Var(block_item.name), block_item.init))
+            eval_assignment, _assing_result = emit_tacky(AST.Assignment(AST.Var(block_item.name), block_item.init), context)
 
             if isinstance(eval_assignment, list):
                 instructions.extend(eval_assignment)
@@ -311,8 +281,14 @@ def emit_tacky_for_function(fn_def):
 
     # extra return instruction to make sure we always return something in int main
     instructions.append(Tacky.Return(Tacky.Constant(0)))
+
+    if compact:
+        # every label is interned, the names are only needed for the ASM from now on
+        context.symbols.freeze()
+        return instructions
     return Tacky.function_Def(function_name, instructions)
 
 
-def gen(Program):
-    return Tacky.Program(emit_tacky_for_function(Program.function_def))
+def gen(Program, context, compact=False):
+    """Turn the AST into TACKY, with compact=True the function is stored as a TackyArrayFunction"""
+    return Tacky.Program(emit_tacky_for_function(Program.function_def, context, compact))
@@ -0,0 +1,266 @@
+import sys
+from array import array
+
+import compiler.tacky.tacky_ir as Tacky
+from compiler.interning import SymbolTable
+
+"""
+        COMPACT TACKY IR
+The instructions of a function are stored as columns of integers instead of one
+object per instruction, operand and operator:
+
+opcodes = array of opcode numbers (one per instruction)
+kinds = array of the kinds of the three arguments of the instruction: kind1 | kind2 << 2 | kind3 << 4
+args1, args2, args3 = arrays of the arguments themselves, 0 when not used
+
+opcode                          args1       args2       args3
+RETURN                          val
+COPY                            src         dst
+JUMP                            target
+JUMP_IF_ZERO/JUMP_IF_NOT_ZERO   condition   target
+LABEL                           identifier
+NOT/NEGATE/COMPLEMENT           src         dst
+ADD/SUBTRACT/.../GREATER_OR_EQUAL   src1    src2        dst
+
+A variable is stored as its symbol id (compiler/interning.py), a constant as its (32 bit) value
+and a label as the id of its interned name in the same SymbolTable. There is no table with an object per value.
+"""
+
+# kinds of the arguments
+NO_VALUE = 0
+VAR = 1
+CONSTANT = 2
+LABEL = 3
+
+# range of the constants, the argument columns hold 32 bit ints
+INT_MIN = -(1 << 31)
+INT_MAX = (1 << 31) - 1
+
+# bits per kind in the kinds column
+KIND_BITS = 2
+KIND_MASK = 3
+
+# opcodes
+RETURN = 0
+COPY = 1
+JUMP = 2
+JUMP_IF_ZERO = 3
+JUMP_IF_NOT_ZERO = 4
+LABEL_INSTRUCTION = 5
+NOT = 6
+NEGATE = 7
+COMPLEMENT = 8
+ADD = 9
+SUBTRACT = 10
+MULTIPLY = 11
+DIVIDE = 12
+REMAINDER = 13
+EQUAL = 14
+NOT_EQUAL = 15
+LESS_THAN = 16
+LESS_OR_EQUAL = 17
+GREATER_THAN = 18
+GREATER_OR_EQUAL = 19
+
+UNARY_OPCODES = {
+    Tacky.Not: NOT,
+    Tacky.Negate: NEGATE,
+    Tacky.Complement: COMPLEMENT,
+}
+
+BINARY_OPCODES = {
+    Tacky.Add: ADD,
+    Tacky.Subtract: SUBTRACT,
+    Tacky.Multiply: MULTIPLY,
+    Tacky.Divide: DIVIDE,
+    Tacky.Remainder: REMAINDER,
+    Tacky.Equal: EQUAL,
+    Tacky.NotEqual: NOT_EQUAL,
+    Tacky.LessThan: LESS_THAN,
+    Tacky.LessOrEqual: LESS_OR_EQUAL,
+    Tacky.GreaterThan: GREATER_THAN,
+    Tacky.GreaterOrEqual: GREATER_OR_EQUAL,
+}
+
+# opcode -> name of the TACKY instruction, for --stats
+OPCODE_NAMES = {
+    RETURN: "Return",
+    COPY: "Copy",
+    JUMP: "Jump",
+    JUMP_IF_ZERO: "JumpIfZero",
+    JUMP_IF_NOT_ZERO: "JumpIfNotZero",
+    LABEL_INSTRUCTION: "Label",
+    NOT: "Unary Not",
+    NEGATE: "Unary Negate",
+    COMPLEMENT: "Unary Complement",
+    ADD: "Binary Add",
+    SUBTRACT: "Binary Subtract",
+    MULTIPLY: "Binary Multiply",
+    DIVIDE: "Binary Divide",
+    REMAINDER: "Binary Remainder",
+    EQUAL: "Binary Equal",
+    NOT_EQUAL: "Binary NotEqual",
+    LESS_THAN: "Binary LessThan",
+    LESS_OR_EQUAL: "Binary LessOrEqual",
+    GREATER_THAN: "Binary GreaterThan",
+    GREATER_OR_EQUAL: "Binary GreaterOrEqual",
+}
+
+# opcode -> TACKY operator class, for the unary and binary opcodes
+OPCODE_OPERATORS = {opcode: operator for operator, opcode in (UNARY_OPCODES | BINARY_OPCODES).items()}
+
+# opcode -> TACKY instruction class, with OPCODE_OPERATORS this is the key of the instruction selector (compiler/assembly/ASM.py)
+OPCODE_INSTRUCTIONS = {
+    RETURN: Tacky.Return,
+    COPY: Tacky.Copy,
+    JUMP: Tacky.Jump,
+    JUMP_IF_ZERO: Tacky.JumpIfZero,
+    JUMP_IF_NOT_ZERO: Tacky.JumpIfNotZero,
+    LABEL_INSTRUCTION: Tacky.Label,
+} | {opcode: Tacky.UnaryTacky for opcode in UNARY_OPCODES.values()} | {opcode: Tacky.Binary for opcode in BINARY_OPCODES.values()}
+
+
+def argument(val):
+    """(kind, argument) of a Tacky.Var or Tacky.Constant"""
+    valType = type(val)
+    if valType is Tacky.Var:
+        return (VAR, val.name)
+    elif valType is Tacky.Constant:
+        value = val.int
+        if not INT_MIN <= value <= INT_MAX:
+            # an int has 32 bits, the assembler keeps the same low 32 bits of a bigger immediate
+            value = (value - INT_MIN) % (1 << 32) + INT_MIN
+        return (CONSTANT, value)
+
+    print(f"ERROR: Can't store the TACKY value {val} in an instruction")
+    sys.exit()
+
+
+class TackyArrayFunction:
+    """A function definition with its instructions stored in array columns"""
+    __slots__ = ("name", "symbols", "opcodes", "kinds", "args1", "args2", "args3")
+
+    def __init__(self, name, symbols=None):
+        self.name = name
+        # the SymbolTable of the variables, the labels are interned in it
+        self.symbols = SymbolTable() if symbols is None else symbols
+
+        # one entry per instruction
+        self.opcodes = array("B")
+        self.kinds = array("B")
+        self.args1 = array("i")
+        self.args2 = array("i")
+        self.args3 = array("i")
+
+    def __len__(self):
+        return len(self.opcodes)
+
+    def label(self, identifier):
+        """Symbol id of a label"""
+        return self.symbols.intern(identifier)
+
+    def append_row(self, opcode, kinds, arg1=0, arg2=0, arg3=0):
+        self.opcodes.append(opcode)
+        self.kinds.append(kinds)
+        self.args1.append(arg1)
+        self.args2.append(arg2)
+        self.args3.append(arg3)
+
+    def append(self, instruction):
+        """Store a TACKY instruction object, anything that is not an instruction is skipped"""
+        instructionType = type(instruction)
+
+        if instructionType is Tacky.Binary:
+            kind1, arg1 = argument(instruction.src1)
+            kind2, arg2 = argument(instruction.src2)
+            kind3, arg3 = argument(instruction.dst)
+            self.append_row(BINARY_OPCODES[type(instruction.operator)], kind1 | kind2 << KIND_BITS | kind3 << 2 * KIND_BITS, arg1, arg2, arg3)
+        elif instructionType is Tacky.Copy or instructionType is Tacky.UnaryTacky:
+            kind1, arg1 = argument(instruction.src)
+            kind2, arg2 = argument(instruction.dst)
+            opcode = COPY if instructionType is Tacky.Copy else UNARY_OPCODES[type(instruction.unary_operator.operator)]
+            self.append_row(opcode, kind1 | kind2 << KIND_BITS, arg1, arg2)
+        elif instructionType is Tacky.JumpIfZero or instructionType is Tacky.JumpIfNotZero:
+            kind1, arg1 = argument(instruction.condition)
+            opcode = JUMP_IF_ZERO if instructionType is Tacky.JumpIfZero else JUMP_IF_NOT_ZERO
+            self.append_row(opcode, kind1 | LABEL << KIND_BITS, arg1, self.label(instruction.target))
+        elif instructionType is Tacky.Jump:
+            self.append_row(JUMP, LABEL, self.label(instruction.target))
+        elif instructionType is Tacky.Label:
+            self.append_row(LABEL_INSTRUCTION, LABEL, self.label(instruction.identifier))
+        elif instructionType is Tacky.Return:
+            kind1, arg1 = argument(instruction.val)
+            self.append_row(RETURN, kind1, arg1)
+
+    def extend(self, instructions):
+        for instruction in instructions:
+            self.append(instruction)
+
+    def rows(self):
+        """View over the instructions as (opcode, kinds, arg1, arg2, arg3) without creating instruction objects"""
+        return zip(self.opcodes, self.kinds, self.args1, self.args2, self.args3)
+
+    def value(self, kind, arg):
+        """The TACKY value object (or label) of an argument"""
+        if kind == VAR:
+            return Tacky.Var(arg)
+        elif kind == CONSTANT:
+            return Tacky.Constant(arg)
+        elif kind == LABEL:
+            return self.symbols.name(arg)
+
+        return None
+
+    def instruction(self, position):
+        """Create the TACKY instruction object of a single instruction"""
+        opcode = self.opcodes[position]
+        kinds = self.kinds[position]
+        value = self.value
+        arg1 = value(kinds & KIND_MASK, self.args1[position])
+        arg2 = value(kinds >> KIND_BITS & KIND_MASK, self.args2[position])
+        arg3 = value(kinds >> 2 * KIND_BITS, self.args3[position])
+
+        if opcode in OPCODE_OPERATORS:
+            operator = OPCODE_OPERATORS[opcode]()
+            # the binary opcodes come after the unary ones
+            if opcode >= ADD:
+                return Tacky.Binary(operator, arg1, arg2, arg3)
+            return Tacky.UnaryTacky(Tacky.Tacky_Unary_Operator(operator), arg1, arg2)
+        elif opcode == COPY:
+            return Tacky.Copy(arg1, arg2)
+        elif opcode == JUMP_IF_ZERO:
+            return Tacky.JumpIfZero(arg1, arg2)
+        elif opcode == JUMP_IF_NOT_ZERO:
+            return Tacky.JumpIfNotZero(arg1, arg2)
+        elif opcode == JUMP:
+            return Tacky.Jump(arg1)
+        elif opcode == LABEL_INSTRUCTION:
+            return Tacky.Label(arg1)
+        elif opcode == RETURN:
+            return Tacky.Return(arg1)
+
+        print(f"ERROR: Unknown TACKY opcode {opcode}")
+        sys.exit()
+
+    def to_function(self):
+        """Create the object based function definition (Tacky.function_Def)"""
+        return Tacky.function_Def(self.name, [self.instruction(position) for position in range(len(self))])
+
+    def opcode_counts(self):
+        """{instruction name: instructions}"""
+        counts = {}
+        for opcode in self.opcodes:
+            name = OPCODE_NAMES[opcode]
+            counts[name] = counts.get(name, 0) + 1
+        return counts
+
+    def nbytes(self):
+        """Bytes used by the instruction columns"""
+        return sum(column.itemsize * len(column) for column in (self.opcodes, self.kinds, self.args1, self.args2, self.args3))
+
+    @classmethod
+    def from_function(cls, function_definition, symbols=None):
+        """Store an object based function definition (Tacky.function_Def)"""
+        compact = cls(function_definition.name, symbols)
+        compact.extend(function_definition.body)
+        return compact
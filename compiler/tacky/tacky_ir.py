@@ -1,10 +1,15 @@
+from compiler.interning import Flyweight
+
+
 class Program:
+    __slots__ = ("function_definition",)
 
     def __init__(self, function_definition):
         self.function_definition = function_definition
 
 
 class function_Def:
+    __slots__ = ("name", "body")
 
     def __init__(self, identifier, instructions):
         self.name = identifier
@@ -12,75 +17,78 @@ class function_Def:
 
 
 class Tacky_Unary_Operator:
+    __slots__ = ("operator",)
 
     def __init__(self, tacky_op):
         self.operator = tacky_op
 
 
-class Not:
-    pass
+class Not(Flyweight):
+    __slots__ = ()
 
 
-class Complement:
-    pass
+class Complement(Flyweight):
+    __slots__ = ()
 
 
-class Negate:
-    pass
+class Negate(Flyweight):
+    __slots__ = ()
 
 
 class Binary_Operator:
+    __slots__ = ("operator",)
 
     def __init__(self, binary_operator) -> None:
         self.operator = binary_operator
 
 
-class Add:
-    pass
+class Add(Flyweight):
+    __slots__ = ()
 
 
-class Subtract:
-    pass
+class Subtract(Flyweight):
+    __slots__ = ()
 
 
-class Multiply:
-    pass
+class Multiply(Flyweight):
+    __slots__ = ()
 
 
-class Divide:
-    pass
+class Divide(Flyweight):
+    __slots__ = ()
 
 
-class Remainder:
-    pass
+class Remainder(Flyweight):
+    __slots__ = ()
 
 
-class Equal:
-    pass
+class Equal(Flyweight):
+    __slots__ = ()
 
 
-class NotEqual:
-    pass
+class NotEqual(Flyweight):
+    __slots__ = ()
 
 
-class LessThan:
-    pass
+class LessThan(Flyweight):
+    __slots__ = ()
 
 
-class LessOrEqual:
-    pass
+class LessOrEqual(Flyweight):
+    __slots__ = ()
 
 
-class GreaterThan:
-    pass
+class GreaterThan(Flyweight):
+    __slots__ = ()
 
 
-class GreaterOrEqual:
-    pass
+class GreaterOrEqual(Flyweight):
+    __slots__ = ()
 
 
 # INSTRUCTIONS
 class Binary:
+    __slots__ = ("operator", "src1", "src2", "dst")
     def __init__(self, binary_operator, src1, src2, dst) -> None:
         self.operator = binary_operator
         self.src1 = src1
@@ -89,6 +97,7 @@ class Binary:
 
 
 class UnaryTacky:
+    __slots__ = ("unary_operator", "src", "dst")
 
     def __init__(self, tacky_op, src, dst) -> None:
         self.unary_operator = tacky_op
@@ -97,46 +106,54 @@ class UnaryTacky:
 
 
 class Copy:
+    __slots__ = ("src", "dst")
     def __init__(self, src, dst):
         self.src = src
         self.dst = dst
 
 
 class Jump:
+    __slots__ = ("target",)
     def __init__(self, target) -> None:
         self.target = target
 
 
 class JumpIfZero:
+    __slots__ = ("target", "condition")
     def __init__(self, condition, target) -> None:
         self.target = target
         self.condition = condition
 
 
 class JumpIfNotZero:
+    __slots__ = ("target", "condition")
     def __init__(self, condition, target) -> None:
         self.target = target
         self.condition = condition
 
 
 class Label:
+    __slots__ = ("identifier",)
     def __init__(self, identifier) -> None:
         self.identifier = identifier
 
 
 class Return:
+    __slots__ = ("val",)
 
     def __init__(self, value):
         self.val = value
 
 
 class Var:
+    __slots__ = ("name",)
 
     def __init__(self, name):
         self.name = name
 
 
 class Constant:
+    __slots__ = ("int",)
 
     def __init__(self, int):
         self.int = int
@@ -0,0 +1,133 @@
+import contextlib
+import json
+import time
+
+"""
+        PASS TIMING (--time-passes)
+Wall time, CPU time and peak memory (tracemalloc) of every stage of a compile and of the
+passes inside a stage. Passes can be nested, the table indents a pass under its stage:
+
+with timer.measure("createAsmCode"):
+    with timer.measure("legalizeInstructions", "asm"):
+        ...
+
+The peak memory of a pass is the most memory that was allocated on top of what was already
+allocated when the pass started. tracemalloc makes the allocations a lot slower, so the times
+are higher than the times of a compile without --time-passes, but they can be compared with each other.
+"""
+
+
+class NullTimer:
+    """A timer that doesn't measure anything, used when there is no --time-passes"""
+
+    def measure(self, name, category="stage"):
+        return contextlib.nullcontext()
+
+
+NULL_TIMER = NullTimer()
+
+
+class PassRecord:
+    """What was measured for a single pass"""
+    __slots__ = ("name", "category", "depth", "start", "wall", "cpu", "peak")
+
+    def __init__(self, name, category, depth, start, wall, cpu, peak):
+        self.name = name
+        self.category = category
+        self.depth = depth
+        # seconds since the timer was made
+        self.start = start
+        self.wall = wall
+        self.cpu = cpu
+        # bytes
+        self.peak = peak
+
+
+class PassTimer:
+    """Measures the passes of a compile, the records are in the order the passes started"""
+
+    def __init__(self, memory=True):
+        self.records = []
+        self.memory = memory
+        # [tracemalloc memory when the pass started, highest tracemalloc peak seen in the pass] of the running passes
+        self.running = []
+        self.origin = time.perf_counter()
+
+        if memory:
+            import tracemalloc
+            self.tracemalloc = tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+
+    def stop(self):
+        if self.memory and self.tracemalloc.is_tracing():
+            self.tracemalloc.stop()
+
+    @contextlib.contextmanager
+    def measure(self, name, category="stage"):
+        record = PassRecord(name, category, len(self.running), 0.0, 0.0, 0.0, 0)
+        self.records.append(record)
+
+        memory = [0, 0]
+        if self.memory:
+            current, peak = self.tracemalloc.get_traced_memory()
+            # the peak is reset for this pass, the pass it runs in keeps what it reached so far
+            if self.running:
+                self.running[-1][1] = max(self.running[-1][1], peak)
+            self.tracemalloc.reset_peak()
+            memory = [current, current]
+        self.running.append(memory)
+
+        startCpu = time.process_time()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record.wall = time.perf_counter() - start
+            record.cpu = time.process_time() - startCpu
+            record.start = start - self.origin
+
+            self.running.pop()
+            if self.memory:
+                peak = max(memory[1], self.tracemalloc.get_traced_memory()[1])
+                record.peak = peak - memory[0]
+                if self.running:
+                    self.running[-1][1] = max(self.running[-1][1], peak)
+
+
+def printPassTimes(timer):
+    print(f"{'pass':<32} {'wall ms':>9} {'cpu ms':>9} {'peak KiB':>10}")
+
+    for record in timer.records:
+        name = "  " * record.depth + record.name
+        peak = f"{record.peak / 1024:>10.1f}" if timer.memory else f"{'-':>10}"
+        print(f"{name:<32} {record.wall * 1000:>9.2f} {record.cpu * 1000:>9.2f} {peak}")
+
+    stages = [record for record in timer.records if record.depth == 0]
+    wall = sum(record.wall for record in stages)
+    cpu = sum(record.cpu for record in stages)
+    print(f"{'total':<32} {wall * 1000:>9.2f} {cpu * 1000:>9.2f}")
+
+
+def chromeTrace(timer):
+    """The records as Chrome trace_event JSON (chrome://tracing, https://ui.perfetto.dev)"""
+    events = []
+    for record in timer.records:
+        events.append({
+            "name": record.name,
+            "cat": record.category,
+            # complete event: start and duration in microseconds
+            "ph": "X",
+            "ts": record.start * 1e6,
+            "dur": record.wall * 1e6,
+            "pid": 1,
+            "tid": 1,
+            "args": {"cpu_ms": record.cpu * 1000, "peak_bytes": record.peak},
+        })
+
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def writeChromeTrace(timer, fileName):
+    with open(fileName, "w") as traceFile:
+        json.dump(chromeTrace(timer), traceFile, indent=1)
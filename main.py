@@ -1,8 +1,70 @@
 import sys
-from compiler.compile import main
+import argparse
+
+# the compiler is imported after the arguments are parsed, --help doesn't need it
 
 if __name__ == "__main__":
-    if sys.argv[1] == "":
+    argparser = argparse.ArgumentParser(description="Compile a .c file")
+    argparser.add_argument("file", nargs="?", help=".c file to compile")
+    outputs = argparser.add_mutually_exclusive_group()
+    outputs.add_argument("-S", dest="output", action="store_const", const="assembly", help="only write the assembly to ./compiled/<name>.s, don't link")
+    outputs.add_argument("-c", dest="output", action="store_const", const="object", help="write an object file ./compiled/<name>.o with the built-in encoder")
+    outputs.add_argument("--no-gcc", dest="output", action="store_const", const="elf", help="write the executable with the built-in encoder and ELF writer, without gcc")
+    outputs.add_argument("--freestanding", dest="output", action="store_const", const="freestanding", help="link without libc: a tiny static binary with its own _start (Linux only)")
+    outputs.add_argument("--run", action="store_true", help="run the program in this process without writing a binary, exits with the return value of main")
+    argparser.add_argument("--no-cache", dest="use_cache", action="store_false", help="always compile, don't use the compilation cache")
+    argparser.add_argument("--cache-stats", action="store_true", help="show the hits, misses and size of the compilation cache")
+    measurements = argparser.add_mutually_exclusive_group()
+    measurements.add_argument("--time-passes", action="store_true", help="show the wall time, CPU time and peak memory of every stage, always compiles")
+    measurements.add_argument("--profile", action="store_true", help="run every stage under cProfile and write .pstats files and collapsed stacks, always compiles")
+    argparser.add_argument("--profile-dir", default="profile", metavar="DIR", help="with --profile: directory for the profiles (default: ./profile)")
+    argparser.add_argument("--trace", metavar="FILE", help="with --time-passes: also write the times as a Chrome trace (trace_event JSON)")
+    argparser.add_argument("--stats", action="store_true", help="show the counters of every stage (tokens, AST nodes, TACKY instructions, stack slots, fixups), always compiles")
+    argparser.add_argument("--stats-json", metavar="FILE", help="write the counters of every stage as JSON to FILE (- for stdout), always compiles")
+    argparser.set_defaults(output="binary")
+    args = argparser.parse_args()
+
+    if args.cache_stats:
+        from compiler.cache import CompileCache, printStats
+        printStats(CompileCache())
+        sys.exit()
+
+    if not args.file:
         print("Please give us a .c file to compile")
         sys.exit()
-    main(sys.argv[1])
+
+    if args.run:
+        # only needed here, it loads libc through ctypes
+        from compiler.jit import run_file
+        sys.exit(run_file(args.file) & 0xFF)
+
+    from compiler.compile import main
+
+    stats = None
+    if args.stats or args.stats_json:
+        from compiler.statistics import Statistics, printStatistics, writeStatistics
+        stats = Statistics()
+
+    if args.profile:
+        from compiler.profiling import profiling, printHotSpots
+        with profiling(args.profile_dir) as profiler:
+            main(args.file, args.use_cache, args.output, profiler, stats)
+        printHotSpots(profiler)
+        print(f"You can find the profiles in ./{args.profile_dir}")
+    elif args.time_passes:
+        from compiler.timing import PassTimer, printPassTimes, writeChromeTrace
+        timer = PassTimer()
+        main(args.file, args.use_cache, args.output, timer, stats)
+        timer.stop()
+
+        printPassTimes(timer)
+        if args.trace:
+            writeChromeTrace(timer, args.trace)
+            print(f"You can find the trace in {args.trace}")
+    else:
+        main(args.file, args.use_cache, args.output, stats=stats)
+
+    if args.stats:
+        printStatistics(stats)
+    if args.stats_json:
+        writeStatistics(stats, args.stats_json)
@@ -0,0 +1,112 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from unittest import mock
+
+from compiler.batch import compile_batch, compile_file
+from compiler.pipeline import build
+
+"""
+ Batch compilation (compiler/batch.py, compiler/pipeline.py): sources with the same name must not share an output
+ and one bad file must not stop the other files
+ Run from the root of the project: python -m unittest discover tests
+"""
+
+
+def writeSource(path, result):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as sourceFile:
+        sourceFile.write(f"int main(void) {{\n    return {result};\n}}\n")
+
+
+class SameNameTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.sources = os.path.join(self.directory, "src")
+        self.outputDir = os.path.join(self.directory, "out")
+        writeSource(os.path.join(self.sources, "a", "prog.c"), 1)
+        writeSource(os.path.join(self.sources, "b", "prog.c"), 2)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_directory_keeps_the_paths(self):
+        results = compile_batch([self.sources], self.outputDir, workers=1, link=False, use_cache=False)
+
+        self.assertTrue(all(result.ok for result in results))
+        outputs = [os.path.relpath(result.output, self.outputDir) for result in results]
+        self.assertEqual(outputs, [os.path.join("a", "prog.s"), os.path.join("b", "prog.s")])
+        for output in outputs:
+            self.assertTrue(os.path.isfile(os.path.join(self.outputDir, output)))
+
+    @unittest.skipIf(shutil.which("gcc") is None, "needs gcc")
+    def test_linked_in_parallel(self):
+        results = compile_batch([self.sources], self.outputDir, workers=2, link=True, use_cache=False)
+
+        self.assertTrue(all(result.ok for result in results))
+        exitCodes = [subprocess.run([result.output]).returncode for result in results]
+        self.assertEqual(exitCodes, [1, 2])
+
+    def test_same_output_is_rejected(self):
+        # given as files, both only keep their name
+        files = [os.path.join(self.sources, "a", "prog.c"), os.path.join(self.sources, "b", "prog.c")]
+        results = compile_batch(files, self.outputDir, workers=1, link=False, use_cache=False)
+
+        self.assertTrue(results[0].ok)
+        self.assertFalse(results[1].ok)
+        self.assertIn("same output", results[1].error)
+
+
+class BadFileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.sources = os.path.join(self.directory, "src")
+        self.outputDir = os.path.join(self.directory, "out")
+        writeSource(os.path.join(self.sources, "good.c"), 3)
+        # byte 0xff is never valid UTF-8
+        with open(os.path.join(self.sources, "latin1.c"), "wb") as sourceFile:
+            sourceFile.write(b"int main(void) {\n    return 4; /* \xff */\n}\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def assertOnlyBadFileFailed(self, results):
+        self.assertEqual([os.path.basename(result.path) for result in results], ["good.c", "latin1.c"])
+        self.assertTrue(results[0].ok, results[0].error)
+        self.assertFalse(results[1].ok)
+        self.assertIn("utf-8", results[1].error)
+
+    def test_not_utf8_in_this_process(self):
+        self.assertOnlyBadFileFailed(compile_batch([self.sources], self.outputDir, workers=1, link=False, use_cache=False))
+
+    def test_not_utf8_in_worker_processes(self):
+        self.assertOnlyBadFileFailed(compile_batch([self.sources], self.outputDir, workers=2, link=False, use_cache=False))
+
+    @unittest.skipIf(shutil.which("gcc") is None, "needs gcc")
+    def test_not_utf8_in_pipeline(self):
+        self.assertOnlyBadFileFailed(build([self.sources], self.outputDir, jobs=2).results)
+
+    def test_missing_gcc(self):
+        # Popen raises FileNotFoundError when gcc isn't on PATH
+        with mock.patch.dict(os.environ, {"PATH": self.directory}):
+            results = compile_batch([self.sources], self.outputDir, workers=1, link=True, use_cache=False)
+
+        self.assertEqual([result.ok for result in results], [False, False])
+        self.assertIn("gcc", results[0].error)
+
+    def test_output_not_writable(self):
+        # a file where the directory of the output should be
+        blocked = os.path.join(self.directory, "blocked")
+        with open(blocked, "w"):
+            pass
+        result = compile_file(os.path.join(self.sources, "good.c"), os.path.join(blocked, "good"), link=False, use_cache=False)
+
+        self.assertFalse(result.ok)
+        self.assertIn("blocked", result.error)
+
+if __name__ == "__main__":
+    unittest.main()
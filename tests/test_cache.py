@@ -0,0 +1,205 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from unittest import mock
+
+import compiler.compile
+from compiler.assembly.ASM import AsmFunctionDef, AsmInstructionMov, AsmInstructionRet, AsmProgram, Stack, createASMoutput
+from compiler.cache import CompileCache, flush_stats, read_stats_file
+from compiler.compile import assemble_and_link, check_setup_cached, compile_source
+from compiler.statistics import Statistics
+
+"""
+ Compilation cache (compiler/cache.py), the cached setup check and gcc (compiler/compile.py)
+ Every test uses its own XDG_CACHE_HOME
+ Run from the root of the project: python -m unittest discover tests
+"""
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# a process of its own that misses the cache 50 times
+LOOKUP_SCRIPT = """
+from compiler.cache import CompileCache
+cache = CompileCache()
+for index in range(50):
+    cache.lookup(cache.key(str(index)))
+"""
+
+
+def lookups(amount):
+    """Worker of a process pool: miss the cache amount times"""
+    cache = CompileCache()
+    for index in range(amount):
+        cache.lookup(cache.key(f"worker {index}"))
+    return os.getpid()
+
+
+class CacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        environment = mock.patch.dict(os.environ, {"XDG_CACHE_HOME": self.directory})
+        environment.start()
+        self.addCleanup(environment.stop)
+
+    def tearDown(self):
+        # the counters of this process go to the stats.json of this test before its directory is removed
+        flush_stats()
+        shutil.rmtree(self.directory)
+
+    def writeFile(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, "w") as outputFile:
+            outputFile.write(content)
+        return path
+
+
+class CompileCacheTest(CacheTestCase):
+
+    def test_hit_and_miss(self):
+        cache = CompileCache()
+        self.assertTrue(cache.directory.startswith(self.directory))
+        key = cache.key("int main(void) { return 1; }", {"output": "assembly"})
+        output = os.path.join(self.directory, "program.s")
+
+        self.assertFalse(cache.fetch(key, {"program.s": output}))
+        cache.store(key, {"program.s": self.writeFile("made.s", "assembly")})
+        self.assertTrue(cache.fetch(key, {"program.s": output}))
+
+        with open(output) as outputFile:
+            self.assertEqual(outputFile.read(), "assembly")
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["entries"]), (1, 1, 1))
+        self.assertEqual(stats["bytes"], len("assembly"))
+
+    def test_key(self):
+        cache = CompileCache()
+        key = cache.key("int main(void) { return 1; }", {"output": "assembly"})
+
+        self.assertEqual(key, cache.key(b"int main(void) { return 1; }", {"output": "assembly"}))
+        self.assertNotEqual(key, cache.key("int main(void) { return 2; }", {"output": "assembly"}))
+        self.assertNotEqual(key, cache.key("int main(void) { return 1; }", {"output": "object"}))
+
+    def test_gcc_in_the_key_of_linked_outputs(self):
+        cache = CompileCache()
+        keys = {}
+        for gcc in (["/usr/bin/gcc", 1], ["/usr/bin/gcc", 2], ["/opt/gcc/bin/gcc", 1]):
+            with mock.patch("compiler.cache.gcc_identity", return_value=gcc):
+                keys[tuple(gcc)] = [cache.key("code", {"output": output}) for output in ("binary", "freestanding", "assembly")]
+
+        binaries, freestanding, assembly = zip(*keys.values())
+        self.assertEqual(len(set(binaries)), 3)
+        self.assertEqual(len(set(freestanding)), 3)
+        # the assembly doesn't depend on gcc
+        self.assertEqual(len(set(assembly)), 1)
+
+    def test_least_recently_used_eviction(self):
+        cache = CompileCache(max_bytes=250)
+        keys = [cache.key(name) for name in ("a", "b", "c")]
+
+        cache.store(keys[0], {"program.s": self.writeFile("a.s", "a" * 100)})
+        cache.store(keys[1], {"program.s": self.writeFile("b.s", "b" * 100)})
+        # b was used after a, then a is used again
+        os.utime(cache.entry(keys[0]), (1000, 1000))
+        os.utime(cache.entry(keys[1]), (2000, 2000))
+        self.assertIsNotNone(cache.lookup(keys[0]))
+
+        # 300 bytes: b is the least recently used entry
+        cache.store(keys[2], {"program.s": self.writeFile("c.s", "c" * 100)})
+
+        self.assertEqual([os.path.isdir(cache.entry(key)) for key in keys], [True, False, True])
+        stats = cache.stats()
+        self.assertEqual((stats["evictions"], stats["entries"], stats["bytes"]), (1, 2, 200))
+
+    def test_stats_of_other_processes(self):
+        cache = CompileCache()
+        cache.lookup(cache.key("this process"))
+
+        environment = dict(os.environ, PYTHONPATH=ROOT)
+        processes = [subprocess.Popen([sys.executable, "-c", LOOKUP_SCRIPT], env=environment, cwd=ROOT) for _ in range(2)]
+        for process in processes:
+            self.assertEqual(process.wait(), 0)
+
+        # the workers of a pool leave without atexit, their counts are written by a finalizer
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            list(executor.map(lookups, [25] * 4))
+
+        self.assertEqual(read_stats_file(cache.statsPath)["misses"], 200)
+        # the miss of this process isn't written until it exits
+        self.assertEqual(cache.read_stats()["misses"], 201)
+        flush_stats()
+        self.assertEqual(read_stats_file(cache.statsPath)["misses"], 201)
+
+
+class SetupCheckTest(CacheTestCase):
+
+    def setUp(self):
+        super().setUp()
+        compiler.compile.checked_setup = None
+        self.addCleanup(setattr, compiler.compile, "checked_setup", None)
+        check = mock.patch("compiler.compile.check_setup", return_value=True)
+        self.check_setup = check.start()
+        self.addCleanup(check.stop)
+
+    def checkWithGcc(self, gcc):
+        # a new process only knows what is in setup.json
+        compiler.compile.checked_setup = None
+        with mock.patch("compiler.compile.gcc_identity", return_value=gcc):
+            return check_setup_cached()
+
+    def test_remembered_until_gcc_changes(self):
+        self.assertTrue(self.checkWithGcc(["/usr/bin/gcc", 1]))
+        self.assertTrue(os.path.isfile(os.path.join(self.directory, "c-compiler", "setup.json")))
+        self.assertTrue(self.checkWithGcc(["/usr/bin/gcc", 1]))
+        self.assertEqual(self.check_setup.call_count, 1)
+
+        # a newer gcc and a gcc somewhere else
+        self.assertTrue(self.checkWithGcc(["/usr/bin/gcc", 2]))
+        self.assertEqual(self.check_setup.call_count, 2)
+        self.assertTrue(self.checkWithGcc(["/opt/gcc/bin/gcc", 2]))
+        self.assertEqual(self.check_setup.call_count, 3)
+        self.assertTrue(self.checkWithGcc(["/opt/gcc/bin/gcc", 2]))
+        self.assertEqual(self.check_setup.call_count, 3)
+
+    def test_failed_check_runs_again(self):
+        self.check_setup.return_value = False
+        self.assertFalse(self.checkWithGcc(["/usr/bin/gcc", 1]))
+        self.assertFalse(self.checkWithGcc(["/usr/bin/gcc", 1]))
+        self.assertEqual(self.check_setup.call_count, 2)
+
+        self.check_setup.return_value = True
+        self.assertTrue(self.checkWithGcc(["/usr/bin/gcc", 1]))
+        self.assertEqual(self.check_setup.call_count, 3)
+
+
+@unittest.skipIf(shutil.which("gcc") is None, "needs gcc")
+class AssembleAndLinkTest(CacheTestCase):
+
+    def test_links(self):
+        binaryPath = os.path.join(self.directory, "program")
+        program = compile_source("int main(void) { int a = 6; return a * 7; }")
+        stats = Statistics()
+
+        self.assertIsNone(assemble_and_link(program, binaryPath, stats=stats))
+        self.assertEqual(subprocess.run([binaryPath]).returncode, 42)
+        self.assertEqual(stats.get("writeASMProgram", "assembly bytes"), len(createASMoutput(program)))
+
+    def test_error_of_gcc(self):
+        # mov can't have two memory operands, the assembler rejects it
+        program = AsmProgram(AsmFunctionDef("main", [AsmInstructionMov(Stack(-4), Stack(-8)), AsmInstructionRet()]))
+
+        error = assemble_and_link(program, os.path.join(self.directory, "program"))
+
+        # the error output of the assembler, with the line of the mov
+        self.assertIsNotNone(error)
+        self.assertIn("Error:", error)
+        self.assertIn("`mov'", error)
+        self.assertFalse(os.path.exists(os.path.join(self.directory, "program")))
+
+
+if __name__ == "__main__":
+    unittest.main()
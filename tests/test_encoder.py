@@ -0,0 +1,305 @@
+import io
+import os
+import platform
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from compiler.assembly.ASM import (
+    ADD,
+    AX,
+    DX,
+    MULT,
+    R10,
+    R11,
+    SUB,
+    AllocateStack,
+    AsmImmediateValue,
+    AsmInstructionMov,
+    AsmInstructionRet,
+    Binary,
+    Cdq,
+    Cmp,
+    E,
+    G,
+    GE,
+    Idiv,
+    Jmp,
+    JmpCC,
+    L,
+    LE,
+    Label,
+    NE,
+    Neg,
+    Not,
+    Reg,
+    SetCC,
+    Stack,
+    Unary,
+    asmInstructionCodeGenerator,
+)
+from compiler.assembly.elf import elfExecutable, elfObject, writeELF
+from compiler.assembly.encoder import encodeInstructions, encodeProgram
+from compiler.compile import compile_source
+
+"""
+ Machine code encoder (compiler/assembly/encoder.py) and ELF writer (compiler/assembly/elf.py):
+ the bytes of every instruction form must be the bytes GNU as makes of the text of the same instructions
+ Run from the root of the project: python -m unittest discover tests
+"""
+
+X86_64_LINUX = sys.platform.startswith("linux") and platform.machine().lower() in ("x86_64", "amd64")
+
+# the text of the prologue that encodeInstructions puts in front of the instructions
+PROLOGUE_TEXT = "    push    %rbp\n    movq    %rsp, %rbp\n"
+
+# setcc writes a single byte, the text generator only knows the 32 bit names
+BYTE_REGISTERS = {"eax": "al", "edx": "dl", "edi": "dil", "r10d": "r10b", "r11d": "r11b"}
+
+IMM = AsmImmediateValue
+R8 = Reg("r8d")
+R15 = Reg("r15d")
+EDI = Reg("edi")
+NEAR = Stack(-4)
+FAR = Stack(-1000)
+
+
+def textSection(objectFile):
+    """The bytes of the .text section of an ELF64 object file"""
+    sectionHeaderOffset, = struct.unpack_from("<Q", objectFile, 0x28)
+    sectionCount, namesIndex = struct.unpack_from("<HH", objectFile, 0x3C)
+
+    def header(index):
+        # name, offset, size
+        fields = struct.unpack_from("<IIQQQQIIQQ", objectFile, sectionHeaderOffset + index * 64)
+        return fields[0], fields[4], fields[5]
+
+    _, namesOffset, _ = header(namesIndex)
+    for index in range(sectionCount):
+        name, offset, size = header(index)
+        end = objectFile.index(b"\0", namesOffset + name)
+        if objectFile[namesOffset + name:end] == b".text":
+            return objectFile[offset:offset + size]
+
+    raise AssertionError("no .text section")
+
+
+def instructionText(instructions):
+    """The text of asmInstructionCodeGenerator, setcc on a register gets the byte name of the register"""
+    out = io.StringIO()
+    for instruction in instructions:
+        if type(instruction) is SetCC and type(instruction.operand) is Reg:
+            out.write(f"    set{instruction.cond_code}\t%{BYTE_REGISTERS[instruction.operand.reg]}\n")
+        else:
+            asmInstructionCodeGenerator([instruction], out)
+
+    return out.getvalue()
+
+
+@unittest.skipUnless(X86_64_LINUX and shutil.which("gcc") is not None, "needs gcc on x86-64 Linux")
+class EncoderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def assemble(self, text):
+        """The machine code gcc -c makes of the text"""
+        assemblyPath = os.path.join(self.directory, "code.s")
+        objectPath = os.path.join(self.directory, "code.o")
+        with open(assemblyPath, "w") as assemblyFile:
+            assemblyFile.write(".text\n" + PROLOGUE_TEXT + text)
+        subprocess.run(["gcc", "-c", assemblyPath, "-o", objectPath], check=True)
+        with open(objectPath, "rb") as objectFile:
+            return textSection(objectFile.read())
+
+    def assertSameAsGcc(self, instructions):
+        code, _ = encodeInstructions(instructions)
+        text = instructionText(instructions)
+        self.assertEqual(code.hex(" "), self.assemble(text).hex(" "), text)
+
+    def assertEveryFormSameAsGcc(self, forms):
+        # one instruction at a time, a mismatch names the instruction
+        for instruction in forms:
+            with self.subTest(instructionText([instruction]).strip()):
+                self.assertSameAsGcc([instruction])
+
+    def test_mov(self):
+        self.assertEveryFormSameAsGcc([
+            AsmInstructionMov(IMM(5), AX),
+            AsmInstructionMov(IMM(-1), R10),
+            AsmInstructionMov(IMM(2147483647), R15),
+            AsmInstructionMov(IMM(7), NEAR),
+            AsmInstructionMov(IMM(-300), FAR),
+            AsmInstructionMov(AX, NEAR),
+            AsmInstructionMov(R11, FAR),
+            AsmInstructionMov(NEAR, R10),
+            AsmInstructionMov(FAR, AX),
+            AsmInstructionMov(R10, AX),
+            AsmInstructionMov(AX, R8),
+            AsmInstructionMov(R8, R15),
+        ])
+
+    def test_add_sub_cmp(self):
+        forms = []
+        # an immediate is never added to a stack slot (fixInvalidBinaryInstruction), add and sub have no suffix in the text
+        for operator in (ADD, SUB):
+            forms += [
+                # imm8
+                Binary(operator, IMM(1), AX),
+                Binary(operator, IMM(-128), R10),
+                # the %eax accumulator form and imm32
+                Binary(operator, IMM(1000), AX),
+                Binary(operator, IMM(-129), R11),
+                Binary(operator, R10, NEAR),
+                Binary(operator, AX, FAR),
+                Binary(operator, NEAR, R10),
+                Binary(operator, FAR, AX),
+                Binary(operator, R8, R15),
+            ]
+        forms += [
+            Cmp(IMM(0), AX),
+            Cmp(IMM(1000), AX),
+            Cmp(IMM(-5), R11),
+            Cmp(IMM(3), FAR),
+            Cmp(IMM(70000), NEAR),
+            Cmp(R10, NEAR),
+            Cmp(FAR, R11),
+            Cmp(R11, R8),
+        ]
+        self.assertEveryFormSameAsGcc(forms)
+
+    def test_imul(self):
+        self.assertEveryFormSameAsGcc([
+            Binary(MULT, IMM(3), R11),
+            Binary(MULT, IMM(-100), AX),
+            Binary(MULT, IMM(1000), R11),
+            Binary(MULT, NEAR, R11),
+            Binary(MULT, FAR, AX),
+            Binary(MULT, R10, R11),
+            Binary(MULT, R15, R8),
+        ])
+
+    def test_unary_idiv_cdq(self):
+        self.assertEveryFormSameAsGcc([
+            Unary(Neg(), NEAR),
+            Unary(Not(), FAR),
+            Unary(Neg(), R10),
+            Unary(Not(), AX),
+            Idiv(NEAR),
+            Idiv(FAR),
+            Idiv(R10),
+            Idiv(DX),
+            Cdq(),
+        ])
+
+    def test_setcc(self):
+        forms = [SetCC(condition(), operand) for condition in (E, NE, G, GE, L, LE) for operand in (NEAR, FAR)]
+        # %dil needs an empty REX prefix, %r10b a REX.B
+        forms += [SetCC(E(), AX), SetCC(NE(), DX), SetCC(G(), EDI), SetCC(L(), R10), SetCC(GE(), R11)]
+        self.assertEveryFormSameAsGcc(forms)
+
+    def test_allocate_stack_and_ret(self):
+        self.assertEveryFormSameAsGcc([
+            AllocateStack(1),
+            AllocateStack(31),
+            AllocateStack(32),
+            AllocateStack(100000),
+            AsmInstructionRet(),
+        ])
+        # a positive amount: the stack slots must end up above %rsp
+        self.assertEqual(instructionText([AllocateStack(2)]).split(), ["subq", "$8,", "%rsp"])
+
+    def test_short_jumps(self):
+        self.assertSameAsGcc([
+            Label(0),
+            AsmInstructionMov(IMM(1), NEAR),
+            JmpCC(E(), 1),
+            Jmp(0),
+            Label(1),
+            JmpCC(NE(), 0),
+            Jmp(2),
+            Label(2),
+        ])
+
+    def test_long_jumps(self):
+        # 10 bytes per mov, 20 of them put the labels out of reach of a rel8
+        far = [AsmInstructionMov(IMM(index), FAR) for index in range(20)]
+        self.assertSameAsGcc([
+            Label(0),
+            JmpCC(L(), 1),
+            Jmp(2),
+            *far,
+            Label(1),
+            JmpCC(GE(), 0),
+            *far,
+            Label(2),
+            Jmp(0),
+        ])
+
+    def test_jump_made_long_by_another_jump(self):
+        # 125 bytes of movs: the je reaches label 1 over a short jmp (127) but not over a long one (130),
+        # and the jmp becomes long because label 0 is 155 bytes away
+        instructions = [
+            JmpCC(E(), 1),
+            Jmp(0),
+            *[AsmInstructionMov(IMM(index), NEAR) for index in range(17)],
+            AsmInstructionMov(AX, NEAR),
+            AsmInstructionMov(AX, NEAR),
+            Label(1),
+            *[AsmInstructionMov(IMM(index), FAR) for index in range(3)],
+            Label(0),
+            AsmInstructionRet(),
+        ]
+        self.assertSameAsGcc(instructions)
+
+        code, _ = encodeInstructions(instructions)
+        # je rel32 and jmp rel32 right after the prologue
+        self.assertEqual(code[4:6], b"\x0f\x84")
+        self.assertEqual(code[10:11], b"\xe9")
+
+    def test_compiled_examples(self):
+        examples = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "c_file_examples")
+        for name in sorted(os.listdir(examples)):
+            if not name.endswith(".c"):
+                continue
+            with self.subTest(name), open(os.path.join(examples, name)) as sourceFile:
+                function = compile_source(sourceFile.read()).function_definition
+                self.assertSameAsGcc(function.instructions)
+
+
+@unittest.skipUnless(X86_64_LINUX, "needs x86-64 Linux")
+class ELFTest(unittest.TestCase):
+
+    SOURCE = "int main(void) {\n    int a = 6;\n    int b = a * 7 - 2;\n    return b / 4 + (a > 5 && b == 40);\n}\n"
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.function = encodeProgram(compile_source(self.SOURCE))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_executable_exit_code(self):
+        binaryPath = os.path.join(self.directory, "program")
+        writeELF(elfExecutable(self.function), binaryPath, executable=True)
+
+        self.assertEqual(subprocess.run([binaryPath]).returncode, 11)
+
+    @unittest.skipIf(shutil.which("gcc") is None, "needs gcc")
+    def test_object_linked_by_gcc(self):
+        objectPath = os.path.join(self.directory, "program.o")
+        binaryPath = os.path.join(self.directory, "program")
+        writeELF(elfObject(self.function), objectPath)
+        subprocess.run(["gcc", objectPath, "-o", binaryPath], check=True)
+
+        self.assertEqual(subprocess.run([binaryPath]).returncode, 11)
+
+
+if __name__ == "__main__":
+    unittest.main()
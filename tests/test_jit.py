@@ -0,0 +1,66 @@
+import platform
+import subprocess
+import sys
+import unittest
+
+"""
+ In-process execution (compiler/jit.py): the generated code runs on the stack of the Python process
+ Run from the root of the project: python -m unittest discover tests
+"""
+
+# a SIGALRM arrives every 20 microseconds while main runs over and over, the kernel writes the signal
+# frame right below %rsp: a frame that isn't below the stack pointer gets overwritten by it
+SIGNAL_SCRIPT = """
+import signal
+import sys
+from compiler.jit import compile_to_callable
+
+variables = int(sys.argv[1])
+lines = ["int main(void) {", "    int v0 = 1;"]
+lines += [f"    int v{index} = v{index - 1} + {index % 7};" for index in range(1, variables)]
+lines += [f"    return v{variables - 1} - v0 + v1;", "}"]
+main = compile_to_callable("\\n".join(lines))
+
+signals = 0
+def handler(signum, frame):
+    global signals
+    signals += 1
+
+signal.signal(signal.SIGALRM, handler)
+signal.setitimer(signal.ITIMER_REAL, 0.00002, 0.00002)
+results = {main() for _ in range(int(sys.argv[2]))}
+signal.setitimer(signal.ITIMER_REAL, 0)
+print(sorted(results), signals)
+"""
+
+
+def expected(variables):
+    value = 1
+    values = [value]
+    for index in range(1, variables):
+        value += index % 7
+        values.append(value)
+    return values[-1] - values[0] + values[1]
+
+
+@unittest.skipUnless(sys.platform.startswith("linux") and platform.machine().lower() in ("x86_64", "amd64"), "needs x86-64 Linux")
+class SignalDuringCallTest(unittest.TestCase):
+
+    def run_with_signals(self, variables, calls):
+        # in its own process: a broken stack takes the whole interpreter down
+        run = subprocess.run([sys.executable, "-c", SIGNAL_SCRIPT, str(variables), str(calls)], capture_output=True, text=True, timeout=300)
+        self.assertEqual(run.returncode, 0, run.stderr)
+        results, signals = run.stdout.rsplit(" ", 1)
+        self.assertEqual(results, str([expected(variables)]))
+        self.assertGreater(int(signals), 0)
+
+    def test_small_frame(self):
+        # the whole frame fits in the 128 byte red zone below the old (wrong) stack pointer
+        self.run_with_signals(20, 200000)
+
+    def test_large_frame(self):
+        self.run_with_signals(5000, 5000)
+
+
+if __name__ == "__main__":
+    unittest.main()
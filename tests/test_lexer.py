@@ -0,0 +1,107 @@
+import contextlib
+import io
+import os
+import unittest
+
+from compiler.parser.lexer import NewLexer, TokenType
+
+"""
+ Lexer (compiler/parser/lexer.py): the master regex must give the tokens of the char-by-char lexer
+ Run from the root of the project: python -m unittest discover tests
+"""
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "c_file_examples")
+
+
+def tokens(source, use_regex=True):
+    return [(token.tok_type, token.tok_val) for token in NewLexer(source, use_regex).startLexer()]
+
+
+class LexerTest(unittest.TestCase):
+
+    def lexerError(self, source):
+        """What the lexer prints before it exits"""
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output), self.assertRaises(SystemExit):
+            NewLexer(source).startLexer()
+        return output.getvalue()
+
+    def test_examples_same_as_char_by_char(self):
+        for name in sorted(os.listdir(EXAMPLES)):
+            if not name.endswith(".c"):
+                continue
+            with self.subTest(name), open(os.path.join(EXAMPLES, name)) as sourceFile:
+                source = sourceFile.read()
+                self.assertEqual(tokens(source), tokens(source, use_regex=False))
+
+    def test_every_token(self):
+        source = "int main(void) { return ~-a1 + b_2 * 10 / 2 % 3 && 1 || !x == 2 != 3 < 4 <= 5 > 6 >= 7; c = 0; }"
+        self.assertEqual(tokens(source), tokens(source, use_regex=False))
+        self.assertEqual(tokens(source)[:12], [
+            (TokenType.KEYWORD, "int"),
+            (TokenType.IDENTIFIER, "main"),
+            (TokenType.OPEN_PARENTHESIS, None),
+            (TokenType.KEYWORD, "void"),
+            (TokenType.CLOSE_PARENTHESIS, None),
+            (TokenType.OPEN_BRACE, None),
+            (TokenType.KEYWORD, "return"),
+            (TokenType.UNARY_TILDE, None),
+            (TokenType.UNARY_NEGATE, None),
+            (TokenType.IDENTIFIER, "a1"),
+            (TokenType.PLUS_OPERATOR, None),
+            (TokenType.IDENTIFIER, "b_2"),
+        ])
+
+    def test_two_character_operators(self):
+        self.assertEqual([tokenType for tokenType, _ in tokens("a<=b>=c==d!=e&&f||g")], [
+            TokenType.IDENTIFIER, TokenType.LTE_OPERATOR,
+            TokenType.IDENTIFIER, TokenType.GTE_OPERATOR,
+            TokenType.IDENTIFIER, TokenType.EQ_OPERATOR,
+            TokenType.IDENTIFIER, TokenType.NEQ_OPERATOR,
+            TokenType.IDENTIFIER, TokenType.AND_OPERATOR,
+            TokenType.IDENTIFIER, TokenType.OR_OPERATOR,
+            TokenType.IDENTIFIER,
+        ])
+
+    def test_comments(self):
+        source = "// first line\nint main(void) { // int x = 1;\n    return 1 / 2; // a / b\n}// no newline at the end"
+        self.assertEqual(tokens(source), tokens(source, use_regex=False))
+        self.assertEqual(tokens(source), [
+            (TokenType.KEYWORD, "int"),
+            (TokenType.IDENTIFIER, "main"),
+            (TokenType.OPEN_PARENTHESIS, None),
+            (TokenType.KEYWORD, "void"),
+            (TokenType.CLOSE_PARENTHESIS, None),
+            (TokenType.OPEN_BRACE, None),
+            (TokenType.KEYWORD, "return"),
+            (TokenType.CONSTANT, 1),
+            (TokenType.DIVISION_OPERATOR, None),
+            (TokenType.CONSTANT, 2),
+            (TokenType.SEMICOLON, None),
+            (TokenType.CLOSE_BRACE, None),
+        ])
+
+    def test_whitespace_only_at_the_end(self):
+        self.assertEqual(tokens("return 1;\n\t \n"), [(TokenType.KEYWORD, "return"), (TokenType.CONSTANT, 1), (TokenType.SEMICOLON, None)])
+
+    def test_mismatch_goes_to_char_by_char(self):
+        # a constant that runs into letters doesn't match the regex, the char-by-char lexer splits it and scanning goes on after it
+        self.assertEqual(tokens("a = 12abc;"), [
+            (TokenType.IDENTIFIER, "a"),
+            (TokenType.ASSIGNMENT_OPERATOR, None),
+            (TokenType.CONSTANT, 12),
+            (TokenType.IDENTIFIER, "abc"),
+            (TokenType.SEMICOLON, None),
+        ])
+
+    def test_mismatch_error(self):
+        self.assertIn("Could not find any match with the lexer!", self.lexerError("int main(void) { return 1 @ 2; }"))
+        self.assertIn("only 1 &", self.lexerError("a & b"))
+        self.assertIn("only 1 |", self.lexerError("a | b"))
+
+    def test_empty_source(self):
+        self.assertIn("empty", self.lexerError(""))
+
+
+if __name__ == "__main__":
+    unittest.main()
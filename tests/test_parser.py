@@ -0,0 +1,191 @@
+import contextlib
+import io
+import unittest
+
+from compiler.compile import compile_source
+from compiler.parser.AST import Assignment, Binary, Constant, Declaration, Null, ReturnStatement, Unary, Var
+from compiler.parser.lexer import NewLexer, TokenType
+from compiler.parser.parse import Parser, TokenStream
+
+"""
+ Parser (compiler/parser/parse.py)
+ Run from the root of the project: python -m unittest discover tests
+"""
+
+OPERATORS = {
+    TokenType.MULTIPLICATION_OPERATOR: "*",
+    TokenType.DIVISION_OPERATOR: "/",
+    TokenType.REMAINDER_OPERATOR: "%",
+    TokenType.PLUS_OPERATOR: "+",
+    TokenType.UNARY_NEGATE: "-",
+    TokenType.LT_OPERATOR: "<",
+    TokenType.LTE_OPERATOR: "<=",
+    TokenType.GT_OPERATOR: ">",
+    TokenType.GTE_OPERATOR: ">=",
+    TokenType.EQ_OPERATOR: "==",
+    TokenType.NEQ_OPERATOR: "!=",
+    TokenType.AND_OPERATOR: "&&",
+    TokenType.OR_OPERATOR: "||",
+    TokenType.UNARY_TILDE: "~",
+    TokenType.NOT_OPERATOR: "!",
+}
+
+# the binary operators from the one that binds the strongest to the weakest, the operators of a level bind the same
+LEVELS = (("*", "/", "%"), ("+", "-"), ("<", "<=", ">", ">="), ("==", "!="), ("&&",), ("||",), ("=",))
+
+
+def parse(source):
+    return Parser(NewLexer(source).startLexer())
+
+
+def parse_exp(source):
+    """The expression of the statement "source;" as a fully parenthesized string"""
+    return render(parse(f"int main(void) {{ {source}; }}").function_def.body[0])
+
+
+def render(exp):
+    if type(exp) is Constant:
+        return str(exp.int)
+    elif type(exp) is Var:
+        return exp.identifier
+    elif type(exp) is Unary:
+        return f"({OPERATORS[exp.unary_operator.operator]}{render(exp.exp)})"
+    elif type(exp) is Assignment:
+        return f"({render(exp.left_exp)} = {render(exp.right_exp)})"
+    return f"({render(exp.exp1)} {OPERATORS[exp.binary_operator.operator]} {render(exp.exp2)})"
+
+
+def depth(exp):
+    """Depth of the expression tree, without recursion"""
+    deepest = 0
+    stack = [(exp, 1)]
+    while stack:
+        exp, level = stack.pop()
+        deepest = max(deepest, level)
+        if type(exp) is Binary:
+            stack += ((exp.exp1, level + 1), (exp.exp2, level + 1))
+        elif type(exp) is Unary:
+            stack.append((exp.exp, level + 1))
+        elif type(exp) is Assignment:
+            stack += ((exp.left_exp, level + 1), (exp.right_exp, level + 1))
+    return deepest
+
+
+class ParserTest(unittest.TestCase):
+
+    def parseError(self, source):
+        """What the parser prints before it exits"""
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output), self.assertRaises(SystemExit):
+            parse(source)
+        return output.getvalue()
+
+    def test_function(self):
+        program = parse("int main(void) { int a = 1; int b; ; b = a; return b; }")
+        function = program.function_def
+
+        self.assertEqual(function.name, "main")
+        self.assertEqual([type(item) for item in function.body], [Declaration, Declaration, Null, Assignment, ReturnStatement])
+        self.assertEqual(function.body[0].name, "a")
+        self.assertEqual(function.body[0].init.int, 1)
+        self.assertIsNone(function.body[1].init)
+
+    def test_token_stream(self):
+        tokens = TokenStream(NewLexer("return 1;").startLexer())
+
+        self.assertEqual(len(tokens), 3)
+        self.assertEqual(tokens.peek(1).tok_val, 1)
+        self.assertEqual(tokens.expect("return").tok_val, "return")
+        self.assertEqual(tokens.expect(TokenType.CONSTANT).tok_val, 1)
+        self.assertEqual(len(tokens), 1)
+        # peek doesn't consume
+        self.assertIs(tokens.peek(), tokens.peek())
+
+    def test_empty_stream(self):
+        for source in ("int main(void) { return 1;", "int main(void) { return 1 +", "int main("):
+            with self.subTest(source):
+                self.assertIn("The parser was empty", self.parseError(source))
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output), self.assertRaises(SystemExit):
+            TokenStream([]).advance()
+        self.assertIn("The parser was empty", output.getvalue())
+
+    def test_wrong_token(self):
+        self.assertIn("Expected TokenType.SEMICOLON", self.parseError("int main(void) { return 1 }"))
+        self.assertIn("Malformed factor", self.parseError("int main(void) { return * 2; }"))
+        self.assertIn("Expected TokenType.CLOSE_PARENTHESIS", self.parseError("int main(void) { return (1 + 2; }"))
+
+
+class PrecedenceTest(unittest.TestCase):
+
+    def test_left_associative(self):
+        for level in LEVELS[:-1]:
+            for operator in level:
+                with self.subTest(operator):
+                    self.assertEqual(parse_exp(f"a {operator} b {operator} c"), f"((a {operator} b) {operator} c)")
+
+        # operators of the same level
+        self.assertEqual(parse_exp("a * b / c % d"), "(((a * b) / c) % d)")
+        self.assertEqual(parse_exp("a - b + c - d"), "(((a - b) + c) - d)")
+        self.assertEqual(parse_exp("a < b >= c > d <= e"), "((((a < b) >= c) > d) <= e)")
+        self.assertEqual(parse_exp("a != b == c"), "((a != b) == c)")
+
+    def test_assignment_right_associative(self):
+        self.assertEqual(parse_exp("a = b = c"), "(a = (b = c))")
+        self.assertEqual(parse_exp("a = b = c = 1 + 2"), "(a = (b = (c = (1 + 2))))")
+
+    def test_every_pair_of_levels(self):
+        for strong, strongLevel in enumerate(LEVELS):
+            for weakLevel in LEVELS[strong + 1:]:
+                for high in strongLevel:
+                    for low in weakLevel:
+                        with self.subTest(high=high, low=low):
+                            self.assertEqual(parse_exp(f"a {low} b {high} c"), f"(a {low} (b {high} c))")
+                            self.assertEqual(parse_exp(f"a {high} b {low} c"), f"((a {high} b) {low} c)")
+
+    def test_unary_and_parentheses(self):
+        self.assertEqual(parse_exp("-a * b"), "((-a) * b)")
+        self.assertEqual(parse_exp("!a == ~b"), "((!a) == (~b))")
+        self.assertEqual(parse_exp("-(a + b) * c"), "((-(a + b)) * c)")
+        self.assertEqual(parse_exp("a - -b"), "(a - (-b))")
+        self.assertEqual(parse_exp("(a || b) && c"), "((a || b) && c)")
+        self.assertEqual(parse_exp("a * (b + (c - d))"), "(a * (b + (c - d)))")
+        self.assertEqual(parse_exp("a = (b) = c"), "(a = (b = c))")
+
+    def test_mixed(self):
+        self.assertEqual(parse_exp("a = 1 || 2 && 3 == 4 < 5 + 6 * 7"), "(a = (1 || (2 && (3 == (4 < (5 + (6 * 7)))))))")
+        self.assertEqual(parse_exp("a * 2 + 3 < 4 == 5 && 6 || 7"), "((((((a * 2) + 3) < 4) == 5) && 6) || 7)")
+
+    def test_declaration(self):
+        init = parse("int main(void) { int a = b = 1 + 2 * 3; }").function_def.body[0].init
+        self.assertEqual(render(init), "(b = (1 + (2 * 3)))")
+
+
+class DeepExpressionTest(unittest.TestCase):
+    """Parsing, resolving and lowering don't recurse, the recursion limit doesn't limit the depth of an expression"""
+
+    DEPTH = 100000
+
+    def compile(self, expression, declarations=""):
+        program = compile_source(f"int main(void) {{ {declarations} return {expression}; }}")
+        self.assertGreater(len(program.function_definition.instructions), self.DEPTH)
+
+    def test_parentheses(self):
+        expression = "-(" * self.DEPTH + "1" + ")" * self.DEPTH
+        exp = parse(f"int main(void) {{ {expression}; }}").function_def.body[0]
+        self.assertEqual(depth(exp), self.DEPTH + 1)
+        self.compile(expression)
+
+    def test_right_nested(self):
+        self.compile("(1 + " * self.DEPTH + "1" + ")" * self.DEPTH)
+
+    def test_left_chain(self):
+        self.compile(" - ".join(["1"] * self.DEPTH))
+
+    def test_assignment_chain(self):
+        self.compile("a = " * self.DEPTH + "1", "int a;")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import asyncio
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+import unittest
+
+from compiler.client import CompileClient
+from compiler.server import CompileServer, socket_in_use
+
+"""
+ Compile server (compiler/server.py): the protocol over the Unix domain socket
+ Run from the root of the project: python -m unittest discover tests
+"""
+
+SOURCE = "int main(void) {\n    int a = 6;\n    return a * 7;\n}\n"
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), "needs Unix domain sockets")
+class CompileServerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.socketPath = os.path.join(self.directory, "server.sock")
+        self.served = []
+        self.thread = threading.Thread(target=lambda: self.served.append(asyncio.run(CompileServer(self.socketPath, workers=1).serve())))
+        self.thread.start()
+
+        deadline = time.monotonic() + 30
+        while not socket_in_use(self.socketPath):
+            self.assertLess(time.monotonic(), deadline, "the server didn't start")
+            time.sleep(0.01)
+
+    def tearDown(self):
+        if self.thread.is_alive():
+            with CompileClient(self.socketPath) as client:
+                client.request({"command": "shutdown"})
+            self.thread.join(30)
+        shutil.rmtree(self.directory)
+
+    def test_ping(self):
+        with CompileClient(self.socketPath) as client:
+            self.assertEqual(client.request({"command": "ping"}), {"ok": True, "requests": 0})
+            client.compile(SOURCE)
+            self.assertEqual(client.request({"command": "ping"}), {"ok": True, "requests": 1})
+            self.assertFalse(client.request({"command": "restart"})["ok"])
+
+    def test_assembly(self):
+        with CompileClient(self.socketPath) as client:
+            response = client.compile(SOURCE)
+
+        self.assertTrue(response["ok"], response)
+        self.assertIn("main:", response["assembly"])
+        self.assertIn("imull", response["assembly"])
+        self.assertGreaterEqual(response["seconds"], 0)
+
+    @unittest.skipIf(shutil.which("gcc") is None, "needs gcc")
+    def test_binary(self):
+        outputDir = os.path.join(self.directory, "compiled")
+        with CompileClient(self.socketPath) as client:
+            response = client.compile(SOURCE, output="binary", name="../program.c", outputDir=outputDir)
+
+        self.assertTrue(response["ok"], response)
+        # the name can't leave the output directory
+        self.assertEqual(response["binary"], os.path.join(outputDir, "program.c"))
+        self.assertEqual(subprocess.run([response["binary"]]).returncode, 42)
+
+    def test_malformed_lines(self):
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.connect(self.socketPath)
+        with connection, connection.makefile("rb") as responses:
+            for line in (b"{not json\n", b"[1, 2]\n", b"{\"output\": \"assembly\"}\n"):
+                with self.subTest(line):
+                    connection.sendall(line)
+                    response = responses.readline()
+                    self.assertIn(b'"ok": false', response)
+
+        # the server keeps serving after them
+        with CompileClient(self.socketPath) as client:
+            self.assertTrue(client.compile(SOURCE)["ok"])
+
+    def test_syntax_error(self):
+        with CompileClient(self.socketPath) as client:
+            response = client.compile("int main(void) {\n    return 1 +;\n}\n")
+            self.assertFalse(response["ok"])
+            self.assertIn("Malformed factor", response["error"])
+
+            # the same connection still compiles
+            self.assertTrue(client.compile(SOURCE)["ok"])
+
+    def test_second_server_and_shutdown(self):
+        # the socket belongs to a running server, it isn't removed
+        self.assertFalse(asyncio.run(CompileServer(self.socketPath, workers=1).serve()))
+        self.assertTrue(socket_in_use(self.socketPath))
+
+        with CompileClient(self.socketPath) as client:
+            self.assertEqual(client.request({"command": "shutdown"}), {"ok": True})
+        self.thread.join(30)
+
+        self.assertFalse(self.thread.is_alive())
+        self.assertEqual(self.served, [True])
+        self.assertFalse(os.path.exists(self.socketPath))
+
+
+if __name__ == "__main__":
+    unittest.main()